@@ -0,0 +1,3 @@
+"""
+Strumenti di misura delle prestazioni della pipeline di estrazione.
+"""
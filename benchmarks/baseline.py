@@ -0,0 +1,48 @@
+# benchmarks/baseline.py
+
+"""
+Gestione delle baseline comune ai benchmark: aggiornamento con
+--update-baseline e confronto dei risultati con il codice di uscita.
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Callable, Dict, List
+
+def apply_baseline(
+    results: Dict,
+    baseline: Path,
+    tolerance: float,
+    update: bool,
+    compare: Callable[[Dict, Dict, float], List[str]]
+) -> int:
+    """
+    Salva i risultati come baseline oppure li confronta con quella salvata.
+
+    Args:
+        results: Risultati del benchmark
+        baseline: File della baseline
+        tolerance: Tolleranza relativa delle regressioni
+        update: Se True sovrascrive la baseline con i risultati
+        compare: Funzione (risultati, baseline, tolleranza) -> regressioni
+
+    Returns:
+        int: 0 se non ci sono regressioni, 1 in caso di regressione,
+            2 se la baseline manca
+    """
+    if update:
+        baseline.parent.mkdir(parents=True, exist_ok=True)
+        baseline.write_text(json.dumps(results, indent=2), encoding='utf-8')
+        print(f"Baseline aggiornata: {baseline}")
+        return 0
+
+    if not baseline.exists():
+        # Senza baseline il confronto non può garantire nulla: in CI è un errore
+        print(f"Nessuna baseline in {baseline}: generarla con --update-baseline", file=sys.stderr)
+        return 2
+
+    regressions = compare(results, json.loads(baseline.read_text(encoding='utf-8')), tolerance)
+    for regression in regressions:
+        print(f"REGRESSIONE {regression}", file=sys.stderr)
+    return 1 if regressions else 0
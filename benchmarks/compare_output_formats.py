@@ -0,0 +1,185 @@
+# benchmarks/compare_output_formats.py
+
+"""
+Confronta il formato di risposta standard con quello compatto sulle
+stesse pagine: token di output, latenza e accuratezza dei prodotti estratti.
+
+Esempio:
+    python -m benchmarks.compare_output_formats listino.pdf --pages 5
+    python -m benchmarks.compare_output_formats listino.pdf --reference attesi.json
+
+Senza --reference, i prodotti estratti con il formato standard fanno da
+riferimento per l'accuratezza.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from src.config.settings import OUTPUT_SETTINGS
+from src.extractor.pdf_processor import PDFProcessor
+from src.extractor.vision_api import VisionAPI
+
+FORMATS = ('standard', 'compact')
+
+def product_signature(product: Dict) -> Tuple:
+    """
+    Restituisce la chiave di confronto di un prodotto.
+
+    Args:
+        product: Prodotto sanitizzato
+
+    Returns:
+        Tuple: codice, tipo di prezzo e prezzi
+    """
+    tiers = tuple(
+        (t.get('quantita'), round(float(t.get('prezzo', 0)), 2))
+        for t in product.get('prezzi_quantita', [])
+    )
+    prezzo = product.get('prezzo_unitario')
+    return (
+        str(product.get('codice', '')).strip(),
+        product.get('tipo_prezzo'),
+        round(float(prezzo), 2) if prezzo is not None else None,
+        tiers
+    )
+
+def accuracy(extracted: List[Dict], reference: List[Dict]) -> Dict[str, float]:
+    """
+    Calcola precisione, richiamo e F1 rispetto ai prodotti di riferimento.
+
+    Args:
+        extracted: Prodotti estratti
+        reference: Prodotti attesi
+
+    Returns:
+        Dict[str, float]: precision, recall, f1
+    """
+    found: Set[Tuple] = {product_signature(p) for p in extracted}
+    expected: Set[Tuple] = {product_signature(p) for p in reference}
+    matched = len(found & expected)
+    precision = matched / len(found) if found else 0.0
+    recall = matched / len(expected) if expected else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'precision': round(precision, 4), 'recall': round(recall, 4), 'f1': round(f1, 4)}
+
+def run_format(api_key: str, output_format: str, images: list) -> Dict:
+    """
+    Estrae tutte le pagine con un formato di risposta.
+
+    Args:
+        api_key: Chiave API OpenAI
+        output_format: 'standard' o 'compact'
+        images: Immagini delle pagine
+
+    Returns:
+        Dict: prodotti per pagina e metriche per pagina
+    """
+    vision_api = VisionAPI(api_key, output_format=output_format)
+    products = []
+    for page_number, image in enumerate(images, 1):
+        try:
+            products.append(vision_api.extract_data(image, page_number=page_number))
+        except Exception as e:
+            print(f"[{output_format}] pagina {page_number}: errore {e}", file=sys.stderr)
+            products.append([])
+    return {'products': products, 'metrics': vision_api.page_metrics}
+
+def summarize(run: Dict, reference_pages: List[List[Dict]]) -> Dict:
+    """
+    Riassume le metriche di un formato.
+
+    Args:
+        run: Risultato di run_format
+        reference_pages: Prodotti attesi per pagina
+
+    Returns:
+        Dict: totali e medie per il formato
+    """
+    metrics = run['metrics']
+    durations = [m['duration_seconds'] for m in metrics]
+    all_products = [p for page in run['products'] for p in page]
+    all_reference = [p for page in reference_pages for p in page]
+    return {
+        'pages': len(run['products']),
+        'products': len(all_products),
+        'prompt_tokens': sum(m['prompt_tokens'] for m in metrics),
+        'completion_tokens': sum(m['completion_tokens'] for m in metrics),
+        'completion_tokens_per_product': round(
+            sum(m['completion_tokens'] for m in metrics) / max(len(all_products), 1), 2
+        ),
+        'latency_mean_seconds': round(statistics.mean(durations), 3) if durations else None,
+        'latency_max_seconds': round(max(durations), 3) if durations else None,
+        'truncated_pages': sum(1 for m in metrics if m['truncated']),
+        **accuracy(all_products, all_reference)
+    }
+
+def load_reference(path: Optional[Path], pages: int) -> Optional[List[List[Dict]]]:
+    """
+    Carica i prodotti attesi: una lista per pagina, oppure {"pagine": [...]}.
+
+    Args:
+        path: Percorso del file JSON di riferimento
+        pages: Numero di pagine elaborate
+
+    Returns:
+        Optional[List[List[Dict]]]: Prodotti attesi per pagina
+    """
+    if path is None:
+        return None
+    data = json.loads(path.read_text(encoding='utf-8'))
+    if isinstance(data, dict):
+        data = data.get('pagine', [])
+    return [page.get('prodotti', page) if isinstance(page, dict) else page for page in data][:pages]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Confronto formato standard / compatto")
+    parser.add_argument('pdf', type=Path, help="PDF del listino da analizzare")
+    parser.add_argument('--pages', type=int, default=None, help="Numero massimo di pagine")
+    parser.add_argument('--reference', type=Path, default=None, help="JSON con i prodotti attesi per pagina")
+    parser.add_argument('--output', type=Path, default=None, help="File del report JSON")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        print("OPENAI_API_KEY non impostata", file=sys.stderr)
+        return 2
+
+    images = PDFProcessor().process_pdf(args.pdf)[:args.pages]
+    runs = {fmt: run_format(api_key, fmt, images) for fmt in FORMATS}
+
+    reference = load_reference(args.reference, len(images)) or runs['standard']['products']
+    report = {
+        'pdf': str(args.pdf),
+        'timestamp': datetime.now().strftime(OUTPUT_SETTINGS['DATE_FORMAT']),
+        'reference': str(args.reference) if args.reference else 'standard',
+        'formats': {fmt: summarize(run, reference) for fmt, run in runs.items()},
+        'pages': {fmt: run['metrics'] for fmt, run in runs.items()}
+    }
+
+    print(f"{'formato':<10} {'tok. output':>12} {'tok./prodotto':>14} {'latenza media':>14} {'F1':>6}")
+    for fmt, summary in report['formats'].items():
+        print(
+            f"{fmt:<10} {summary['completion_tokens']:>12} {summary['completion_tokens_per_product']:>14} "
+            f"{summary['latency_mean_seconds']:>13}s {summary['f1']:>6}"
+        )
+
+    output = args.output or OUTPUT_SETTINGS['CSV_DIR'] / 'benchmarks' / f"formats_{report['timestamp']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"Report salvato in: {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
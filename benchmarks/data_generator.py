@@ -0,0 +1,121 @@
+# benchmarks/data_generator.py
+
+"""
+Generatore riproducibile di prodotti realistici per i test di scala.
+
+I prodotti hanno la stessa forma di quelli restituiti da VisionAPI dopo la
+validazione: codici con varianti (RC330-40, RC330-45, ...), descrizioni in
+italiano e un misto di prezzi singoli e per quantità con più scaglioni.
+"""
+
+import random
+from typing import Dict, Iterator, List, Optional
+
+ARTICOLI = [
+    "Sedia", "Tavolo", "Mensola", "Lampada", "Armadio", "Cassettiera", "Sgabello",
+    "Guanti", "Vite", "Bullone", "Tassello", "Nastro adesivo", "Vaso", "Cuscino"
+]
+MATERIALI = ["in legno", "in metallo", "in plastica", "in vetro", "in faggio", "in acciaio inox", "in tessuto"]
+COLORI = ["bianco", "nero", "grigio", "rosso", "blu", "naturale", "antracite"]
+MISURE = [("Misura", "cm", [35, 40, 45, 50, 60]), ("Diametro", "mm", [4, 6, 8, 10, 12]), ("Conf.", "pz", [10, 25, 50, 100])]
+PREFISSI = ["RC", "AB", "MX", "TL", "FG", "ZP"]
+
+class ProductGenerator:
+    """Genera prodotti con un seme fisso: stessi parametri, stessi prodotti."""
+
+    def __init__(
+        self,
+        seed: int = 0,
+        quantity_ratio: float = 0.3,
+        max_tiers: int = 6,
+        variant_ratio: float = 0.5
+    ):
+        """
+        Args:
+            seed: Seme del generatore casuale
+            quantity_ratio: Frazione di prodotti con prezzi per quantità
+            max_tiers: Numero massimo di scaglioni per prodotto
+            variant_ratio: Frazione di codici base con più varianti
+        """
+        self.rng = random.Random(seed)
+        self.quantity_ratio = quantity_ratio
+        self.max_tiers = max_tiers
+        self.variant_ratio = variant_ratio
+        self._next_code = 100
+
+    def iter_products(self, count: int, code_prefix: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Genera i prodotti uno alla volta.
+
+        Le varianti di uno stesso codice base sono consecutive, come nei
+        listini reali.
+
+        Args:
+            count: Numero di prodotti
+            code_prefix: Prefisso fisso dei codici; se None è casuale per ogni codice base
+
+        Yields:
+            Dict: Prodotto nel formato di JSONValidator
+        """
+        produced = 0
+        while produced < count:
+            base_code = f"{code_prefix or self.rng.choice(PREFISSI)}{self._next_code}"
+            self._next_code += 1
+            descrizione = (
+                f"{self.rng.choice(ARTICOLI)} {self.rng.choice(MATERIALI)} {self.rng.choice(COLORI)}"
+            )
+
+            if self.rng.random() < self.variant_ratio:
+                label, unit, values = self.rng.choice(MISURE)
+                variants = self.rng.sample(values, self.rng.randint(2, len(values)))
+                for value in sorted(variants):
+                    if produced >= count:
+                        break
+                    yield self._make_product(f"{base_code}-{value}", f"{descrizione} - {label} {value} {unit}")
+                    produced += 1
+            else:
+                yield self._make_product(base_code, descrizione)
+                produced += 1
+
+    def products(self, count: int, code_prefix: Optional[str] = None) -> List[Dict]:
+        """
+        Genera una lista di prodotti.
+
+        Args:
+            count: Numero di prodotti
+            code_prefix: Prefisso fisso dei codici (vedi iter_products)
+
+        Returns:
+            List[Dict]: Prodotti generati
+        """
+        return list(self.iter_products(count, code_prefix))
+
+    def _make_product(self, codice: str, descrizione: str) -> Dict:
+        """Crea un prodotto a prezzo singolo o per quantità."""
+        product = {'codice': codice, 'descrizione': descrizione}
+
+        if self.rng.random() >= self.quantity_ratio:
+            product['tipo_prezzo'] = 'singolo'
+            product['prezzo_unitario'] = round(self.rng.uniform(0.5, 800), 2)
+            return product
+
+        tiers = self.rng.randint(1, max(1, self.max_tiers))
+        quantita = self.rng.choice([1, 2, 4, 5, 6, 10])
+        prezzo = round(self.rng.uniform(1, 200), 2)
+        non_vendibile = self.rng.random() < 0.3
+        prezzi = []
+        for i in range(tiers):
+            prezzi.append({
+                'quantita': quantita,
+                'prezzo': prezzo,
+                'quantita_minima': i == 0 and quantita > 1,
+                'non_vendibile_separatamente': non_vendibile
+            })
+            quantita *= self.rng.choice([2, 3, 5])
+            prezzo = round(prezzo * self.rng.uniform(0.8, 0.97), 2)
+
+        product['tipo_prezzo'] = 'quantita'
+        product['prezzi_quantita'] = prezzi
+        if non_vendibile:
+            product['descrizione_quantita'] = f"Pz.{prezzi[0]['quantita']} non vendibili separatamente"
+        return product
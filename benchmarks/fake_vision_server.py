@@ -0,0 +1,244 @@
+# benchmarks/fake_vision_server.py
+
+"""
+Server locale compatibile con l'endpoint chat/completions di OpenAI, per
+misurare la pipeline senza rete e senza costi.
+
+Risponde con contenuti predefiniti (in ordine, ricominciando dall'inizio
+quando finiscono), con latenza configurabile e iniezione di errori 429 e
+5xx. Supporta sia le risposte complete sia lo streaming SSE.
+
+Esempio:
+    with FakeVisionServer(responses, latency=LatencyModel('lognormal', 0.8, 0.3)) as server:
+        vision_api = VisionAPI("sk-fake", base_url=server.base_url)
+"""
+
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+class LatencyModel:
+    """Distribuzione della latenza delle risposte simulate."""
+
+    DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+    def __init__(self, distribution: str = 'fixed', mean: float = 0.0, spread: float = 0.0, seed: int = 0):
+        """
+        Args:
+            distribution: 'fixed', 'uniform' (mean ± spread) o 'lognormal'
+                (mediana mean, deviazione standard del logaritmo spread)
+            mean: Latenza tipica in secondi
+            spread: Dispersione (secondi per uniform, sigma per lognormal)
+            seed: Seme del generatore casuale
+        """
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"Distribuzione non supportata: {distribution}")
+        self.distribution = distribution
+        self.mean = mean
+        self.spread = spread
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        """
+        Estrae una latenza.
+
+        Returns:
+            float: Secondi di attesa (mai negativi)
+        """
+        if self.mean <= 0:
+            return 0.0
+        with self._lock:
+            if self.distribution == 'uniform':
+                return max(0.0, self._rng.uniform(self.mean - self.spread, self.mean + self.spread))
+            if self.distribution == 'lognormal':
+                return self._rng.lognormvariate(math.log(self.mean), self.spread)
+            return self.mean
+
+class FakeVisionServer:
+    """Server HTTP in un thread in background che imita chat/completions."""
+
+    def __init__(
+        self,
+        responses: List[str],
+        latency: Optional[LatencyModel] = None,
+        error_429_rate: float = 0.0,
+        error_5xx_rate: float = 0.0,
+        chunk_size: int = 40,
+        seed: int = 0
+    ):
+        """
+        Args:
+            responses: Contenuti delle risposte (testo JSON), restituiti in ordine
+            latency: Modello di latenza; se None risponde subito
+            error_429_rate: Frazione di richieste rifiutate con 429
+            error_5xx_rate: Frazione di richieste fallite con 500/502/503
+            chunk_size: Caratteri per chunk in streaming
+            seed: Seme per l'iniezione degli errori
+        """
+        if not responses:
+            raise ValueError("Serve almeno una risposta predefinita")
+        self.responses = responses
+        self.latency = latency or LatencyModel()
+        self.error_429_rate = error_429_rate
+        self.error_5xx_rate = error_5xx_rate
+        self.chunk_size = chunk_size
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._next_response = 0
+        self.stats = {'requests': 0, 'served': 0, 'errors_429': 0, 'errors_5xx': 0}
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """URL base da passare al client OpenAI (con /v1)."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeVisionServer":
+        """Avvia il server su una porta libera di localhost."""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                server._handle(self, body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Ferma il server."""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self) -> "FakeVisionServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset(self):
+        """Riparte dalla prima risposta predefinita."""
+        with self._lock:
+            self._next_response = 0
+
+    def _pick_outcome(self) -> Optional[int]:
+        """Sceglie lo stato HTTP di errore da iniettare (None = successo)."""
+        with self._lock:
+            self.stats['requests'] += 1
+            roll = self._rng.random()
+            if roll < self.error_429_rate:
+                self.stats['errors_429'] += 1
+                return 429
+            if roll < self.error_429_rate + self.error_5xx_rate:
+                self.stats['errors_5xx'] += 1
+                return self._rng.choice([500, 502, 503])
+            self.stats['served'] += 1
+            return None
+
+    def _take_response(self) -> str:
+        """Restituisce la prossima risposta predefinita."""
+        with self._lock:
+            content = self.responses[self._next_response % len(self.responses)]
+            self._next_response += 1
+            return content
+
+    def _handle(self, handler: BaseHTTPRequestHandler, body: Dict):
+        """Risponde a una richiesta chat/completions."""
+        if not handler.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(handler, 404, {'error': {'message': 'Not found', 'type': 'invalid_request_error'}})
+            return
+
+        status = self._pick_outcome()
+        if status is not None:
+            # Il client ritenta subito: retry-after-ms evita il backoff predefinito dell'SDK
+            self._send_json(
+                handler, status,
+                {'error': {'message': f'Errore simulato {status}', 'type': 'server_error'}},
+                headers={'retry-after-ms': '10'}
+            )
+            return
+
+        time.sleep(self.latency.sample())
+        content = self._take_response()
+        model = body.get('model', 'fake-model')
+        usage = {
+            'prompt_tokens': 1000,
+            'completion_tokens': max(1, len(content) // 4),
+            'total_tokens': 1000 + max(1, len(content) // 4)
+        }
+
+        if body.get('stream'):
+            self._send_stream(handler, content, model, usage, body.get('stream_options') or {})
+            return
+
+        self._send_json(handler, 200, {
+            'id': 'chatcmpl-fake',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content, 'refusal': None},
+                'finish_reason': 'stop',
+                'logprobs': None
+            }],
+            'usage': usage
+        })
+
+    def _send_json(self, handler: BaseHTTPRequestHandler, status: int, payload: Dict, headers: Optional[Dict] = None):
+        """Invia una risposta JSON."""
+        data = json.dumps(payload).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(data)
+
+    def _send_stream(self, handler: BaseHTTPRequestHandler, content: str, model: str, usage: Dict, options: Dict):
+        """Invia la risposta come stream SSE di chunk."""
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'text/event-stream')
+        handler.send_header('Cache-Control', 'no-cache')
+        handler.send_header('Connection', 'close')
+        handler.end_headers()
+        handler.close_connection = True
+
+        def chunk(delta: Dict, finish_reason: Optional[str] = None, choices: bool = True, chunk_usage=None) -> bytes:
+            payload = {
+                'id': 'chatcmpl-fake',
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}] if choices else [],
+                'usage': chunk_usage
+            }
+            return f"data: {json.dumps(payload)}\n\n".encode('utf-8')
+
+        handler.wfile.write(chunk({'role': 'assistant', 'content': ''}))
+        for start in range(0, len(content), self.chunk_size):
+            handler.wfile.write(chunk({'content': content[start:start + self.chunk_size]}))
+        handler.wfile.write(chunk({}, finish_reason='stop'))
+        if options.get('include_usage'):
+            handler.wfile.write(chunk({}, choices=False, chunk_usage=usage))
+        handler.wfile.write(b"data: [DONE]\n\n")
+        handler.wfile.flush()
@@ -0,0 +1,165 @@
+# benchmarks/memory_calibration.py
+
+"""
+Calibrazione della stima di memoria di PDFValidator.estimate_processing_requirements.
+
+Per ogni combinazione di pagine e DPI genera un listino sintetico e misura,
+in un processo separato (per partire sempre dalla stessa memoria), il
+picco di RSS di rendering, ottimizzazione e codifica delle pagine oltre
+l'RSS di partenza. Le misure vengono approssimate ai minimi quadrati con
+il modello usato dallo stimatore:
+
+    memoria = OVERHEAD_MB
+              + RENDER_COPIES x raster della pagina renderizzata
+              + RETAINED_FACTOR x pagine x immagine ottimizzata (non compressa)
+
+e i coefficienti risultanti vanno riportati in PDF_SETTINGS['MEMORY_MODEL']
+per il percorso misurato (FAST_ENCODE o, con --pil, PIL). Lo script
+stampa anche la stima corrente accanto a ogni misura.
+
+Esempio:
+    python -m benchmarks.memory_calibration
+    python -m benchmarks.memory_calibration --pages 2 --pages 10 --pages 30 --dpi 150 --dpi 200
+    python -m benchmarks.memory_calibration --pil
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+DEFAULT_PAGES = [2, 8, 16]
+DEFAULT_DPI = [100, 150, 200]
+
+def measure(pdf_path: str, dpi: int, fast_encode: bool) -> Dict:
+    """
+    Misura il picco di RSS dell'elaborazione di un PDF (eseguita nel processo figlio).
+
+    Prima della misura una pagina di prova carica PyMuPDF e i codec, costi
+    pagati una volta per processo e non per documento.
+
+    Args:
+        pdf_path: Percorso del PDF
+        dpi: Risoluzione di rendering
+        fast_encode: Valore di IMAGE_SETTINGS['FAST_ENCODE'] da misurare
+
+    Returns:
+        Dict: baseline_mb, peak_mb e delta_mb
+    """
+    logging.disable(logging.WARNING)
+    import fitz
+    import psutil
+    from benchmarks.run_benchmark import RSSSampler
+    from src.config.settings import IMAGE_SETTINGS
+    from src.extractor.pdf_processor import PDFProcessor
+    from src.extractor.vision_api import VisionAPI
+
+    IMAGE_SETTINGS['FAST_ENCODE'] = fast_encode
+    processor = PDFProcessor()
+    vision_api = VisionAPI("sk-calibration")
+
+    warm_up = Path(pdf_path).with_name("warm_up.pdf")
+    with fitz.open() as document:
+        document.new_page(width=100, height=100).insert_text((10, 50), "prova")
+        document.save(str(warm_up))
+    for image in processor.process_pdf(warm_up, dpi=72):
+        vision_api._convert_to_base64(image)
+    baseline_mb = psutil.Process().memory_info().rss / (1024 * 1024)
+
+    with RSSSampler(interval=0.005) as rss:
+        images = processor.process_pdf(Path(pdf_path), dpi=dpi)
+        # La codifica avviene una pagina alla volta mentre tutte le immagini sono in memoria
+        for image in images:
+            vision_api._convert_to_base64(image)
+
+    return {
+        'baseline_mb': round(baseline_mb, 1),
+        'peak_mb': round(rss.peak_mb, 1),
+        'delta_mb': round(rss.peak_mb - baseline_mb, 1)
+    }
+
+def fit(measurements: List[Dict]) -> Dict[str, float]:
+    """
+    Stima i coefficienti del modello ai minimi quadrati.
+
+    Args:
+        measurements: Misure con delta_mb, raster_mb, pages e optimized_mb
+
+    Returns:
+        Dict[str, float]: OVERHEAD_MB, RENDER_COPIES, RETAINED_FACTOR
+    """
+    import numpy as np
+
+    features = np.array([[1.0, m['raster_mb'], m['pages'] * m['optimized_mb']] for m in measurements])
+    target = np.array([m['delta_mb'] for m in measurements])
+    coefficients, *_ = np.linalg.lstsq(features, target, rcond=None)
+    overhead, copies, retained = (max(0.0, float(c)) for c in coefficients)
+    return {
+        'OVERHEAD_MB': round(overhead, 1),
+        'RENDER_COPIES': round(copies, 2),
+        'RETAINED_FACTOR': round(retained, 2)
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Calibrazione della stima di memoria dei PDF")
+    parser.add_argument('--pages', type=int, action='append', default=None, help="Pagine, ripetibile")
+    parser.add_argument('--dpi', type=int, action='append', default=None, help="DPI di rendering, ripetibile")
+    parser.add_argument('--products-per-page', type=int, default=40)
+    parser.add_argument('--pil', action='store_true',
+                        help="Calibra il percorso con PIL (FAST_ENCODE disattivato)")
+    parser.add_argument('--output', type=Path, default=None, help="File JSON con misure e coefficienti")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    import fitz
+    from benchmarks.synthetic_pdf import generate_price_list
+    from src.config.settings import IMAGE_SETTINGS
+    from src.utils.pdf_validator import PDFValidator
+
+    fast_encode = not args.pil
+    IMAGE_SETTINGS['FAST_ENCODE'] = fast_encode
+
+    measurements = []
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages or DEFAULT_PAGES:
+            pdf_path = Path(tmp) / f"listino_{pages}.pdf"
+            generate_price_list(pdf_path, pages, args.products_per_page)
+            with fitz.open(str(pdf_path)) as document:
+                scan = PDFValidator.scan_document(document)
+            for dpi in args.dpi or DEFAULT_DPI:
+                # Un processo nuovo per misura: l'allocatore non restituisce subito la memoria
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    result = executor.submit(measure, str(pdf_path), dpi, fast_encode).result()
+                sizes = PDFValidator.memory_model_inputs(scan, dpi)
+                estimate = PDFValidator.estimate_memory_mb(scan, dpi)
+                result.update({'pages': pages, 'dpi': dpi, **sizes, 'current_estimate_mb': round(estimate, 1)})
+                measurements.append(result)
+                print(
+                    f"{pages:>4} pagine {dpi:>4} dpi  misurati {result['delta_mb']:>7.1f} MB  "
+                    f"stima attuale {result['current_estimate_mb']:>7.1f} MB"
+                )
+
+    coefficients = fit(measurements)
+    print(f"Coefficienti calibrati per PDF_SETTINGS['MEMORY_MODEL']['{'FAST_ENCODE' if fast_encode else 'PIL'}']:")
+    for name, value in coefficients.items():
+        print(f"    '{name}': {value},")
+
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(
+            json.dumps({'measurements': measurements, 'coefficients': coefficients}, indent=2), encoding='utf-8'
+        )
+        print(f"Misure salvate in: {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
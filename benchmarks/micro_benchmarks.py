@@ -0,0 +1,211 @@
+# benchmarks/micro_benchmarks.py
+
+"""
+Micro-benchmark delle fasi solo CPU: validazione, costruzione del
+DataFrame, salvataggio CSV ed esportazione Excel, a scale crescenti di
+prodotti generati da ProductGenerator.
+
+Per ogni funzione e scala riporta tempo, microsecondi per prodotto, picco
+di memoria allocata (tracemalloc) e l'esponente di crescita tra due scale
+consecutive (circa 1 per un algoritmo lineare): un esponente che cresce
+indica una regressione algoritmica. I tempi per prodotto vengono confrontati
+con baselines/micro.json: codice 1 in caso di regressione, 2 se la
+baseline manca.
+
+Esempio:
+    python -m benchmarks.micro_benchmarks
+    python -m benchmarks.micro_benchmarks --scale 10000 --scale 100000 --scale 1000000 --no-memory
+    python -m benchmarks.micro_benchmarks --function process_data --max-tiers 10
+"""
+
+import argparse
+import json
+import logging
+import math
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from benchmarks.baseline import apply_baseline
+from benchmarks.data_generator import ProductGenerator
+from src.config.settings import OUTPUT_SETTINGS
+from src.extractor.data_processor import DataProcessor
+from src.utils.json_validator import JSONValidator
+
+DEFAULT_SCALES = [10_000, 100_000]
+DEFAULT_BASELINE = Path(__file__).parent / 'baselines' / 'micro.json'
+
+def build_cases(products: List[Dict], work_dir: Path) -> Dict[str, Callable[[], object]]:
+    """
+    Prepara le funzioni da misurare su un insieme di prodotti.
+
+    Il DataFrame per CSV ed Excel viene costruito una volta sola, fuori
+    dalla misura.
+
+    Args:
+        products: Prodotti generati
+        work_dir: Directory per i file scritti
+
+    Returns:
+        Dict[str, Callable]: Nome della funzione -> chiamata senza argomenti
+    """
+    processor = DataProcessor()
+    df = processor.process_data(products, trusted=True)
+    return {
+        'validate_and_sanitize': lambda: JSONValidator.validate_and_sanitize({'prodotti': products}),
+        'process_data': lambda: processor.process_data(products),
+        'process_data_trusted': lambda: processor.process_data(products, trusted=True),
+        'save_csv': lambda: processor.save_csv(df, work_dir / 'prodotti.csv'),
+        'to_excel': lambda: processor.to_excel(df)
+    }
+
+def measure(func: Callable[[], object], with_memory: bool = True) -> Dict:
+    """
+    Misura durata e picco di memoria allocata di una chiamata.
+
+    La durata viene presa senza tracemalloc, che rallenta le allocazioni;
+    il picco di memoria con una seconda esecuzione.
+
+    Args:
+        func: Funzione da misurare
+        with_memory: Se False salta la misura della memoria
+
+    Returns:
+        Dict: seconds e peak_memory_mb
+    """
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+
+    peak_mb = None
+    if with_memory:
+        tracemalloc.start()
+        try:
+            func()
+            peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        finally:
+            tracemalloc.stop()
+    return {'seconds': round(seconds, 4), 'peak_memory_mb': round(peak_mb, 2) if peak_mb is not None else None}
+
+def run(
+    scales: List[int],
+    functions: Optional[List[str]] = None,
+    seed: int = 0,
+    max_tiers: int = 6,
+    quantity_ratio: float = 0.3,
+    with_memory: bool = True
+) -> Dict[str, Dict[str, Dict]]:
+    """
+    Esegue i micro-benchmark a ogni scala.
+
+    Args:
+        scales: Numero di prodotti per ogni esecuzione
+        functions: Funzioni da misurare (None = tutte)
+        seed: Seme del generatore
+        max_tiers: Scaglioni massimi per prodotto
+        quantity_ratio: Frazione di prodotti con prezzi per quantità
+        with_memory: Se False salta la misura della memoria
+
+    Returns:
+        Dict: funzione -> scala -> metriche
+    """
+    results: Dict[str, Dict[str, Dict]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in sorted(scales):
+            generator = ProductGenerator(seed, quantity_ratio=quantity_ratio, max_tiers=max_tiers)
+            products = generator.products(scale)
+            for name, func in build_cases(products, Path(tmp)).items():
+                if functions and name not in functions:
+                    continue
+                metrics = measure(func, with_memory)
+                metrics['us_per_product'] = round(metrics['seconds'] * 1e6 / scale, 3)
+                results.setdefault(name, {})[str(scale)] = metrics
+                print(
+                    f"{name:<24} {scale:>9} prodotti  {metrics['seconds']:>9.3f}s  "
+                    f"{metrics['us_per_product']:>9.2f} µs/prodotto  "
+                    f"{metrics['peak_memory_mb'] if metrics['peak_memory_mb'] is not None else '-':>8} MB"
+                )
+
+    # Esponente di crescita tra scale consecutive: log(t2/t1) / log(n2/n1)
+    for per_scale in results.values():
+        ordered = sorted(per_scale.items(), key=lambda item: int(item[0]))
+        for (n1, m1), (n2, m2) in zip(ordered, ordered[1:]):
+            if m1['seconds'] > 0 and m2['seconds'] > 0:
+                m2['growth_exponent'] = round(
+                    math.log(m2['seconds'] / m1['seconds']) / math.log(int(n2) / int(n1)), 2
+                )
+    return results
+
+def compare_with_baseline(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Confronta i tempi per prodotto con la baseline.
+
+    Args:
+        results: Risultati di run
+        baseline: Risultati di riferimento
+        tolerance: Tolleranza relativa (0.3 = 30%)
+
+    Returns:
+        List[str]: Descrizione delle regressioni trovate
+    """
+    regressions = []
+    for name, per_scale in results.items():
+        for scale, metrics in per_scale.items():
+            reference = baseline.get(name, {}).get(scale)
+            if not reference:
+                continue
+            if metrics['us_per_product'] > reference['us_per_product'] * (1 + tolerance):
+                regressions.append(
+                    f"{name} @ {scale}: {metrics['us_per_product']} µs/prodotto > {reference['us_per_product']}"
+                )
+            peak, reference_peak = metrics.get('peak_memory_mb'), reference.get('peak_memory_mb')
+            if peak and reference_peak and peak > reference_peak * (1 + tolerance):
+                regressions.append(f"{name} @ {scale}: picco memoria {peak} MB > {reference_peak} MB")
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark di DataProcessor ed esportazioni")
+    parser.add_argument('--scale', type=int, action='append', default=None,
+                        help="Numero di prodotti, ripetibile (predefiniti: 10000, 100000)")
+    parser.add_argument('--function', action='append', default=None, help="Funzione da misurare, ripetibile")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-tiers', type=int, default=6, help="Scaglioni massimi per prodotto")
+    parser.add_argument('--quantity-ratio', type=float, default=0.3, help="Frazione di prezzi per quantità")
+    parser.add_argument('--no-memory', action='store_true', help="Non misura la memoria (più veloce)")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.3)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--output', type=Path, default=None, help="File del report JSON")
+    args = parser.parse_args(argv)
+
+    # Gli avvisi per riga del DataProcessor falserebbero i tempi
+    logging.disable(logging.WARNING)
+
+    results = run(
+        args.scale or DEFAULT_SCALES, args.function, args.seed,
+        args.max_tiers, args.quantity_ratio, not args.no_memory
+    )
+
+    report = {
+        'timestamp': datetime.now().strftime(OUTPUT_SETTINGS['DATE_FORMAT']),
+        'seed': args.seed,
+        'max_tiers': args.max_tiers,
+        'quantity_ratio': args.quantity_ratio,
+        'results': results
+    }
+    output = args.output or OUTPUT_SETTINGS['CSV_DIR'] / 'benchmarks' / f"micro_{report['timestamp']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"Report salvato in: {output}")
+
+    return apply_baseline(results, args.baseline, args.tolerance, args.update_baseline, compare_with_baseline)
+
+if __name__ == "__main__":
+    sys.exit(main())
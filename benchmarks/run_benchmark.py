@@ -0,0 +1,318 @@
+# benchmarks/run_benchmark.py
+
+"""
+Benchmark end-to-end della pipeline su listini sintetici, con un server
+Vision simulato in locale (vedi fake_vision_server).
+
+Per ogni scenario (pagine x prodotti per pagina) genera il PDF, esegue
+rendering, estrazione, elaborazione e salvataggio CSV e riporta pagine al
+secondo, latenze p50/p95 per fase e picco di RSS. Con --baseline confronta
+i risultati con una baseline salvata (predefinita baselines/throughput.json)
+e termina con codice 1 in caso di regressione, 2 se la baseline manca.
+
+Esempio:
+    python -m benchmarks.run_benchmark --scenario 5x20 --scenario 20x60 --latency lognormal:0.5:0.3
+    python -m benchmarks.run_benchmark --error-429 0.1 --error-5xx 0.05 --baseline benchmarks/baselines/throughput.json
+    python -m benchmarks.run_benchmark --update-baseline
+    python -m benchmarks.run_benchmark --scenario 20x60 --profile sampling
+    python -m benchmarks.run_benchmark --scenario 5x40 --memory-profile
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from benchmarks.baseline import apply_baseline
+from benchmarks.fake_vision_server import FakeVisionServer, LatencyModel
+from benchmarks.synthetic_pdf import generate_price_list
+from src.config.settings import OUTPUT_SETTINGS
+from src.extractor.data_processor import DataProcessor
+from src.extractor.pdf_processor import PDFProcessor
+from src.extractor.vision_api import VisionAPI
+from src.utils.memory_profile import MemoryProfile
+from src.utils.profiler import JobProfiler, MODE_CPROFILE, MODE_SAMPLING
+
+DEFAULT_SCENARIOS = ['5x20', '20x40', '10x100']
+DEFAULT_BASELINE = Path(__file__).parent / 'baselines' / 'throughput.json'
+
+class RSSSampler:
+    """Campiona l'RSS del processo in un thread per misurarne il picco."""
+
+    def __init__(self, interval: float = 0.05):
+        """
+        Args:
+            interval: Secondi tra due campioni
+        """
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _run(self):
+        import psutil
+        process = psutil.Process()
+        while not self._stop.is_set():
+            self.peak_mb = max(self.peak_mb, process.memory_info().rss / (1024 * 1024))
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RSSSampler":
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+def parse_scenario(spec: str) -> Tuple[int, int]:
+    """
+    Interpreta uno scenario nella forma PAGINExPRODOTTI (ad es. 20x40).
+
+    Args:
+        spec: Specifica dello scenario
+
+    Returns:
+        Tuple[int, int]: (pagine, prodotti per pagina)
+    """
+    pages, products = spec.lower().split('x')
+    return int(pages), int(products)
+
+def parse_latency(spec: str) -> LatencyModel:
+    """
+    Interpreta la latenza nella forma DISTRIBUZIONE:MEDIA[:DISPERSIONE].
+
+    Args:
+        spec: Ad es. 'fixed:0.2', 'uniform:0.5:0.2', 'lognormal:0.8:0.4'
+
+    Returns:
+        LatencyModel: Modello di latenza
+    """
+    parts = spec.split(':')
+    distribution = parts[0]
+    mean = float(parts[1]) if len(parts) > 1 else 0.0
+    spread = float(parts[2]) if len(parts) > 2 else 0.0
+    return LatencyModel(distribution, mean, spread)
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """
+    Calcola un percentile con interpolazione lineare.
+
+    Args:
+        values: Campioni
+        fraction: Percentile come frazione (0.5 = mediana)
+
+    Returns:
+        Optional[float]: Valore del percentile o None senza campioni
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+@contextmanager
+def timed(samples: Dict[str, List[float]], stage: str):
+    """Aggiunge a samples[stage] la durata del blocco."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        samples.setdefault(stage, []).append(time.perf_counter() - start)
+
+def run_scenario(
+    pages: int,
+    products_per_page: int,
+    work_dir: Path,
+    latency: LatencyModel,
+    error_429_rate: float,
+    error_5xx_rate: float,
+    repeat: int = 1
+) -> Dict:
+    """
+    Esegue la pipeline completa su un listino sintetico.
+
+    Args:
+        pages: Numero di pagine
+        products_per_page: Prodotti per pagina
+        work_dir: Directory per PDF e CSV generati
+        latency: Latenza del server simulato
+        error_429_rate: Frazione di risposte 429
+        error_5xx_rate: Frazione di risposte 5xx
+        repeat: Numero di esecuzioni
+
+    Returns:
+        Dict: Metriche dello scenario
+    """
+    pdf_path = work_dir / f"listino_{pages}x{products_per_page}.pdf"
+    expected = generate_price_list(pdf_path, pages, products_per_page)
+    responses = [json.dumps({'prodotti': page_products}, ensure_ascii=False) for page_products in expected]
+
+    samples: Dict[str, List[float]] = {}
+    wall_times = []
+    extracted = 0
+    page_errors = 0
+
+    server = FakeVisionServer(responses, latency, error_429_rate, error_5xx_rate)
+    with server, RSSSampler() as rss:
+        for run in range(repeat):
+            # Ogni esecuzione riparte dalla prima risposta, allineata alla prima pagina
+            server.reset()
+            start = time.perf_counter()
+
+            with timed(samples, 'render'):
+                images = PDFProcessor().process_pdf(pdf_path)
+
+            vision_api = VisionAPI("sk-benchmark", base_url=server.base_url)
+            results = []
+            for page_number, image in enumerate(images, 1):
+                try:
+                    with timed(samples, 'extract'):
+                        results.extend(vision_api.extract_data(image, page_number=page_number))
+                except Exception as e:
+                    page_errors += 1
+                    print(f"pagina {page_number}: errore {e}", file=sys.stderr)
+
+            data_processor = DataProcessor()
+            with timed(samples, 'process'):
+                df = data_processor.process_data(results, trusted=True)
+            with timed(samples, 'save_csv'):
+                data_processor.save_csv(df, work_dir / f"risultati_{run}.csv")
+
+            wall_times.append(time.perf_counter() - start)
+            extracted = len(results)
+
+    total_time = sum(wall_times)
+    return {
+        'pages': pages,
+        'products_per_page': products_per_page,
+        'repeat': repeat,
+        'pages_per_second': round(pages * repeat / total_time, 3) if total_time else None,
+        'wall_time_seconds': round(statistics.mean(wall_times), 3),
+        'stages': {
+            stage: {
+                'count': len(values),
+                'p50': round(percentile(values, 0.5), 4),
+                'p95': round(percentile(values, 0.95), 4)
+            }
+            for stage, values in samples.items()
+        },
+        'peak_rss_mb': round(rss.peak_mb, 1),
+        'products_expected': pages * products_per_page,
+        'products_extracted': extracted,
+        'page_errors': page_errors,
+        'server': dict(server.stats)
+    }
+
+def compare_with_baseline(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """
+    Confronta i risultati con la baseline.
+
+    Sono regressioni: pagine al secondo sotto la baseline, p95 di una fase
+    o picco di RSS sopra la baseline, oltre la tolleranza relativa.
+
+    Args:
+        results: Metriche per scenario
+        baseline: Metriche di riferimento per scenario
+        tolerance: Tolleranza relativa (0.2 = 20%)
+
+    Returns:
+        List[str]: Descrizione delle regressioni trovate
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        if current['pages_per_second'] < reference['pages_per_second'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: pagine/s {current['pages_per_second']} < {reference['pages_per_second']}"
+            )
+        for stage, stats in current['stages'].items():
+            reference_p95 = reference.get('stages', {}).get(stage, {}).get('p95')
+            if reference_p95 and stats['p95'] > reference_p95 * (1 + tolerance):
+                regressions.append(f"{name}: p95 {stage} {stats['p95']}s > {reference_p95}s")
+        if current['peak_rss_mb'] > reference['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{name}: picco RSS {current['peak_rss_mb']} MB > {reference['peak_rss_mb']} MB")
+        if current['products_extracted'] < current['products_expected']:
+            regressions.append(
+                f"{name}: estratti {current['products_extracted']} prodotti su {current['products_expected']}"
+            )
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end con server Vision simulato")
+    parser.add_argument('--scenario', action='append', default=None,
+                        help="PAGINExPRODOTTI, ripetibile (predefiniti: %s)" % ", ".join(DEFAULT_SCENARIOS))
+    parser.add_argument('--latency', default='fixed:0', help="DISTRIBUZIONE:MEDIA[:DISPERSIONE] in secondi")
+    parser.add_argument('--error-429', type=float, default=0.0, help="Frazione di risposte 429")
+    parser.add_argument('--error-5xx', type=float, default=0.0, help="Frazione di risposte 5xx")
+    parser.add_argument('--repeat', type=int, default=1, help="Esecuzioni per scenario")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help="File della baseline")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="Tolleranza relativa delle regressioni")
+    parser.add_argument('--update-baseline', action='store_true', help="Salva i risultati come nuova baseline")
+    parser.add_argument('--output', type=Path, default=None, help="File del report JSON")
+    parser.add_argument('--profile', choices=[MODE_SAMPLING, MODE_CPROFILE], default=None,
+                        help="Salva un profilo di ogni scenario (pstats e stack collapsed) accanto al report")
+    parser.add_argument('--memory-profile', action='store_true',
+                        help="Aggiunge al report il profilo di memoria per fase (tracemalloc, più lento)")
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenario or DEFAULT_SCENARIOS
+    latency = parse_latency(args.latency)
+    timestamp = datetime.now().strftime(OUTPUT_SETTINGS['DATE_FORMAT'])
+    output = args.output or OUTPUT_SETTINGS['CSV_DIR'] / 'benchmarks' / f"throughput_{timestamp}.json"
+    results = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for spec in scenarios:
+            pages, products = parse_scenario(spec)
+            profiler = JobProfiler(spec, mode=args.profile).start() if args.profile else None
+            memory_profile = MemoryProfile(spec).start() if args.memory_profile else None
+            try:
+                results[spec] = run_scenario(
+                    pages, products, Path(tmp), latency, args.error_429, args.error_5xx, args.repeat
+                )
+            finally:
+                if memory_profile:
+                    memory_profile.stop()
+                if profiler:
+                    paths = profiler.save(output.parent, f"profile_{spec}_{timestamp}")
+            summary = results[spec]
+            if profiler:
+                summary['profile'] = {kind: str(path) for kind, path in paths.items()}
+            if memory_profile:
+                summary['memory_profile'] = memory_profile.summary()
+            print(
+                f"{spec:<10} {summary['pages_per_second']:>8} pagine/s  "
+                f"estrazione p50 {summary['stages']['extract']['p50']}s p95 {summary['stages']['extract']['p95']}s  "
+                f"RSS {summary['peak_rss_mb']} MB"
+            )
+
+    report = {
+        'timestamp': timestamp,
+        'latency': args.latency,
+        'error_429': args.error_429,
+        'error_5xx': args.error_5xx,
+        'scenarios': results
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+    print(f"Report salvato in: {output}")
+
+    return apply_baseline(results, args.baseline, args.tolerance, args.update_baseline, compare_with_baseline)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# benchmarks/synthetic_pdf.py
+
+"""
+Generazione di listini prezzi sintetici in PDF, con i prodotti attesi per
+ogni pagina.
+"""
+
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+project_root = Path(__file__).parent.parent
+sys.path.append(str(project_root))
+
+from benchmarks.data_generator import ProductGenerator
+
+# Formato A4 in punti
+PAGE_WIDTH = 595
+PAGE_HEIGHT = 842
+MARGIN = 40
+LINE_HEIGHT = 11
+
+def product_line(product: Dict) -> str:
+    """
+    Restituisce la riga di testo con cui un prodotto compare nel listino.
+
+    Args:
+        product: Prodotto
+
+    Returns:
+        str: Codice, descrizione e prezzi
+    """
+    if product['tipo_prezzo'] == 'singolo':
+        prezzi = f"€ {product['prezzo_unitario']:.2f}".replace('.', ',')
+    else:
+        prezzi = "  ".join(
+            f"Pz.{tier['quantita']} € {tier['prezzo']:.2f}".replace('.', ',')
+            for tier in product['prezzi_quantita']
+        )
+    return f"{product['codice']}  {product['descrizione']}  {prezzi}"
+
+def generate_price_list(path: Path, pages: int, products_per_page: int, seed: int = 0) -> List[List[Dict]]:
+    """
+    Scrive un listino sintetico con PyMuPDF.
+
+    La densità (prodotti per pagina) determina anche il corpo del testo:
+    oltre le righe disponibili i prodotti vanno su due colonne.
+
+    Args:
+        path: Percorso del PDF da creare
+        pages: Numero di pagine
+        products_per_page: Prodotti per pagina
+        seed: Seme del generatore casuale
+
+    Returns:
+        List[List[Dict]]: Prodotti attesi per pagina
+    """
+    import fitz
+
+    generator = ProductGenerator(seed, quantity_ratio=0.25, max_tiers=2)
+    rows_per_column = (PAGE_HEIGHT - 2 * MARGIN - 30) // LINE_HEIGHT
+    columns = 1 if products_per_page <= rows_per_column else 2
+    column_width = (PAGE_WIDTH - 2 * MARGIN) / columns
+    fontsize = 8 if columns == 1 else 5
+
+    expected = []
+    document = fitz.open()
+    try:
+        for page_number in range(1, pages + 1):
+            products = generator.products(products_per_page, code_prefix=f"P{page_number:03d}-")
+            expected.append(products)
+
+            page = document.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            page.insert_text((MARGIN, MARGIN), f"Listino prezzi - pagina {page_number}", fontsize=12)
+            for i, product in enumerate(products):
+                column, row = divmod(i, rows_per_column)
+                position = (MARGIN + column * column_width, MARGIN + 30 + row * LINE_HEIGHT)
+                page.insert_text(position, product_line(product), fontsize=fontsize)
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        document.save(str(path), garbage=3, deflate=True)
+    finally:
+        document.close()
+    return expected
+
+def scan_pdf(source: Path, path: Path, dpi: int = 150, quality: int = 80, grayscale: bool = False) -> Path:
+    """
+    Simula la scansione di un PDF: ogni pagina diventa un solo JPEG a tutta pagina.
+
+    Args:
+        source: PDF da "scansionare"
+        path: Percorso del PDF scansionato da creare
+        dpi: Risoluzione della scansione
+        quality: Qualità JPEG della scansione
+        grayscale: Scansione in scala di grigi
+
+    Returns:
+        Path: Percorso del PDF creato
+    """
+    import fitz
+
+    with fitz.open(str(source)) as original, fitz.open() as scanned:
+        for page in original:
+            pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY if grayscale else fitz.csRGB, alpha=False)
+            target = scanned.new_page(width=page.rect.width, height=page.rect.height)
+            target.insert_image(target.rect, stream=pix.tobytes('jpeg', jpg_quality=quality))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        scanned.save(str(path), garbage=3)
+    return path
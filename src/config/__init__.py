@@ -4,14 +4,34 @@ Package per le configurazioni del progetto.
 
 from .settings import (
     IMAGE_SETTINGS,
+    PDF_SETTINGS,
     VISION_SETTINGS,
+    HTTP_SETTINGS,
+    MEMORY_SETTINGS,
+    MEMORY_PROFILE_SETTINGS,
+    METRICS_SETTINGS,
+    ARCHIVE_SETTINGS,
+    CHECKPOINT_SETTINGS,
+    RETENTION_SETTINGS,
+    CATALOG_SETTINGS,
+    PROFILER_SETTINGS,
     LOG_SETTINGS,
     OUTPUT_SETTINGS
 )
 
 __all__ = [
     'IMAGE_SETTINGS',
+    'PDF_SETTINGS',
     'VISION_SETTINGS',
+    'HTTP_SETTINGS',
+    'MEMORY_SETTINGS',
+    'MEMORY_PROFILE_SETTINGS',
+    'METRICS_SETTINGS',
+    'ARCHIVE_SETTINGS',
+    'CHECKPOINT_SETTINGS',
+    'RETENTION_SETTINGS',
+    'CATALOG_SETTINGS',
+    'PROFILER_SETTINGS',
     'LOG_SETTINGS',
     'OUTPUT_SETTINGS'
 ]  
@@ -3,6 +3,7 @@ Configurazioni globali per il progetto.
 """
 
 import logging
+import os
 from pathlib import Path
 
 # Configurazioni per le immagini
@@ -19,18 +20,48 @@ IMAGE_SETTINGS = {
     'DPI': 200,  
     'FORMAT': 'JPEG',
     'QUALITY': 85,
+    'FAST_ENCODE': True,   # Pagina -> JPEG direttamente con PyMuPDF, alla dimensione finale
+    'GRAYSCALE': False,    # Rendering in scala di grigi (listini monocromatici, JPEG più piccoli)
+    'OPTIMIZE': False,     # Passata optimize del JPEG con PIL (lenta, guadagno di pochi punti percentuali)
+    'SCAN_PASSTHROUGH': True,   # Pagine scansionate: riusa il JPEG incorporato invece di renderizzare
+    'SCAN_MIN_COVERAGE': 0.9,   # Frazione minima della pagina coperta dall'immagine per considerarla una scansione
     'MAX_SIZE': {
         'WIDTH': 750,     # Massimizziamo il lato corto rimanendo sotto 768px
         'HEIGHT': 1060    # Manteniamo la proporzione A4 (~1.414)
     }
 }
 
+# Validazione e stima dei requisiti dei PDF
+PDF_SETTINGS = {
+    'SAMPLE_THRESHOLD_PAGES': 100,  # Oltre questo numero di pagine la scansione è a campione
+    'SAMPLE_PAGES': 20,             # Pagine esaminate in modalità a campione (distribuite uniformemente)
+    # Stima della memoria (MB = OVERHEAD + RENDER_COPIES x raster pagina + RETAINED_FACTOR x pagine x
+    # immagine ottimizzata) per percorso di rendering, calibrata con python -m benchmarks.memory_calibration
+    'MEMORY_MODEL': {
+        'FAST_ENCODE': {'OVERHEAD_MB': 1.2, 'RENDER_COPIES': 2.83, 'RETAINED_FACTOR': 0.04},
+        'PIL': {'OVERHEAD_MB': 1.7, 'RENDER_COPIES': 4.76, 'RETAINED_FACTOR': 1.35}
+    }
+}
+
 # Configurazioni per OpenAI Vision
 VISION_SETTINGS = {
     'MODEL': 'gpt-4o-mini',
     'IMAGE_DETAIL': 'high',
     'MAX_TOKENS': 1000,
     'TEMPERATURE': 0,
+    'STRUCTURED_OUTPUT': True,  # response_format json_schema; se non supportato si usa PROMPT_TEMPLATE
+    'OUTPUT_FORMAT': 'standard',  # 'standard' | 'compact' (righe posizionali, vedi COMPACT_PROMPT_TEMPLATE)
+    'STREAM': True,  # Riceve la risposta in streaming ed emette i prodotti appena completi
+    # Recupero delle risposte troncate (finish_reason == "length")
+    'TRUNCATION_STRATEGY': 'continuation',  # 'continuation' | 'split'
+    'MAX_CONTINUATIONS': 2,    # Richieste di continuazione per pagina
+    'MAX_SPLIT_DEPTH': 1,      # Livelli di suddivisione della pagina in metà
+    'SPLIT_OVERLAP': 0.1,      # Sovrapposizione tra le metà (frazione dell'altezza)
+    'MAX_PARSE_RETRIES': 1,    # Nuove richieste per risposte non interpretabili
+    'CONTINUATION_PROMPT': """La tua risposta precedente è stata interrotta per limite di lunghezza.
+Hai già estratto i prodotti con questi codici: {codici}.
+Continua l'estrazione dalla stessa immagine e restituisci, nello stesso formato JSON della risposta precedente, SOLO i prodotti non ancora estratti.
+Non ripetere i prodotti già estratti. DEVI RISPONDERE SOLO ED ESCLUSIVAMENTE IN FORMATO JSON.""",
     'PROMPT_TEMPLATE': """Sei un assistente specializzato nell'estrazione di dati strutturati da listini prezzi.
 
 Analizza questa immagine di un listino prezzi ed estrai i dati richiesti.
@@ -105,12 +136,156 @@ ESEMPI CORRETTI di output per prodotti con varianti:
     ]
 }
 
-RICORDA: NON OMETTERE MAI nessuna variante dimensionale. Se vedi più codici con misure diverse ma stesso prezzo, devi creare un record separato per OGNUNO di essi."""
+RICORDA: NON OMETTERE MAI nessuna variante dimensionale. Se vedi più codici con misure diverse ma stesso prezzo, devi creare un record separato per OGNUNO di essi.""",
+    # Prompt usato con gli structured output: la struttura della risposta è
+    # imposta dallo schema, quindi qui restano solo le regole di estrazione
+    'STRUCTURED_PROMPT_TEMPLATE': """Sei un assistente specializzato nell'estrazione di dati strutturati da listini prezzi.
+Estrai tutti i prodotti presenti in questa immagine di un listino prezzi.
+
+**ATTENZIONE:** se un prodotto ha più misure/varianti (codici diversi) con lo stesso prezzo, crea un record separato per OGNI variante, con il proprio codice e la misura nella descrizione.
+Esempio: "COD. RC330-40 Misura 40 cm / COD. RC330-46 Misura 46 cm / € 148,00 cad." diventa due prodotti da 148.0.
+
+I prezzi seguono due schemi:
+1. tipo_prezzo "singolo": un unico prezzo unitario in prezzo_unitario; prezzi_quantita e descrizione_quantita sono null.
+2. tipo_prezzo "quantita": prezzi per quantità in prezzi_quantita (il primo prezzo è associato alla quantità minima, es. "39,00 PER Pz. 4"); prezzo_unitario è null.
+   La nota "non vendibili separatamente" indica che la quantità minima è obbligatoria (non_vendibile_separatamente = true); riportala in descrizione_quantita (es. "Confezione: Pz.4 non vendibili separatamente").
+
+Usa il punto come separatore decimale. NON OMETTERE MAI nessuna variante.""",
+    # Formato compatto: una riga posizionale per prodotto, espansa localmente
+    # da src.utils.compact_format prima della validazione
+    'COMPACT_PROMPT_TEMPLATE': """Sei un assistente specializzato nell'estrazione di dati strutturati da listini prezzi.
+Estrai tutti i prodotti presenti in questa immagine di un listino prezzi.
+DEVI RISPONDERE SOLO ED ESCLUSIVAMENTE IN FORMATO JSON, senza alcun testo aggiuntivo, in questa forma compatta:
+
+{"r": [[codice, descrizione, tipo, prezzo_unitario, descrizione_quantita, scaglioni], ...]}
+
+- tipo: "s" per prezzo singolo, "q" per prezzi per quantità
+- prezzo_unitario: numero se tipo è "s", altrimenti null
+- descrizione_quantita: testo sulla confezione (es. "Confezione: Pz.4 non vendibili separatamente") oppure null
+- scaglioni: solo se tipo è "q", lista di [quantita, prezzo, quantita_minima, non_vendibile_separatamente] con i flag 0/1; altrimenti null
+  (il primo prezzo è associato alla quantità minima, es. "39,00 PER Pz. 4" -> [4, 39.0, 1, 0])
+
+Esempio:
+{"r": [
+["RC330-40", "Sedia comoda reclinabile - Misura 40 cm", "s", 148.0, null, null],
+["RC330-46", "Sedia comoda reclinabile - Misura 46 cm", "s", 148.0, null, null],
+["GU100", "Guanti in nitrile", "q", null, "Confezione: Pz.4 non vendibili separatamente", [[4, 39.0, 1, 1], [12, 35.0, 0, 1]]]
+]}
+
+**ATTENZIONE:** se un prodotto ha più misure/varianti (codici diversi) con lo stesso prezzo, crea una riga separata per OGNI variante.
+Usa il punto come separatore decimale. NON OMETTERE MAI nessuna variante."""
+}
+
+# Configurazioni per il client HTTP condiviso verso OpenAI
+HTTP_SETTINGS = {
+    'MAX_CONNECTIONS': 20,            # Connessioni totali nel pool
+    'MAX_KEEPALIVE_CONNECTIONS': 10,  # Connessioni mantenute aperte tra le richieste
+    'KEEPALIVE_EXPIRY': 60.0,         # Secondi prima di chiudere una connessione inattiva
+    'HTTP2': True,                    # Usato solo se il pacchetto h2 è installato
+    'CONNECT_TIMEOUT': 10.0,
+    'READ_TIMEOUT': 120.0,            # Una pagina densa può richiedere decine di secondi
+    'WRITE_TIMEOUT': 30.0,
+    'POOL_TIMEOUT': 10.0,
+    # Nessun retry nell'SDK: ritenta solo RetryManager (3 tentativi). Nel caso
+    # peggiore una pagina attende 3 x READ_TIMEOUT più 1 + 2 s di backoff
+    'SDK_MAX_RETRIES': 0
+}
+
+# Governo della memoria del processo (condiviso da tutte le sessioni Streamlit)
+MEMORY_SETTINGS = {
+    'RSS_SOFT_LIMIT_MB': 1024,      # Oltre questa soglia si rallenta e si degrada la qualità
+    'RSS_HARD_LIMIT_MB': 2048,      # Oltre questa soglia i nuovi job restano in coda
+    'MIN_AVAILABLE_SOFT_MB': 1024,  # Memoria libera di sistema sotto cui scatta la pressione lieve
+    'MIN_AVAILABLE_HARD_MB': 256,   # Memoria libera di sistema sotto cui scatta la pressione grave
+    'MAX_CONCURRENT_JOBS': 2,       # Elaborazioni contemporanee ammesse
+    'ADMISSION_TIMEOUT': 120.0,     # Secondi massimi di attesa in coda per un nuovo job
+    'RSS_ADMISSION_WAIT': 10.0,     # Senza altri job, attesa dopo cui un RSS alto non blocca più l'ammissione
+    'DEGRADED_DPI': 120,            # Risoluzione di rendering sotto pressione
+    'THROTTLE_DELAY': 0.5,          # Pausa prima di ogni pagina sotto pressione lieve
+    'MAX_THROTTLE_WAIT': 30.0,      # Attesa massima sotto pressione grave prima di interrompere
+    'SAMPLE_INTERVAL': 0.5          # Intervallo di campionamento durante le attese
+}
+
+# Profilazione su richiesta dei job (vedi src.utils.profiler)
+PROFILER_SETTINGS = {
+    'MODE': 'sampling',         # 'sampling' (overhead basso) | 'cprofile' (deterministico, più costoso)
+    'SAMPLE_INTERVAL': 0.01,    # Secondi tra due campioni degli stack
+    'MAX_STACK_DEPTH': 64       # Frame registrati per campione (dalla foglia)
+}
+
+# Profilo di memoria per fase con tracemalloc (vedi src.utils.memory_profile)
+MEMORY_PROFILE_SETTINGS = {
+    'TRACE_FRAMES': 1,          # Frame registrati per allocazione (1 = solo la riga)
+    'TOP_SITES': 10,            # Punti di allocazione riportati per fase
+    'SNAPSHOTS_PER_STAGE': 2    # Occorrenze di ogni fase con snapshot (gli snapshot sono costosi)
+}
+
+# Esportazione delle metriche (formato OpenMetrics / Prometheus)
+METRICS_SETTINGS = {
+    # Porta dell'endpoint HTTP /metrics (variabile d'ambiente METRICS_PORT; vuota = disattivato)
+    'HTTP_PORT': int(os.getenv('METRICS_PORT')) if os.getenv('METRICS_PORT') else None,
+    'HTTP_ADDR': os.getenv('METRICS_ADDR', '127.0.0.1'),
+    # File .prom per il textfile collector di node-exporter (METRICS_TEXTFILE; vuoto = disattivato)
+    'TEXTFILE': os.getenv('METRICS_TEXTFILE', ''),
+    'TEXTFILE_INTERVAL': 15.0       # Secondi tra due scritture del textfile
+}
+
+# Journal dei checkpoint di elaborazione (vedi src.utils.checkpoint_manager)
+CHECKPOINT_SETTINGS = {
+    'DIR': Path('temp/checkpoints'),
+    'FSYNC_EVERY': 8,          # Record scritti tra due fsync del journal
+    'FSYNC_INTERVAL': 2.0,     # Secondi massimi tra due fsync
+    'COMPACT_RECORDS': 64      # Aggiornamenti dopo i quali il journal viene compattato in un'istantanea
+}
+
+# Archivio delle risposte grezze dell'API (vedi src.utils.response_archive)
+ARCHIVE_SETTINGS = {
+    'ENABLED': True,
+    'DIR': Path('output/responses'),  # Un file <job>.jsonl.gz per job più index.jsonl
+    'COMPRESS_LEVEL': 6,              # Livello gzip di ogni record
+    'FLUSH_TIMEOUT': 10.0,            # Secondi di attesa per le scritture pendenti alla chiusura
+    'REPLAY_WORKERS': None,           # Processi per il replay (None = numero di core)
+    'REPLAY_CHUNK_PAGES': 64          # Pagine per unità di lavoro del replay
+}
+
+# Indice dei prodotti di tutte le sessioni (vedi src.utils.catalog_index)
+CATALOG_SETTINGS = {
+    'ENABLED': True,
+    'PATH': Path('output/catalog.sqlite3'),  # Fuori dalle directory gestite dalla conservazione dei file
+    'SEARCH_LIMIT': 50,                      # Risultati massimi della ricerca testuale
+    'HISTORY_EDITIONS': 5                    # Edizioni mostrate nello storico prezzi
+}
+
+# Conservazione dei file su disco (vedi src.utils.retention): budget in byte
+# complessivo e per categoria, rimozione dei gruppi usati meno di recente
+RETENTION_SETTINGS = {
+    'ENABLED': True,
+    'MAX_BYTES': 2 * 1024 ** 3,          # Budget complessivo (2 GB)
+    'INTERVAL': 300.0,                   # Secondi tra due controlli in background
+    'IN_USE_SECONDS': 3600.0,            # I gruppi usati da meno di così non vengono rimossi
+    'CLEANUP_MAX_AGE_DAYS': 7,           # Pulsante di pulizia: rimuove i gruppi non usati da questi giorni
+    'INDEX_FILE': Path('temp/retention_index.json'),
+    'CATEGORIES': {
+        'uploads': {'DIRS': [Path('temp/uploads')], 'MAX_BYTES': 1024 ** 3},
+        'results': {'DIRS': [Path('temp/results')], 'MAX_BYTES': 256 * 1024 ** 2},
+        'checkpoints': {
+            'DIRS': [CHECKPOINT_SETTINGS['DIR'] / 'current', CHECKPOINT_SETTINGS['DIR'] / 'history'],
+            'MAX_BYTES': 128 * 1024 ** 2
+        },
+        'responses': {'DIRS': [ARCHIVE_SETTINGS['DIR']], 'MAX_BYTES': 512 * 1024 ** 2},
+        'json': {'DIRS': [Path('output/json')], 'MAX_BYTES': 64 * 1024 ** 2}  # Risposte salvate dalle versioni precedenti
+    }
 }
 
 # Configurazioni per il logging
 LOG_SETTINGS = {
-    'LEVEL': logging.DEBUG,
+    # Livello predefinito (variabile d'ambiente LOG_LEVEL, ad es. DEBUG)
+    'LEVEL': logging.getLevelName(os.getenv('LOG_LEVEL', 'INFO').upper()),
+    # Livelli per modulo, ad es. LOG_LEVELS="src.extractor.vision_api=DEBUG,src.utils=WARNING"
+    'MODULE_LEVELS': os.getenv('LOG_LEVELS', ''),
+    # Contenuti voluminosi (risposte API): lunghezza massima e frazione registrata per intero
+    'PAYLOAD_MAX_CHARS': 500,
+    'PAYLOAD_SAMPLE_RATE': 0.1,
     'FORMAT': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
     'DATE_FORMAT': '%Y-%m-%d %H:%M:%S',
     'FILE': Path('logs/latest.log'),
@@ -122,5 +297,6 @@ LOG_SETTINGS = {
 OUTPUT_SETTINGS = {
     'CSV_DIR': Path('output'),
     'TEMP_DIR': Path('temp'),
+    'SPOOL_CHUNK_SIZE': 1024 * 1024,  # Blocchi da 1 MB per la copia su disco dei file caricati
     'DATE_FORMAT': '%Y%m%d_%H%M%S'
 }
\ No newline at end of file
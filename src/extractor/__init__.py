@@ -1,12 +1,32 @@
 """
 Package per l'estrazione e l'elaborazione dei dati da PDF.
+
+Le classi esportate vengono importate solo al primo accesso, così che
+importare un singolo modulo non carichi le dipendenze degli altri.
 """
 
-from .pdf_processor import PDFProcessor
-from .vision_api import VisionAPI
-from .data_processor import DataProcessor
+import importlib
+
+# Nome esportato -> modulo che lo definisce
+_EXPORTS = {
+    'PDFProcessor': '.pdf_processor',
+    'VisionAPI': '.vision_api',
+    'DataProcessor': '.data_processor',
+    'replay_jobs': '.replay',
+    'replay_session': '.replay'
+}
 
-__all__ = ['PDFProcessor', 'VisionAPI', 'DataProcessor']
+__all__ = list(_EXPORTS)
 
 # Versione del package
-__version__ = '0.1.0'
\ No newline at end of file
+__version__ = '0.1.0'
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
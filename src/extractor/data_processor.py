@@ -2,13 +2,17 @@
 Modulo per l'elaborazione dei dati estratti e la generazione di CSV.
 """
 
-import pandas as pd
 import json
 from pathlib import Path
-from typing import List, Dict
+from typing import TYPE_CHECKING, List, Dict
 from src.utils.logger import setup_logger
 from src.config.settings import VISION_SETTINGS
 from src.utils.json_validator import JSONValidator, JSONValidationError
+from src.utils.timing import timed, span
+from src.utils.metrics import PRODUCTS_EXTRACTED
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = setup_logger(__name__)
 
@@ -25,6 +29,7 @@ class DataProcessor:
         """Inizializza il processore dati."""
         logger.debug("Inizializzazione DataProcessor")
     
+    @timed('catalog_validation')
     def _validate_input_data(self, data: List[Dict]) -> List[Dict]:
         """
         Valida e sanitizza i dati di input.
@@ -56,12 +61,16 @@ class DataProcessor:
             logger.error(f"Errore nella validazione dei dati: {str(e)}")
             raise DataProcessorError(f"Errore nella validazione dei dati: {str(e)}")
             
-    def process_data(self, data: List[Dict]) -> pd.DataFrame:
+    @timed('process_data')
+    def process_data(self, data: List[Dict], trusted: bool = False) -> "pd.DataFrame":
         """
         Elabora i dati JSON in DataFrame con gestione dei due tipi di prezzo.
         
         Args:
             data: Lista di dizionari con i dati dei prodotti
+            trusted: Se True, i dati sono già stati validati pagina per pagina
+                (ad es. da VisionAPI.extract_data) e la validazione a livello
+                di catalogo viene saltata
             
         Returns:
             pd.DataFrame: DataFrame con i dati elaborati
@@ -69,9 +78,17 @@ class DataProcessor:
         Raises:
             DataProcessorError: Se si verificano errori durante l'elaborazione
         """
+        # Import differito: pandas serve solo quando si costruisce il DataFrame
+        import pandas as pd
+        
         try:
-            # Valida e sanitizza i dati di input
-            validated_data = self._validate_input_data(data)
+            # Valida e sanitizza i dati di input, salvo che siano già validati
+            if trusted:
+                if data is None:
+                    raise DataProcessorError("Dati di input mancanti")
+                validated_data = data
+            else:
+                validated_data = self._validate_input_data(data)
             
             if not validated_data:
                 logger.warning("Nessun dato valido da processare")
@@ -116,7 +133,9 @@ class DataProcessor:
                     row[col] = None
                 
                 if prodotto['tipo_prezzo'] == 'singolo':
-                    row['prezzo_unitario'] = float(prodotto.get('prezzo_unitario', 0))
+                    # Il validatore lascia None se il prezzo non è leggibile
+                    prezzo_unitario = prodotto.get('prezzo_unitario')
+                    row['prezzo_unitario'] = float(prezzo_unitario) if prezzo_unitario is not None else None
                 
                 elif prodotto['tipo_prezzo'] == 'quantita':
                     prezzi_quantita = prodotto.get('prezzi_quantita', [])
@@ -148,13 +167,14 @@ class DataProcessor:
             # Conversione booleani
             df['non_vendibile_separatamente'] = df['non_vendibile_separatamente'].astype(bool)
             
+            PRODUCTS_EXTRACTED.inc(len(df), stage='process')
             return df
             
         except Exception as e:
             logger.error(f"Errore nell'elaborazione dei dati: {str(e)}")
             raise DataProcessorError(f"Errore nell'elaborazione dei dati: {str(e)}")
             
-    def save_csv(self, df: pd.DataFrame, output_path: Path) -> None:
+    def save_csv(self, df: "pd.DataFrame", output_path: Path) -> None:
         """
         Salva il DataFrame in formato CSV.
         
@@ -167,10 +187,29 @@ class DataProcessor:
             output_path.parent.mkdir(parents=True, exist_ok=True)
             
             # Salva il CSV
-            df.to_csv(output_path, index=False)
+            with span('save_csv'):
+                df.to_csv(output_path, index=False)
             logger.info(f"File CSV salvato in: {output_path}")
             
         except Exception as e:
             logger.error(f"Errore durante il salvataggio del CSV: {str(e)}")
             raise
-            
\ No newline at end of file
+
+    def to_excel(self, df: "pd.DataFrame", sheet_name: str = 'Listino') -> bytes:
+        """
+        Esporta il DataFrame in un file Excel in memoria.
+        
+        Args:
+            df: DataFrame da esportare
+            sheet_name: Nome del foglio
+            
+        Returns:
+            bytes: Contenuto del file .xlsx
+        """
+        import io
+        import pandas as pd
+        
+        output = io.BytesIO()
+        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+            df.to_excel(writer, sheet_name=sheet_name, index=False)
+        return output.getvalue()
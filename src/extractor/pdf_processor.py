@@ -1,13 +1,14 @@
 # src/extractor/pdf_processor.py
 
-import fitz  # PyMuPDF
 from PIL import Image
-import io
 from pathlib import Path
-from typing import List
+from typing import List, Optional, Union
 from src.config.settings import IMAGE_SETTINGS
 from src.utils.logger import setup_logger
-from src.utils.image_utils import optimize_image
+from src.utils.timing import span, page_context
+from src.utils.metrics import PAGES_PROCESSED
+from src.utils.memory_governor import JobMemoryTracker, MemoryPressureError, LEVEL_OK
+from src.utils.image_utils import PageImage, extract_scanned_page, optimize_image, render_page
 from src.utils.pdf_validator import PDFValidator, PDFValidationError
 
 logger = setup_logger(__name__)
@@ -19,42 +20,64 @@ class PDFProcessor:
         """Inizializza il processore PDF."""
         self.validator = PDFValidator()
 
-    def process_pdf(self, pdf_file, dpi: int = IMAGE_SETTINGS['DPI']) -> List[Image.Image]:
+    def process_pdf(
+        self,
+        pdf_file,
+        dpi: int = IMAGE_SETTINGS['DPI'],
+        memory_job: Optional[JobMemoryTracker] = None,
+        grayscale: Optional[bool] = None
+    ) -> List[Union[PageImage, Image.Image]]:
         """
         Converte PDF in immagini mantenendole in memoria.
         
+        Con IMAGE_SETTINGS['FAST_ENCODE'] ogni pagina viene rasterizzata
+        direttamente alla dimensione finale e codificata in JPEG da PyMuPDF
+        (PageImage); altrimenti si ottengono immagini PIL ridotte con
+        optimize_image. Con IMAGE_SETTINGS['SCAN_PASSTHROUGH'] le pagine
+        scansionate (una sola immagine a tutta pagina) riusano l'immagine
+        incorporata senza rendering (vedi extract_scanned_page).
+        
+        Il percorso su disco è l'input preferito: PyMuPDF apre il file
+        direttamente senza copie del contenuto in memoria. UploadedFile e
+        file object restano supportati ma richiedono di leggere il contenuto.
+        
+        Con un memory_job il rendering di ogni pagina passa dal governor della
+        memoria, che può rallentarlo, ridurne la risoluzione o interromperlo.
+        
         Args:
-            pdf_file: File PDF da processare (può essere UploadedFile, Path o file object)
+            pdf_file: File PDF da processare (Path, UploadedFile o file object)
             dpi: Risoluzione delle immagini
+            memory_job: Tracker della memoria del job (vedi MemoryGovernor.admit)
+            grayscale: Rendering in scala di grigi (solo FAST_ENCODE); se None
+                usa IMAGE_SETTINGS['GRAYSCALE']
             
         Returns:
-            List[Image.Image]: Lista delle immagini PIL
+            List[Union[PageImage, Image.Image]]: Pagine codificate o immagini PIL
             
         Raises:
             PDFValidationError: Se il PDF non supera la validazione
+            MemoryPressureError: Se la memoria non consente di proseguire
         """
+        import fitz  # PyMuPDF, import differito perché pesante
+        
         logger.info("Inizia processamento PDF")
         
         try:
-            # Ottieni il contenuto del PDF in base al tipo di input
-            if hasattr(pdf_file, 'getvalue'):
-                # Se è un UploadedFile di Streamlit
-                pdf_content = pdf_file.getvalue()
-            elif hasattr(pdf_file, 'read'):
-                # Se è un file object (BufferedReader)
-                pdf_content = pdf_file.read()
-            elif isinstance(pdf_file, (str, Path)):
-                # Se è un percorso file
-                pdf_content = Path(pdf_file).read_bytes()
-            else:
-                raise PDFValidationError("Tipo di file non supportato")
-            
-            # Validazione preliminare usando BytesIO
-            pdf_stream = io.BytesIO(pdf_content)
             pdf_document = None
             
             try:
-                pdf_document = fitz.open(stream=pdf_stream)
+                # Apri il PDF in base al tipo di input
+                if isinstance(pdf_file, (str, Path)):
+                    # Percorso file: nessuna copia del contenuto in memoria
+                    pdf_document = fitz.open(str(pdf_file))
+                elif hasattr(pdf_file, 'getvalue'):
+                    # Se è un UploadedFile di Streamlit
+                    pdf_document = fitz.open(stream=pdf_file.getvalue(), filetype="pdf")
+                elif hasattr(pdf_file, 'read'):
+                    # Se è un file object (BufferedReader)
+                    pdf_document = fitz.open(stream=pdf_file.read(), filetype="pdf")
+                else:
+                    raise PDFValidationError("Tipo di file non supportato")
                 
                 # Verifica se il PDF è crittografato
                 if pdf_document.is_encrypted:
@@ -64,44 +87,76 @@ class PDFProcessor:
                 if pdf_document.page_count == 0:
                     raise PDFValidationError("Il PDF non contiene pagine")
                 
+                # Una sola scansione del documento, riusata da controllo e stima
+                with span('pdf_scan'):
+                    scan = self.validator.scan_document(pdf_document)
+                
                 # Controllo struttura
-                is_structure_valid, structure_error = self.validator.check_pdf_structure(pdf_document)
+                is_structure_valid, structure_error = self.validator.check_pdf_structure(pdf_document, scan)
                 if not is_structure_valid:
                     raise PDFValidationError(structure_error)
                 
                 # Stima requisiti
-                requirements = self.validator.estimate_processing_requirements(pdf_document)
+                requirements = self.validator.estimate_processing_requirements(pdf_document, scan, dpi)
                 logger.info(f"Requisiti stimati: {requirements}")
                 
                 # Lista per le immagini in memoria
                 images = []
+                fast_encode = IMAGE_SETTINGS['FAST_ENCODE']
+                scan_passthrough = fast_encode and IMAGE_SETTINGS['SCAN_PASSTHROUGH']
+                grayscale = IMAGE_SETTINGS['GRAYSCALE'] if grayscale is None else grayscale
+                max_size = (IMAGE_SETTINGS['MAX_SIZE']['WIDTH'], IMAGE_SETTINGS['MAX_SIZE']['HEIGHT'])
                 
                 # Converti le pagine con gestione errori per pagina
                 for page_num in range(pdf_document.page_count):
+                    if memory_job:
+                        memory_job.throttle(f"rendering pagina {page_num + 1}")
+                        page_dpi = memory_job.render_dpi(dpi)
+                    else:
+                        page_dpi = dpi
+                    
                     try:
-                        page = pdf_document[page_num]
-                        zoom = dpi / 72
-                        mat = fitz.Matrix(zoom, zoom)
-                        pix = page.get_pixmap(matrix=mat)
-                        
-                        # Converti in immagine PIL
-                        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                        
-                        # Ottimizza l'immagine
-                        optimized = optimize_image(img, (
-                            IMAGE_SETTINGS['MAX_SIZE']['WIDTH'],
-                            IMAGE_SETTINGS['MAX_SIZE']['HEIGHT']
-                        ))
+                        if fast_encode:
+                            with page_context(page_num + 1), span('render'):
+                                page = pdf_document[page_num]
+                                image = None
+                                if scan_passthrough:
+                                    image = extract_scanned_page(page, page_dpi, max_size, grayscale)
+                                if image is None:
+                                    image = render_page(page, page_dpi, max_size, grayscale)
+                                else:
+                                    PAGES_PROCESSED.inc(stage='scan_extract', outcome='ok')
+                                    logger.debug(f"Pagina {page_num + 1}: immagine scansionata riusata senza rendering")
+                                images.append(image)
+                        else:
+                            with page_context(page_num + 1):
+                                with span('render'):
+                                    page = pdf_document[page_num]
+                                    zoom = page_dpi / 72
+                                    mat = fitz.Matrix(zoom, zoom)
+                                    pix = page.get_pixmap(matrix=mat)
+                                    
+                                    # Converti in immagine PIL
+                                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                                
+                                # Ottimizza l'immagine
+                                optimized = optimize_image(img, max_size)
+                            
+                            images.append(optimized)
+                            
+                            # Libera memoria
+                            del pix
+                            del img
                         
-                        images.append(optimized)
-                        
-                        # Libera memoria
-                        del pix
-                        del img
+                        PAGES_PROCESSED.inc(stage='render', outcome='ok' if page_dpi == dpi else 'degraded')
+                        # Sotto pressione libera subito i buffer del rendering
+                        if memory_job and memory_job.level != LEVEL_OK:
+                            memory_job.governor.cleanup()
                         
                         logger.debug(f"Pagina {page_num + 1} convertita con successo")
                         
                     except Exception as e:
+                        PAGES_PROCESSED.inc(stage='render', outcome='failed')
                         logger.error(f"Errore nella conversione della pagina {page_num + 1}: {e}")
                         # Continua con la prossima pagina invece di fallire completamente
                         continue
@@ -112,7 +167,7 @@ class PDFProcessor:
                 logger.info(f"Generate {len(images)} immagini in memoria")
                 return images
                 
-            except PDFValidationError:
+            except (PDFValidationError, MemoryPressureError):
                 raise
                 
             except Exception as e:
@@ -123,35 +178,10 @@ class PDFProcessor:
                 # Chiudi il documento PDF se è stato aperto
                 if pdf_document:
                     pdf_document.close()
-                # Chiudi lo stream
-                pdf_stream.close()
                         
+        except MemoryPressureError:
+            raise
+            
         except Exception as e:
             logger.error(f"Errore nel processo PDF: {e}")
             raise PDFValidationError(f"Errore durante il processo PDF: {str(e)}")
-
-    def _check_memory_usage(self) -> float:
-        """
-        Controlla l'uso della memoria corrente.
-        
-        Returns:
-            float: Percentuale di memoria utilizzata
-        """
-        try:
-            import psutil
-            process = psutil.Process()
-            memory_info = process.memory_info()
-            return memory_info.rss / psutil.virtual_memory().total
-        except ImportError:
-            logger.warning("psutil non installato, impossibile monitorare la memoria")
-            return 0.0
-        except Exception as e:
-            logger.error(f"Errore nel controllo della memoria: {e}")
-            return 0.0
-
-    def _cleanup_memory(self):
-        """
-        Forza il garbage collector per liberare memoria.
-        """
-        import gc
-        gc.collect()
\ No newline at end of file
@@ -0,0 +1,263 @@
+# src/extractor/replay.py
+
+"""
+Rielaborazione delle risposte archiviate senza chiamare l'API.
+
+Le risposte grezze di ogni job (vedi src.utils.response_archive) vengono
+interpretate di nuovo con il codice corrente (parsing, validazione e
+DataProcessor.process_data), in parallelo su più processi: dopo una
+modifica alle regole di sanitizzazione o alle colonne la tabella di una
+sessione, o dell'intero archivio, si rigenera in pochi secondi e senza
+costi.
+
+Esempio:
+    python -m src.extractor.replay --session 20240101_120000
+    python -m src.extractor.replay --all --output-dir output/replay
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
+
+from src.config.settings import ARCHIVE_SETTINGS, CATALOG_SETTINGS, OUTPUT_SETTINGS
+from src.utils.logger import setup_logger
+from src.utils.response_archive import ARCHIVE_SUFFIX, ResponseArchive
+
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.extractor.vision_api import VisionAPI
+
+logger = setup_logger(__name__)
+
+# Directory dei risultati delle sessioni (vedi SessionManager.save_results)
+RESULTS_DIR = OUTPUT_SETTINGS['TEMP_DIR'] / 'results'
+
+# Mai usata: VisionAPI ottiene il client HTTP solo alla prima richiesta
+_OFFLINE_API_KEY = 'replay-offline'
+
+_parser: Optional["VisionAPI"] = None
+
+def _get_parser() -> "VisionAPI":
+    """Restituisce il VisionAPI usato per interpretare le risposte nel processo corrente."""
+    global _parser
+    if _parser is None:
+        from src.extractor.vision_api import VisionAPI
+        _parser = VisionAPI(_OFFLINE_API_KEY)
+    return _parser
+
+def replay_record(record: Dict) -> Tuple[List[Dict], int]:
+    """
+    Interpreta di nuovo le risposte archiviate di una pagina.
+
+    Ogni risposta (richiesta iniziale, continuazioni, metà di una pagina
+    divisa) passa per lo stesso parsing e la stessa validazione
+    dell'estrazione; i prodotti vengono uniti eliminando i duplicati.
+
+    Args:
+        record: Record della pagina letto dall'archivio
+
+    Returns:
+        Tuple[List[Dict], int]: (prodotti validati, risposte non interpretabili)
+    """
+    from src.extractor.vision_api import UnparseableResponseError
+    from src.utils.json_recovery import merge_products
+
+    parser = _get_parser()
+    products: List[Dict] = []
+    failures = 0
+    for response in record['responses']:
+        parser.structured_output = response['structured_output']
+        parser.output_format = response['output_format']
+        try:
+            page_products = parser._parse_content(
+                (response['content'] or '').strip(),
+                record['page'],
+                truncated=response['finish_reason'] == 'length'
+            )
+        except UnparseableResponseError:
+            failures += 1
+            continue
+        products = merge_products(products, page_products)
+    return products, failures
+
+def _replay_chunk(records: List[Dict]) -> List[Tuple[str, Optional[int], List[Dict], int]]:
+    """Rielabora un gruppo di pagine (eseguita nei processi di lavoro)."""
+    return [(record['job_id'], record['page'], *replay_record(record)) for record in records]
+
+def _build_table(products: List[Dict]) -> "pd.DataFrame":
+    """Costruisce la tabella di un job (eseguita nei processi di lavoro)."""
+    from src.extractor.data_processor import DataProcessor
+    return DataProcessor().process_data(products, trusted=True)
+
+def _read_job(job_id: str, directory: Path) -> List[Dict]:
+    """Legge i record di un job, tenendo per ogni pagina l'ultimo archiviato."""
+    pages: Dict[Optional[int], Dict] = {}
+    for record in ResponseArchive.read(directory / f"{job_id}{ARCHIVE_SUFFIX}"):
+        pages[record['page']] = record
+    return [pages[page] for page in sorted(pages, key=lambda page: (page is None, page or 0))]
+
+def _chunks(records: List[Dict], size: int) -> Iterable[List[Dict]]:
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
+
+def replay_jobs(
+    job_ids: Optional[List[str]] = None,
+    directory: Optional[Path] = None,
+    workers: Optional[int] = None,
+    chunk_pages: Optional[int] = None
+) -> Dict[str, Dict]:
+    """
+    Rigenera i risultati di uno o più job dalle risposte archiviate.
+
+    Le pagine vengono interpretate a gruppi in un pool di processi; le
+    tabelle dei job vengono poi costruite nello stesso pool.
+
+    Args:
+        job_ids: Job da rielaborare; se None tutti quelli dell'archivio
+        directory: Directory dell'archivio; se None usa ARCHIVE_SETTINGS['DIR']
+        workers: Processi di lavoro; se None usa ARCHIVE_SETTINGS['REPLAY_WORKERS']
+            (None = numero di core). Con 1 tutto avviene nel processo corrente
+        chunk_pages: Pagine per unità di lavoro; se None usa
+            ARCHIVE_SETTINGS['REPLAY_CHUNK_PAGES']
+
+    Returns:
+        Dict[str, Dict]: Per job: dataframe, products, pages e failed_responses
+    """
+    directory = Path(directory or ARCHIVE_SETTINGS['DIR'])
+    job_ids = job_ids if job_ids is not None else ResponseArchive.jobs(directory)
+    workers = workers or ARCHIVE_SETTINGS['REPLAY_WORKERS']
+    chunk_pages = chunk_pages or ARCHIVE_SETTINGS['REPLAY_CHUNK_PAGES']
+
+    records = {job_id: _read_job(job_id, directory) for job_id in job_ids}
+    chunks = [chunk for job_records in records.values() for chunk in _chunks(job_records, chunk_pages)]
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers != 1 else None
+    try:
+        if executor:
+            parsed = [page for pages in executor.map(_replay_chunk, chunks) for page in pages]
+        else:
+            parsed = [page for chunk in chunks for page in _replay_chunk(chunk)]
+
+        results = {
+            job_id: {'products': [], 'pages': len(job_records), 'failed_responses': 0}
+            for job_id, job_records in records.items()
+        }
+        for job_id, _, products, failures in parsed:
+            results[job_id]['products'].extend(products)
+            results[job_id]['failed_responses'] += failures
+
+        with_products = [job_id for job_id in job_ids if results[job_id]['products']]
+        products = [results[job_id]['products'] for job_id in with_products]
+        tables = executor.map(_build_table, products) if executor else map(_build_table, products)
+        for job_id, table in zip(with_products, tables):
+            results[job_id]['dataframe'] = table
+    finally:
+        if executor:
+            executor.shutdown()
+
+    for job_id, result in results.items():
+        result.setdefault('dataframe', None)
+        logger.info(
+            f"Replay del job {job_id}: {result['pages']} pagine, {len(result['products'])} prodotti, "
+            f"{result['failed_responses']} risposte non interpretabili"
+        )
+    return results
+
+def _session_archive(timestamp: str, results_dir: Path) -> Path:
+    """Percorso dell'archivio delle risposte di una sessione salvata."""
+    metadata_path = results_dir / f"metadata_{timestamp}.json"
+    if not metadata_path.exists():
+        raise FileNotFoundError(f"Sessione {timestamp} non trovata in {results_dir}")
+    with open(metadata_path, encoding='utf-8') as f:
+        archive = json.load(f).get('response_archive')
+    if not archive:
+        raise FileNotFoundError(f"La sessione {timestamp} non ha un archivio delle risposte")
+    return Path(archive)
+
+def replay_session(
+    timestamp: str,
+    results_dir: Path = RESULTS_DIR,
+    write: bool = True,
+    workers: Optional[int] = None
+) -> Optional["pd.DataFrame"]:
+    """
+    Rigenera la tabella di una sessione salvata dalle sue risposte archiviate.
+
+    Args:
+        timestamp: Timestamp della sessione (come in SessionManager)
+        results_dir: Directory dei risultati delle sessioni
+        write: Se True sovrascrive results_<timestamp>.csv, aggiorna i metadati
+            e reindicizza la sessione nel catalogo dei prodotti
+        workers: Processi di lavoro (vedi replay_jobs)
+
+    Returns:
+        Optional[pd.DataFrame]: Nuova tabella, o None se non ci sono prodotti
+
+    Raises:
+        FileNotFoundError: Se la sessione o il suo archivio non esistono
+    """
+    archive = _session_archive(timestamp, results_dir)
+    job_id = archive.name[:-len(ARCHIVE_SUFFIX)]
+    df = replay_jobs([job_id], archive.parent, workers)[job_id]['dataframe']
+    if df is None or not write:
+        return df
+
+    df.to_csv(results_dir / f"results_{timestamp}.csv", index=False)
+    metadata_path = results_dir / f"metadata_{timestamp}.json"
+    with open(metadata_path, encoding='utf-8') as f:
+        metadata = json.load(f)
+    metadata.update({
+        'rows_count': len(df),
+        'columns': list(df.columns),
+        'last_operation': 'replay',
+        'replayed_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+    })
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f)
+    if CATALOG_SETTINGS['ENABLED']:
+        from src.utils.catalog_index import get_catalog_index
+        get_catalog_index().index_results(df, metadata)
+    logger.info(f"Risultati della sessione {timestamp} rigenerati: {len(df)} righe")
+    return df
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Rigenera i risultati dalle risposte archiviate, senza chiamare l'API")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--session', action='append', help="Timestamp di una sessione salvata, ripetibile")
+    target.add_argument('--job', action='append', help="Job dell'archivio, ripetibile")
+    target.add_argument('--all', action='store_true', help="Tutti i job dell'archivio")
+    parser.add_argument('--archive-dir', type=Path, default=None, help="Directory dell'archivio")
+    parser.add_argument('--workers', type=int, default=None, help="Processi di lavoro (predefinito: numero di core)")
+    parser.add_argument('--output-dir', type=Path, default=None, help="Salva un CSV per job (--job, --all)")
+    parser.add_argument('--dry-run', action='store_true', help="Con --session non sovrascrive i risultati")
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.WARNING)
+    start = time.perf_counter()
+
+    if args.session:
+        for timestamp in args.session:
+            df = replay_session(timestamp, write=not args.dry_run, workers=args.workers)
+            print(f"Sessione {timestamp}: {len(df) if df is not None else 0} righe")
+    else:
+        results = replay_jobs(args.job, args.archive_dir, args.workers)
+        for job_id, result in results.items():
+            df = result['dataframe']
+            print(
+                f"Job {job_id}: {result['pages']} pagine, {len(df) if df is not None else 0} righe, "
+                f"{result['failed_responses']} risposte non interpretabili"
+            )
+            if args.output_dir and df is not None:
+                args.output_dir.mkdir(parents=True, exist_ok=True)
+                df.to_csv(args.output_dir / f"{job_id}.csv", index=False)
+
+    print(f"Replay completato in {time.perf_counter() - start:.2f} s")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,26 +1,30 @@
 # src/extractor/vision_api.py
 
-import datetime
-from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple, Callable, Union
 import base64
-from openai import OpenAI
-import openai
+import logging
+import time
 from PIL import Image
 import io
 from src.config.settings import IMAGE_SETTINGS
 from src.config.settings import VISION_SETTINGS
-from src.utils.logger import setup_logger
+from src.utils.logger import setup_logger, truncate_payload, should_log_payload
 from src.utils.retry_manager import with_retry, RetryError
+from src.utils.openai_client import get_openai_client
+from src.utils.json_validator import JSONValidator
+from src.utils.json_stream import IncrementalJSONParser
+from src.utils.json_recovery import repair_json, salvage_items, merge_products
+from src.utils.compact_format import is_compact, expand_compact, expand_row
+from src.utils.timing import timed
+from src.utils.image_utils import PageImage
+from src.utils.metrics import API_CALLS, PAGES_PROCESSED, PRODUCTS_EXTRACTED, TOKENS
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 import json
 import re
 
-# Importazione diretta delle classi di errore da openai
-from openai import (
-    APIError,
-    APIConnectionError,
-    RateLimitError
-)
+if TYPE_CHECKING:
+    from openai import OpenAI
 
 logger = setup_logger(__name__)
 
@@ -28,33 +32,70 @@ class VisionAPIError(Exception):
     """Eccezione base per errori della Vision API."""
     pass
 
-class JSONValidator:
-    """
-    Validatore JSON temporaneo finché non importiamo il modulo completo.
-    Questo evita errori di import circolari.
-    """
-    @staticmethod
-    def validate_and_sanitize(data: Dict) -> Tuple[Dict, list]:
-        # Implementazione base per ora
-        return data, []
-    
+class UnparseableResponseError(VisionAPIError):
+    """Sollevata quando da una risposta non si riesce a recuperare alcun dato."""
+    pass
+
+class StructuredOutputUnsupportedError(VisionAPIError):
+    """Sollevata quando il modello rifiuta il response_format json_schema."""
+    pass
+
 class VisionAPI:
     """Classe per l'interazione con OpenAI Vision API."""
     
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        output_format: Optional[str] = None,
+        base_url: Optional[str] = None
+    ):
         """
         Inizializza il client OpenAI Vision.
         
+        Il client HTTP è condiviso a livello di processo (vedi
+        get_openai_client) e viene ottenuto alla prima richiesta: creare un
+        VisionAPI per ogni elaborazione è economico e riusa le connessioni
+        già aperte, e interpretare risposte archiviate (replay) non importa
+        l'SDK.
+        
         Args:
             api_key: Chiave API OpenAI
+            output_format: 'standard' o 'compact'; se None usa
+                VISION_SETTINGS['OUTPUT_FORMAT']
+            base_url: URL base alternativo per un server compatibile con OpenAI
         """
         if not api_key:
             logger.error("API key non fornita")
             raise ValueError("È necessario fornire una API key valida")
             
-        self.client = OpenAI(api_key=api_key)
+        self._api_key = api_key
+        self._base_url = base_url
+        self._client = None
+        self.output_format = output_format or VISION_SETTINGS['OUTPUT_FORMAT']
+        if self.output_format not in ('standard', 'compact'):
+            raise ValueError(f"Formato di output non supportato: {self.output_format}")
+        # Structured output con schema generato da JSONValidator (solo per il
+        # formato standard); disattivato automaticamente se il modello non lo supporta
+        self.structured_output = (
+            bool(VISION_SETTINGS['STRUCTURED_OUTPUT']) and self.output_format == 'standard'
+        )
+        self._response_schema = JSONValidator.build_response_schema()
+        # Metriche per pagina (durata, tempo al primo prodotto, ...)
+        self.page_metrics: List[Dict] = []
+        # Tracker della memoria del job (MemoryGovernor), impostato dal chiamante
+        self.memory_job = None
+        # Archivio delle risposte grezze (ResponseArchive), impostato dal chiamante
+        self.archive = None
         logger.debug("Client OpenAI Vision inizializzato")
 
+    @property
+    def client(self) -> "OpenAI":
+        """Client OpenAI condiviso, ottenuto alla prima richiesta."""
+        if self._client is None:
+            self._client = get_openai_client(self._api_key, self._base_url)
+        return self._client
+
+    @timed('api_call')
     @with_retry(
         max_retries=3,
         initial_delay=1.0,
@@ -77,23 +118,197 @@ class VisionAPI:
         """
         try:
             response = self.client.chat.completions.create(
-                model=VISION_SETTINGS['MODEL'],
                 messages=messages,
-                max_tokens=VISION_SETTINGS['MAX_TOKENS'],
-                temperature=VISION_SETTINGS['TEMPERATURE']
+                **self._completion_options()
             )
+            API_CALLS.inc(outcome='success')
             return response
             
         except Exception as e:
+            API_CALLS.inc(outcome=self._call_outcome(e))
+            self._raise_if_structured_output_rejected(e)
             logger.error(f"Errore nella chiamata API: {str(e)}")
             raise VisionAPIError(f"Errore nella chiamata API: {str(e)}") from e
 
-    def extract_data(self, image: Image.Image) -> List[Dict]:
+    @timed('api_call')
+    @with_retry(
+        max_retries=3,
+        initial_delay=1.0,
+        max_delay=10.0,
+        backoff_factor=2.0,
+        jitter=True
+    )
+    def _make_streaming_call(
+        self,
+        messages: List[Dict],
+        page_number: Optional[int] = None,
+        on_product: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Esegue la chiamata API in streaming, validando ogni prodotto appena
+        il relativo oggetto JSON viene chiuso.
+        
+        Args:
+            messages: Lista di messaggi per l'API
+            page_number: Numero della pagina (usato solo per il logging)
+            on_product: Callback opzionale invocata per ogni prodotto validato.
+                In caso di retry la callback può ricevere di nuovo gli stessi
+                prodotti: va usata solo per il progresso, non per accumulare.
+            
+        Returns:
+            Dict: content, products, finish_reason, usage e time_to_first_product
+            
+        Raises:
+            VisionAPIError: In caso di errori non recuperabili
+        """
+        start_time = time.perf_counter()
+        parser = IncrementalJSONParser()
+        products = []
+        first_product_time = None
+        finish_reason = None
+        usage = None
+        
+        try:
+            stream = self.client.chat.completions.create(
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **self._completion_options()
+            )
+            
+            for chunk in stream:
+                if getattr(chunk, 'usage', None):
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                    
+                choice = chunk.choices[0]
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+                if getattr(choice.delta, 'refusal', None):
+                    logger.warning(f"Il modello ha rifiutato la richiesta{self._page_label(page_number)}: {choice.delta.refusal}")
+                    
+                for item in parser.feed(choice.delta.content or ""):
+                    validated = self._validate_products([item], page_number)
+                    if validated and first_product_time is None:
+                        first_product_time = time.perf_counter() - start_time
+                    products.extend(validated)
+                    if on_product:
+                        for product in validated:
+                            on_product(product)
+                            
+        except Exception as e:
+            API_CALLS.inc(outcome=self._call_outcome(e))
+            self._raise_if_structured_output_rejected(e)
+            logger.error(f"Errore nella chiamata API in streaming: {str(e)}")
+            raise VisionAPIError(f"Errore nella chiamata API in streaming: {str(e)}") from e
+        
+        API_CALLS.inc(outcome='success')
+        return {
+            'content': parser.text,
+            'products': products,
+            'finish_reason': finish_reason,
+            'usage': usage,
+            'time_to_first_product': first_product_time
+        }
+
+    @staticmethod
+    def _call_outcome(error: Exception) -> str:
+        """
+        Classifica l'errore di una chiamata per le metriche.
+        
+        Args:
+            error: Eccezione sollevata dall'SDK
+            
+        Returns:
+            str: rate_limited, server_error, client_error, timeout,
+            connection_error o error
+        """
+        from openai import APIConnectionError, APIStatusError, APITimeoutError
+        
+        if isinstance(error, APIStatusError):
+            if error.status_code == 429:
+                return 'rate_limited'
+            return 'server_error' if error.status_code >= 500 else 'client_error'
+        if isinstance(error, APITimeoutError):
+            return 'timeout'
+        if isinstance(error, APIConnectionError):
+            return 'connection_error'
+        return 'error'
+
+    def _completion_options(self) -> Dict:
+        """
+        Restituisce i parametri comuni della chat completion.
+        
+        Con gli structured output attivi la risposta è vincolata allo schema
+        generato da JSONValidator.PRODUCT_SCHEMA.
+        
+        Returns:
+            Dict: Parametri per chat.completions.create
+        """
+        options = {
+            'model': VISION_SETTINGS['MODEL'],
+            'max_tokens': VISION_SETTINGS['MAX_TOKENS'],
+            'temperature': VISION_SETTINGS['TEMPERATURE']
+        }
+        if self.structured_output:
+            options['response_format'] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "listino_prezzi",
+                    "strict": True,
+                    "schema": self._response_schema
+                }
+            }
+        elif self.output_format == 'compact':
+            # Le righe posizionali non si prestano a uno schema strict:
+            # si chiede solo un JSON valido
+            options['response_format'] = {"type": "json_object"}
+        return options
+
+    def _raise_if_structured_output_rejected(self, error: Exception) -> None:
+        """
+        Converte in StructuredOutputUnsupportedError il rifiuto del
+        response_format da parte del modello.
+        
+        Args:
+            error: Errore sollevato dalla chiamata API
+            
+        Raises:
+            StructuredOutputUnsupportedError: Se l'errore è un 400 relativo al response_format
+        """
+        from openai import BadRequestError
+        
+        if not isinstance(error, BadRequestError):
+            return
+        message = str(error)
+        if self.structured_output and ('response_format' in message or 'json_schema' in message):
+            raise StructuredOutputUnsupportedError(
+                f"Structured output non supportato dal modello: {message}"
+            ) from error
+
+    def extract_data(
+        self,
+        image: Union[PageImage, Image.Image],
+        page_number: Optional[int] = None,
+        on_product: Optional[Callable[[Dict], None]] = None
+    ) -> List[Dict]:
         """
         Estrae dati da un'immagine usando Vision API.
         
+        I prodotti restituiti sono già validati e sanitizzati con
+        JSONValidator: possono essere passati a DataProcessor.process_data
+        con trusted=True senza una seconda validazione.
+        
+        Se la risposta viene troncata (finish_reason == "length") i prodotti
+        completi vengono recuperati e la parte mancante viene richiesta di
+        nuovo secondo VISION_SETTINGS['TRUNCATION_STRATEGY'].
+        
         Args:
-            image: Immagine PIL da analizzare
+            image: Pagina codificata (PageImage) o immagine PIL da analizzare
+            page_number: Numero della pagina (usato per logging e metriche)
+            on_product: Callback opzionale per ogni prodotto estratto; in
+                modalità streaming viene invocata durante la generazione
             
         Returns:
             Lista di dizionari contenenti i dati estratti
@@ -101,63 +316,360 @@ class VisionAPI:
         Raises:
             VisionAPIError: In caso di errori nell'estrazione dei dati
         """
-        logger.info("Inizio estrazione dati da immagine")
+        logger.info(f"Inizio estrazione dati da immagine{self._page_label(page_number)}")
+        start_time = time.perf_counter()
         
         try:
-            base64_image = self._convert_to_base64(image)
-            
-            # Usa il prompt template senza aggiungere query
-            prompt = VISION_SETTINGS['PROMPT_TEMPLATE']
+            processed_response, recovery_info = self._extract_page(image, page_number, on_product)
+            responses = recovery_info.pop('responses')
             
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}",
-                                "detail": "high"
-                            },
-                        },
-                    ],
-                },
-            ]
-            
-            response = self._make_api_call(messages)
-            processed_response = self._process_response(response)
-            self._save_response(processed_response)
+            self._record_page_metrics(
+                page_number,
+                duration=time.perf_counter() - start_time,
+                time_to_first_product=recovery_info.pop('time_to_first_product'),
+                products_count=len(processed_response),
+                **recovery_info
+            )
+            self._archive_page(page_number, responses, processed_response, recovery_info)
             
             return processed_response
             
         except RetryError as e:
+            PAGES_PROCESSED.inc(stage='extract', outcome='failed')
             logger.error(f"Errore dopo tutti i tentativi di retry: {str(e)}")
             raise VisionAPIError(f"Errore nell'estrazione dei dati dopo multipli tentativi: {str(e)}") from e
         except Exception as e:
+            PAGES_PROCESSED.inc(stage='extract', outcome='failed')
             logger.error(f"Errore nell'estrazione dei dati: {str(e)}")
             raise VisionAPIError(f"Errore nell'estrazione dei dati: {str(e)}") from e
 
-    def _convert_to_base64(self, image: Image.Image) -> str:
+    def _build_messages(self, base64_image: str) -> List[Dict]:
+        """
+        Costruisce i messaggi della richiesta per un'immagine.
+        
+        Args:
+            base64_image: Immagine JPEG codificata in base64
+            
+        Returns:
+            List[Dict]: Messaggi per la chat completion
+        """
+        # Con gli structured output lo schema non va descritto nel prompt
+        if self.output_format == 'compact':
+            prompt = VISION_SETTINGS['COMPACT_PROMPT_TEMPLATE']
+        elif self.structured_output:
+            prompt = VISION_SETTINGS['STRUCTURED_PROMPT_TEMPLATE']
+        else:
+            prompt = VISION_SETTINGS['PROMPT_TEMPLATE']
+        
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": prompt
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{base64_image}",
+                            "detail": "high"
+                        },
+                    },
+                ],
+            },
+        ]
+
+    def _extract_page(
+        self,
+        image: Union[PageImage, Image.Image],
+        page_number: Optional[int] = None,
+        on_product: Optional[Callable[[Dict], None]] = None,
+        split_depth: int = 0
+    ) -> Tuple[List[Dict], Dict]:
         """
-        Converte un'immagine PIL in stringa base64.
+        Estrae i prodotti di un'immagine gestendo il recupero delle risposte troncate.
         
         Args:
-            image: Immagine PIL da convertire
+            image: Pagina codificata (PageImage) o immagine PIL da analizzare
+            page_number: Numero della pagina (usato solo per il logging)
+            on_product: Callback opzionale per ogni prodotto estratto
+            split_depth: Livello di suddivisione dell'immagine (0 = pagina intera)
+            
+        Returns:
+            Tuple[List[Dict], Dict]: (prodotti, informazioni sul recupero)
+        """
+        base64_image = self._convert_to_base64(image)
+        messages = self._build_messages(base64_image)
+        
+        try:
+            result = self._request_completion(messages, page_number, on_product)
+        except RetryError as e:
+            if not isinstance(e.last_error, StructuredOutputUnsupportedError):
+                raise
+            # Ritorno al prompt con lo schema descritto in prosa
+            logger.warning(f"{e.last_error}. Uso del prompt JSON tradizionale")
+            self.structured_output = False
+            messages = self._build_messages(base64_image)
+            result = self._request_completion(messages, page_number, on_product)
+        
+        info = {
+            'responses': [self._archived_response(result)],
+            'time_to_first_product': result['time_to_first_product'],
+            'output_format': self.output_format,
+            'prompt_tokens': 0,
+            'completion_tokens': 0,
+            'truncated': False,
+            'continuations': 0,
+            'split': False,
+            'incomplete': False
+        }
+        self._add_usage(info, result['usage'])
+        products = result['products']
+        
+        if result['finish_reason'] == 'length':
+            info['truncated'] = True
+            products = self._recover_truncated(
+                image, messages, result, page_number, on_product, split_depth, info
+            )
+            
+        return products, info
+
+    def _request_completion(
+        self,
+        messages: List[Dict],
+        page_number: Optional[int] = None,
+        on_product: Optional[Callable[[Dict], None]] = None
+    ) -> Dict:
+        """
+        Esegue una richiesta (in streaming o meno) e ne restituisce il
+        risultato in forma uniforme.
+        
+        Senza structured output, una risposta non interpretabile e non
+        troncata viene richiesta di nuovo fino a
+        VISION_SETTINGS['MAX_PARSE_RETRIES'] volte.
+        
+        Args:
+            messages: Lista di messaggi per l'API
+            page_number: Numero della pagina (usato solo per il logging)
+            on_product: Callback opzionale per ogni prodotto estratto
+            
+        Returns:
+            Dict: content, products, finish_reason, usage e time_to_first_product
+            
+        Raises:
+            UnparseableResponseError: Se la risposta resta non interpretabile
+        """
+        # Con lo schema vincolato la risposta è sempre JSON valido
+        attempts = 1 if self.structured_output else VISION_SETTINGS['MAX_PARSE_RETRIES'] + 1
+        
+        for attempt in range(attempts):
+            try:
+                if VISION_SETTINGS['STREAM']:
+                    start_time = time.perf_counter()
+                    result = self._make_streaming_call(messages, page_number, on_product)
+                    
+                    # Nessun prodotto riconosciuto durante lo stream: analizza il testo completo
+                    if not result['products'] and result['content'].strip():
+                        result['products'] = self._parse_content(
+                            result['content'],
+                            page_number,
+                            truncated=result['finish_reason'] == 'length'
+                        )
+                        self._notify_products(result['products'], on_product)
+                        if result['products']:
+                            result['time_to_first_product'] = time.perf_counter() - start_time
+                    return result
+                    
+                start_time = time.perf_counter()
+                response = self._make_api_call(messages)
+                choice = response.choices[0]
+                products = self._process_response(response, page_number)
+                self._notify_products(products, on_product)
+                
+                return {
+                    'content': choice.message.content or "",
+                    'products': products,
+                    'finish_reason': choice.finish_reason,
+                    'usage': getattr(response, 'usage', None),
+                    'time_to_first_product': time.perf_counter() - start_time if products else None
+                }
+                
+            except UnparseableResponseError:
+                if attempt == attempts - 1:
+                    raise
+                logger.warning(
+                    f"Risposta non interpretabile{self._page_label(page_number)}, "
+                    f"nuova richiesta ({attempt + 2}/{attempts})"
+                )
+
+    @staticmethod
+    def _add_usage(info: Dict, usage) -> None:
+        """
+        Somma i token di una risposta alle informazioni della pagina.
+        
+        Args:
+            info: Informazioni della pagina, aggiornate in place
+            usage: Oggetto usage della risposta (può essere None)
+        """
+        if usage is None:
+            return
+        info['prompt_tokens'] += getattr(usage, 'prompt_tokens', 0) or 0
+        info['completion_tokens'] += getattr(usage, 'completion_tokens', 0) or 0
+
+    @staticmethod
+    def _notify_products(products: List[Dict], on_product: Optional[Callable[[Dict], None]]) -> None:
+        """Invoca la callback per ciascun prodotto, se presente."""
+        if on_product:
+            for product in products:
+                on_product(product)
+
+    def _recover_truncated(
+        self,
+        image: Union[PageImage, Image.Image],
+        messages: List[Dict],
+        result: Dict,
+        page_number: Optional[int],
+        on_product: Optional[Callable[[Dict], None]],
+        split_depth: int,
+        info: Dict
+    ) -> List[Dict]:
+        """
+        Richiede la parte mancante di una risposta troncata.
+        
+        Con la strategia 'split' l'immagine viene divisa in due metà
+        (sovrapposte) elaborate in parallelo; con 'continuation', o quando
+        la profondità massima di suddivisione è raggiunta, si chiede al
+        modello di proseguire dai prodotti già estratti. I risultati sono
+        uniti eliminando i duplicati.
+        
+        Args:
+            image: Pagina codificata o immagine PIL della pagina
+            messages: Messaggi della richiesta originale
+            result: Risultato troncato della richiesta originale
+            page_number: Numero della pagina (usato solo per il logging)
+            on_product: Callback opzionale per ogni nuovo prodotto
+            split_depth: Livello di suddivisione corrente
+            info: Informazioni sul recupero, aggiornate in place
+            
+        Returns:
+            List[Dict]: Prodotti recuperati e completati
+        """
+        products = result['products']
+        label = self._page_label(page_number)
+        logger.warning(
+            f"Risposta troncata{label}: recuperati {len(products)} prodotti completi, "
+            f"richiesta della parte mancante"
+        )
+        
+        if (VISION_SETTINGS['TRUNCATION_STRATEGY'] == 'split'
+                and split_depth < VISION_SETTINGS['MAX_SPLIT_DEPTH']):
+            info['split'] = True
+            halves = self._split_image(image)
+            
+            # Le callback (UI) vanno invocate solo dal thread chiamante
+            workers = len(halves)
+            if self.memory_job:
+                workers = self.memory_job.max_in_flight(workers)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    # Ogni thread riceve una copia del contesto (timer e pagina correnti)
+                    executor.submit(
+                        contextvars.copy_context().run,
+                        self._extract_page, half, page_number, None, split_depth + 1
+                    )
+                    for half in halves
+                ]
+                parts = [future.result() for future in futures]
+                
+            merged = merge_products(products, *(part_products for part_products, _ in parts))
+            self._notify_products(merged[len(products):], on_product)
+            info['incomplete'] = any(part_info['incomplete'] for _, part_info in parts)
+            for _, part_info in parts:
+                for key in ('continuations', 'prompt_tokens', 'completion_tokens'):
+                    info[key] += part_info[key]
+                info['responses'].extend(part_info['responses'])
+            return merged
+        
+        partial_content = result['content']
+        for _ in range(VISION_SETTINGS['MAX_CONTINUATIONS']):
+            codici = ", ".join(p.get('codice', '') for p in products if p.get('codice')) or "nessuno"
+            continuation_messages = messages + [
+                {"role": "assistant", "content": partial_content},
+                {"role": "user", "content": VISION_SETTINGS['CONTINUATION_PROMPT'].format(codici=codici)}
+            ]
+            
+            next_result = self._request_completion(continuation_messages, page_number)
+            info['continuations'] += 1
+            info['responses'].append(self._archived_response(next_result))
+            self._add_usage(info, next_result['usage'])
+            
+            merged = merge_products(products, next_result['products'])
+            new_products = merged[len(products):]
+            self._notify_products(new_products, on_product)
+            products = merged
+            
+            if next_result['finish_reason'] != 'length':
+                logger.info(f"Recupero completato{label}: {len(new_products)} prodotti aggiunti")
+                return products
+            if not new_products:
+                break
+            partial_content = next_result['content']
+            
+        info['incomplete'] = True
+        logger.error(
+            f"La risposta{label} risulta ancora troncata dopo il recupero: "
+            f"alcuni prodotti potrebbero mancare ({len(products)} estratti)"
+        )
+        return products
+
+    @staticmethod
+    def _split_image(image: Union[PageImage, Image.Image]) -> List[Image.Image]:
+        """
+        Divide l'immagine in due metà orizzontali leggermente sovrapposte,
+        così che le righe a cavallo del taglio compaiano per intero in almeno
+        una delle due.
+        
+        Args:
+            image: Pagina codificata o immagine PIL da dividere
+            
+        Returns:
+            List[Image.Image]: Metà superiore e inferiore
+        """
+        if isinstance(image, PageImage):
+            image = image.to_pil()
+        width, height = image.size
+        overlap = int(height * VISION_SETTINGS['SPLIT_OVERLAP'])
+        middle = height // 2
+        return [
+            image.crop((0, 0, width, min(height, middle + overlap))),
+            image.crop((0, max(0, middle - overlap), width, height))
+        ]
+
+    @timed('encode')
+    def _convert_to_base64(self, image: Union[PageImage, Image.Image]) -> str:
+        """
+        Converte un'immagine in stringa base64.
+        
+        Una PageImage è già in JPEG e il suo base64 viene calcolato una sola
+        volta; un'immagine PIL viene codificata a ogni chiamata.
+        
+        Args:
+            image: Pagina codificata o immagine PIL da convertire
             
         Returns:
             str: Immagine codificata in base64
         """
+        if isinstance(image, PageImage):
+            return image.base64
+            
         try:
             buffer = io.BytesIO()
             image.save(
                 buffer, 
                 format=IMAGE_SETTINGS['FORMAT'],
                 quality=IMAGE_SETTINGS['QUALITY'],
-                optimize=True
+                optimize=IMAGE_SETTINGS['OPTIMIZE']
             )
             base64_image = base64.b64encode(buffer.getvalue()).decode('utf-8')
             return base64_image
@@ -169,64 +681,218 @@ class VisionAPI:
             if 'buffer' in locals():
                 buffer.close()
     
-    def _process_response(self, response) -> List[Dict]:
+    @staticmethod
+    def _page_label(page_number: Optional[int]) -> str:
+        """Restituisce il suffisso ' (pagina N)' per i messaggi di log."""
+        return f" (pagina {page_number})" if page_number is not None else ""
+
+    def _record_page_metrics(
+        self,
+        page_number: Optional[int],
+        duration: float,
+        time_to_first_product: Optional[float],
+        products_count: int,
+        **extra
+    ) -> None:
+        """
+        Registra le metriche di estrazione di una pagina.
+        
+        Args:
+            page_number: Numero della pagina
+            duration: Durata totale dell'estrazione in secondi
+            time_to_first_product: Secondi fino al primo prodotto (None se nessuno)
+            products_count: Numero di prodotti estratti
+            **extra: Metriche aggiuntive (ad es. informazioni sul recupero)
+        """
+        metrics = {
+            'page': page_number,
+            'streamed': bool(VISION_SETTINGS['STREAM']),
+            'structured_output': self.structured_output,
+            'duration_seconds': round(duration, 3),
+            'time_to_first_product_seconds': (
+                round(time_to_first_product, 3) if time_to_first_product is not None else None
+            ),
+            'products': products_count,
+            **extra
+        }
+        self.page_metrics.append(metrics)
+        logger.info(f"Metriche estrazione{self._page_label(page_number)}: {metrics}")
+        
+        PAGES_PROCESSED.inc(stage='extract', outcome='incomplete' if extra.get('incomplete') else 'ok')
+        PRODUCTS_EXTRACTED.inc(products_count, stage='extract')
+        TOKENS.inc(extra.get('prompt_tokens', 0), direction='in')
+        TOKENS.inc(extra.get('completion_tokens', 0), direction='out')
+
+    @timed('parse')
+    def _process_response(self, response, page_number: Optional[int] = None) -> List[Dict]:
         """
         Processa la risposta dell'API e la converte in formato strutturato.
+        
+        È l'unico punto in cui i dati di una pagina vengono validati: gli
+        errori sono registrati insieme al numero di pagina che li ha prodotti.
+        
+        Args:
+            response: Risposta della chat completion
+            page_number: Numero della pagina (usato solo per il logging)
+            
+        Returns:
+            List[Dict]: Prodotti validati e sanitizzati
         """
         try:
-            content = response.choices[0].message.content.strip()
-            logger.debug(f"Risposta API ricevuta: {content[:200]}...")
+            choice = response.choices[0]
+            if getattr(choice.message, 'refusal', None):
+                logger.warning(
+                    f"Il modello ha rifiutato la richiesta{self._page_label(page_number)}: "
+                    f"{choice.message.refusal}"
+                )
+                return []
+            content = (choice.message.content or "").strip()
+            truncated = getattr(choice, 'finish_reason', None) == 'length'
+            return self._parse_content(content, page_number, truncated)
             
-            # Rimuovi i delimitatori markdown del codice JSON se presenti
-            content = re.sub(r'^```json\s*|\s*```$', '', content.strip())
+        except UnparseableResponseError:
+            raise
+        except Exception as e:
+            logger.error(f"Errore nel processing della risposta: {str(e)}")
+            return []
+
+    def _parse_content(
+        self,
+        content: str,
+        page_number: Optional[int] = None,
+        truncated: bool = False
+    ) -> List[Dict]:
+        """
+        Converte il testo della risposta in prodotti validati.
+        
+        Con gli structured output il testo è JSON conforme allo schema; con
+        il prompt tradizionale vengono rimossi i delimitatori markdown e
+        corretti gli errori più comuni. In entrambi i casi, se il JSON è
+        troncato o malformato vengono recuperati tutti i prodotti completi
+        presenti nel testo.
+        
+        Args:
+            content: Testo restituito dal modello
+            page_number: Numero della pagina (usato solo per il logging)
+            truncated: True se il modello ha interrotto la risposta per limite di token
             
-            # Se la risposta è vuota o non valida, ritorna lista vuota
-            if not content or content.isspace():
-                return []
+        Returns:
+            List[Dict]: Prodotti validati e sanitizzati
             
-            # Parse JSON
+        Raises:
+            UnparseableResponseError: Se la risposta, non troncata, non
+                contiene alcun dato recuperabile
+        """
+        label = self._page_label(page_number)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Risposta API ricevuta: {truncate_payload(content, 200)}")
+        
+        if not self.structured_output:
+            # Rimuovi i delimitatori markdown del codice JSON se presenti
+            content = re.sub(r'^```json\s*|\s*```$', '', content.strip())
+        
+        # Se la risposta è vuota o non valida, ritorna lista vuota
+        if not content or content.isspace():
+            return []
+        
+        # Parse JSON, con correzione degli errori più comuni per il prompt tradizionale
+        if truncated:
+            data = None
+        elif self.structured_output:
             try:
                 data = json.loads(content)
-            except json.JSONDecodeError as e:
-                logger.error(f"Errore nel parsing della risposta JSON: {str(e)}")
-                logger.debug(f"Contenuto problematico: {content}")
+            except json.JSONDecodeError:
+                data = None
+        else:
+            data = repair_json(content)
+        
+        if data is None:
+            # JSON troncato o malformato: recupera i prodotti completi
+            salvaged = salvage_items(content)
+            if salvaged:
+                logger.warning(f"JSON incompleto{label}: recuperati {len(salvaged)} prodotti completi")
+                return self._validate_products(salvaged, page_number)
+            if truncated:
+                logger.warning(f"Risposta troncata{label} prima del primo prodotto completo")
                 return []
+            logger.error(f"Errore nel parsing della risposta JSON{label}")
+            if should_log_payload():
+                logger.debug(f"Contenuto problematico: {truncate_payload(content)}")
+            raise UnparseableResponseError(f"Risposta JSON non interpretabile{label}")
+        
+        if is_compact(data):
+            data = expand_compact(data)
+        elif isinstance(data, list):
+            data = {"prodotti": data}
+        if not isinstance(data, dict) or "prodotti" not in data:
+            logger.warning(f"La risposta non contiene prodotti{label}")
+            return []
             
-            # Sanitizza e valida i dati
-            sanitized_data, validation_errors = JSONValidator.validate_and_sanitize(data)
+        return self._validate_products(data["prodotti"], page_number)
+
+    @timed('validate')
+    def _validate_products(self, products: List[Dict], page_number: Optional[int] = None) -> List[Dict]:
+        """
+        Valida e sanitizza una lista di prodotti di una pagina.
+        
+        Le righe del formato compatto vengono prima espanse nella forma
+        canonica.
+        
+        Args:
+            products: Prodotti così come restituiti dal modello
+            page_number: Numero della pagina (usato solo per il logging)
             
-            if validation_errors:
-                # Log degli errori ma continua con i dati sanitizzati
-                for error in validation_errors:
-                    logger.warning(f"Errore di validazione: {error}")
-                    
-            if "prodotti" in sanitized_data:
-                return sanitized_data["prodotti"]
-            else:
-                logger.warning("Dati sanitizzati non contengono prodotti")
-                return []
+        Returns:
+            List[Dict]: Prodotti sanitizzati
+        """
+        products = [expand_row(p) if isinstance(p, list) else p for p in products]
+        sanitized_data, validation_errors = JSONValidator.validate_and_sanitize({"prodotti": products})
+        
+        if validation_errors:
+            # Log degli errori ma continua con i dati sanitizzati
+            logger.warning(
+                f"{len(validation_errors)} errori di validazione"
+                f"{self._page_label(page_number)}"
+            )
+            for error in validation_errors:
+                logger.warning(f"Errore di validazione{self._page_label(page_number)}: {error}")
                 
-        except Exception as e:
-            logger.error(f"Errore nel processing della risposta: {str(e)}")
-            return []
+        return sanitized_data.get("prodotti", [])
+
+    def _archived_response(self, result: Dict) -> Dict:
+        """
+        Restituisce la parte di una risposta da conservare nell'archivio:
+        il testo grezzo e quanto serve per interpretarlo di nuovo.
+        """
+        return {
+            'content': result['content'],
+            'finish_reason': result['finish_reason'],
+            'structured_output': self.structured_output,
+            'output_format': self.output_format
+        }
 
-    def _save_response(self, response: List[Dict]) -> None:
+    def _archive_page(
+        self,
+        page_number: Optional[int],
+        responses: List[Dict],
+        products: List[Dict],
+        info: Dict
+    ) -> None:
         """
-        Salva la risposta processata in formato JSON.
+        Accoda le risposte della pagina all'archivio del job, se impostato.
+        
+        La scrittura avviene in background (vedi ResponseArchive): qui si
+        paga solo l'inserimento in coda.
         
         Args:
-            response: Risposta processata da salvare
+            page_number: Numero della pagina
+            responses: Risposte grezze del modello, nell'ordine delle richieste
+            products: Prodotti validati della pagina
+            info: Informazioni sull'estrazione (token, troncamenti, ...)
         """
+        if self.archive is None:
+            return
         try:
-            output_dir = Path("output/json")
-            output_dir.mkdir(parents=True, exist_ok=True)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file = output_dir / f"response_{timestamp}.json"
-            
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(response, f, ensure_ascii=False, indent=4)
-                
-            logger.debug(f"Risposta API salvata in: {output_file}")
-            
+            self.archive.record(page_number, responses, products, info)
         except Exception as e:
-            logger.error(f"Errore nel salvataggio della risposta: {str(e)}")
\ No newline at end of file
+            logger.error(f"Errore nell'archiviazione della risposta{self._page_label(page_number)}: {str(e)}")
@@ -2,24 +2,36 @@
 
 """
 Package per le utilità del progetto.
+
+Gli oggetti esportati vengono importati solo al primo accesso: importare un
+singolo modulo (ad es. src.utils.logger) non carica Streamlit, pandas o
+PyMuPDF.
 """
 
-from .logger import setup_logger
-from .image_utils import validate_image, optimize_image, get_image_info
-from .session_manager import SessionManager
-from .file_validator import FileValidator
-from .pdf_validator import PDFValidator, PDFValidationError
-from .json_validator import JSONValidator, JSONValidationError
+import importlib
+
+# Nome esportato -> modulo che lo definisce
+_EXPORTS = {
+    'setup_logger': '.logger',
+    'validate_image': '.image_utils',
+    'optimize_image': '.image_utils',
+    'get_image_info': '.image_utils',
+    'SessionManager': '.session_manager',
+    'FileValidator': '.file_validator',
+    'PDFValidator': '.pdf_validator',
+    'PDFValidationError': '.pdf_validator',
+    'JSONValidator': '.json_validator',
+    'JSONValidationError': '.json_validator'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-__all__ = [
-    'setup_logger', 
-    'validate_image', 
-    'optimize_image', 
-    'get_image_info',
-    'SessionManager',
-    'FileValidator',
-    'PDFValidator',
-    'PDFValidationError',
-    'JSONValidator',
-    'JSONValidationError'
-]
\ No newline at end of file
+def __dir__():
+    return sorted(list(globals()) + __all__)
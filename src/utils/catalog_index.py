@@ -0,0 +1,462 @@
+# src/utils/catalog_index.py
+
+"""
+Indice SQLite dei prodotti estratti in tutte le sessioni.
+
+Ogni sessione salvata aggiunge (o sostituisce) un'edizione del listino di
+un fornitore: i prodotti sono indicizzati per fornitore, codice ed
+edizione, con prezzo unitario e prezzi per quantità, e una tabella FTS5
+su codice e descrizione. Ricerca per codice, ricerca testuale e storico
+dei prezzi tra le edizioni non richiedono di riaprire i CSV delle sessioni.
+
+Esempio:
+    python -m src.utils.catalog_index --backfill
+    python -m src.utils.catalog_index --search reclinabile
+    python -m src.utils.catalog_index --history RC330-40
+"""
+
+import argparse
+import json
+import math
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from src.config.settings import CATALOG_SETTINGS, OUTPUT_SETTINGS
+from src.utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = setup_logger(__name__)
+
+# Colonne dei prezzi per quantità prodotte da DataProcessor.process_data
+TIER_PREFIX = 'PER Pz. '
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS editions (
+    edition TEXT PRIMARY KEY,          -- SHA-256 del PDF o timestamp della sessione
+    supplier TEXT NOT NULL,
+    edition_date TEXT NOT NULL,        -- ISO 8601, ordina le edizioni
+    file_name TEXT,
+    session TEXT,                      -- Timestamp dei risultati in temp/results
+    indexed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    supplier TEXT NOT NULL,
+    codice TEXT NOT NULL COLLATE NOCASE,
+    edition TEXT NOT NULL REFERENCES editions(edition) ON DELETE CASCADE,
+    descrizione TEXT,
+    tipo_prezzo TEXT,
+    prezzo_unitario REAL,
+    descrizione_quantita TEXT,
+    non_vendibile_separatamente INTEGER NOT NULL DEFAULT 0,
+    is_latest INTEGER NOT NULL DEFAULT 0,  -- 1 per la riga dell'edizione più recente del prodotto
+    UNIQUE (supplier, codice, edition)
+);
+CREATE INDEX IF NOT EXISTS products_codice ON products (codice);
+CREATE INDEX IF NOT EXISTS products_edition ON products (edition);
+CREATE TABLE IF NOT EXISTS tier_prices (
+    product_id INTEGER NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+    quantita INTEGER NOT NULL,
+    prezzo REAL,
+    PRIMARY KEY (product_id, quantita)
+) WITHOUT ROWID;
+-- Solo le righe con is_latest = 1: la ricerca resta veloce con molte edizioni
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    codice, descrizione, content='products', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS products_latest_on AFTER UPDATE OF is_latest ON products
+WHEN new.is_latest = 1 AND old.is_latest = 0 BEGIN
+    INSERT INTO products_fts (rowid, codice, descrizione) VALUES (new.id, new.codice, new.descrizione);
+END;
+CREATE TRIGGER IF NOT EXISTS products_latest_off AFTER UPDATE OF is_latest ON products
+WHEN new.is_latest = 0 AND old.is_latest = 1 BEGIN
+    INSERT INTO products_fts (products_fts, rowid, codice, descrizione)
+    VALUES ('delete', old.id, old.codice, old.descrizione);
+END;
+CREATE TRIGGER IF NOT EXISTS products_ad AFTER DELETE ON products WHEN old.is_latest = 1 BEGIN
+    INSERT INTO products_fts (products_fts, rowid, codice, descrizione)
+    VALUES ('delete', old.id, old.codice, old.descrizione);
+END;
+"""
+
+_PRODUCT_COLUMNS = (
+    "p.id, p.supplier, p.codice, p.edition, p.descrizione, p.tipo_prezzo, p.prezzo_unitario, "
+    "p.descrizione_quantita, p.non_vendibile_separatamente, e.edition_date, e.file_name, e.session"
+)
+
+# Inverte is_latest solo dove cambia: prima il flag della riga uscente, poi quello della nuova
+_UPDATE_LATEST = """
+UPDATE products SET is_latest = 1 - is_latest WHERE id IN (
+    SELECT id FROM (
+        SELECT p.id, p.is_latest, ROW_NUMBER() OVER (
+            PARTITION BY p.codice ORDER BY e.edition_date DESC, e.indexed_at DESC
+        ) AS position
+        FROM products p JOIN editions e ON e.edition = p.edition
+        WHERE p.supplier = ?
+    ) WHERE (position = 1) != is_latest
+)
+"""
+
+def default_supplier(file_name: Optional[str]) -> str:
+    """
+    Fornitore ricavato dal nome del file, senza estensione né anno/numero finale.
+
+    Ad es. 'Listino_Rossi_2024.pdf' -> 'Listino Rossi'.
+    """
+    stem = Path(file_name or '').stem
+    name = re.sub(r'[\W_]*\d[\d\W_]*$', '', stem) or stem
+    return re.sub(r'[_\s]+', ' ', name).strip() or 'Sconosciuto'
+
+def _fts_query(text: str) -> Optional[str]:
+    """Query FTS5 da testo libero: ogni parola, anche come prefisso, deve comparire."""
+    tokens = re.findall(r'\w+', text)
+    return ' '.join(f'"{token}"*' for token in tokens) if tokens else None
+
+def _number(value: Any) -> Optional[float]:
+    if value is None or value == '':
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(number) else number
+
+def _flag(value: Any) -> int:
+    """Booleano del DataFrame o del CSV riletto ('True'/'False')."""
+    return int(str(value).strip().lower() in ('true', '1', '1.0'))
+
+class CatalogIndex:
+    """
+    Catalogo persistente dei prodotti di tutte le sessioni (SQLite + FTS5).
+
+    Una sola connessione per processo, protetta da un lock: le scritture
+    avvengono una volta per sessione salvata e le letture sono query
+    indicizzate di pochi millisecondi.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: File del database; se None usa CATALOG_SETTINGS['PATH']
+        """
+        self.path = Path(path or CATALOG_SETTINGS['PATH'])
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("PRAGMA foreign_keys=ON")
+        self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        """Chiude la connessione al database."""
+        with self._lock:
+            self._connection.close()
+
+    # Scrittura
+
+    def index_session(
+        self,
+        df: "pd.DataFrame",
+        supplier: str,
+        edition: str,
+        edition_date: Optional[str] = None,
+        file_name: Optional[str] = None,
+        session: Optional[str] = None
+    ) -> int:
+        """
+        Indicizza i risultati di una sessione come edizione del listino di un fornitore.
+
+        Un'edizione già indicizzata (ad es. lo stesso PDF rielaborato)
+        viene sostituita. Le righe senza codice non sono indicizzate; a
+        parità di codice prevale l'ultima riga.
+
+        Args:
+            df: DataFrame prodotto da DataProcessor.process_data
+            supplier: Fornitore
+            edition: Identificativo dell'edizione
+            edition_date: Data dell'edizione (ISO 8601); se None l'ora corrente
+            file_name: Nome del PDF
+            session: Timestamp della sessione
+
+        Returns:
+            int: Prodotti indicizzati
+        """
+        tier_columns = {
+            column: int(column[len(TIER_PREFIX):]) for column in df.columns
+            if column.startswith(TIER_PREFIX) and column[len(TIER_PREFIX):].isdigit()
+        }
+        products: Dict[str, Dict] = {}
+        for row in df.to_dict('records'):
+            codice = str(row.get('codice') or '').strip()
+            if codice and codice.lower() != 'nan':
+                products[codice.casefold()] = {**row, 'codice': codice}
+
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock, self._connection as connection:
+            # L'edizione sostituita può appartenere a un altro fornitore (nome corretto)
+            previous = connection.execute(
+                "SELECT supplier FROM editions WHERE edition = ?", (edition,)
+            ).fetchone()
+            connection.execute("DELETE FROM editions WHERE edition = ?", (edition,))
+            connection.execute(
+                "INSERT INTO editions (edition, supplier, edition_date, file_name, session, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (edition, supplier, edition_date or now, file_name, session, now)
+            )
+            for row in products.values():
+                cursor = connection.execute(
+                    "INSERT INTO products (supplier, codice, edition, descrizione, tipo_prezzo, prezzo_unitario, "
+                    "descrizione_quantita, non_vendibile_separatamente) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        supplier, row['codice'], edition, row.get('descrizione') or '', row.get('tipo_prezzo') or '',
+                        _number(row.get('prezzo_unitario')), row.get('descrizione_quantita') or '',
+                        _flag(row.get('non_vendibile_separatamente'))
+                    )
+                )
+                tiers = [
+                    (cursor.lastrowid, quantity, price) for column, quantity in tier_columns.items()
+                    if (price := _number(row.get(column))) is not None
+                ]
+                if tiers:
+                    connection.executemany(
+                        "INSERT INTO tier_prices (product_id, quantita, prezzo) VALUES (?, ?, ?)", tiers
+                    )
+            # Aggiorna l'edizione più recente di ogni prodotto dei fornitori coinvolti (e quindi l'indice FTS)
+            for affected in {supplier} | ({previous[0]} if previous else set()):
+                connection.execute(_UPDATE_LATEST, (affected,))
+
+        logger.info(f"Catalogo: {len(products)} prodotti indicizzati per {supplier} (edizione {edition})")
+        return len(products)
+
+    def index_results(self, df: "pd.DataFrame", metadata: Dict[str, Any]) -> int:
+        """
+        Indicizza i risultati di una sessione a partire dai suoi metadati.
+
+        Il fornitore è metadata['supplier'] o, se assente, quello ricavato dal
+        nome del file; l'edizione è l'hash del PDF (la stessa edizione
+        rielaborata sostituisce la precedente) o il timestamp della sessione.
+
+        Args:
+            df: Risultati della sessione
+            metadata: Metadati salvati da SessionManager.save_results
+
+        Returns:
+            int: Prodotti indicizzati
+        """
+        session = metadata.get('timestamp')
+        edition_date = None
+        if session:
+            try:
+                edition_date = datetime.strptime(session, OUTPUT_SETTINGS['DATE_FORMAT']).isoformat()
+            except ValueError:
+                pass
+        return self.index_session(
+            df,
+            supplier=metadata.get('supplier') or default_supplier(metadata.get('file_name')),
+            edition=metadata.get('file_sha256') or session,
+            edition_date=edition_date,
+            file_name=metadata.get('file_name'),
+            session=session
+        )
+
+    def backfill(self, results_dir: Optional[Path] = None) -> int:
+        """
+        Indicizza le sessioni salvate in results_dir non ancora presenti nel catalogo.
+
+        Args:
+            results_dir: Directory dei risultati; se None temp/results
+
+        Returns:
+            int: Sessioni indicizzate
+        """
+        import pandas as pd
+
+        results_dir = Path(results_dir or OUTPUT_SETTINGS['TEMP_DIR'] / 'results')
+        with self._lock:
+            known = {row[0] for row in self._connection.execute("SELECT session FROM editions")}
+        indexed = 0
+        for metadata_path in sorted(results_dir.glob("metadata_*.json")):
+            session = metadata_path.stem[len("metadata_"):]
+            results_path = results_dir / f"results_{session}.csv"
+            if session in known or not results_path.exists():
+                continue
+            with open(metadata_path, encoding='utf-8') as f:
+                metadata = json.load(f)
+            self.index_results(
+                pd.read_csv(results_path, dtype={'codice': str}), {**metadata, 'timestamp': session}
+            )
+            indexed += 1
+        return indexed
+
+    # Lettura
+
+    def _with_tiers(self, rows: List[sqlite3.Row]) -> List[Dict]:
+        """Converte le righe in dizionari aggiungendo i prezzi per quantità."""
+        products = [dict(row) for row in rows]
+        if not products:
+            return products
+        tiers: Dict[int, List[Dict]] = {}
+        ids = [product['id'] for product in products]
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            for product_id, quantity, price in self._connection.execute(
+                f"SELECT product_id, quantita, prezzo FROM tier_prices WHERE product_id IN "
+                f"({','.join('?' * len(chunk))}) ORDER BY product_id, quantita",
+                chunk
+            ):
+                tiers.setdefault(product_id, []).append({'quantita': quantity, 'prezzo': price})
+        for product in products:
+            product['non_vendibile_separatamente'] = bool(product['non_vendibile_separatamente'])
+            product['prezzi_quantita'] = tiers.get(product['id'], [])
+        return products
+
+    def suppliers(self) -> List[str]:
+        """Fornitori presenti nel catalogo, in ordine alfabetico."""
+        with self._lock:
+            return [row[0] for row in self._connection.execute(
+                "SELECT DISTINCT supplier FROM editions ORDER BY supplier COLLATE NOCASE"
+            )]
+
+    def editions(self, supplier: Optional[str] = None) -> List[Dict]:
+        """Edizioni indicizzate (dalla più recente), con il numero di prodotti."""
+        query = (
+            "SELECT e.*, (SELECT COUNT(*) FROM products p WHERE p.edition = e.edition) AS products "
+            "FROM editions e" + (" WHERE e.supplier = ?" if supplier else "") + " ORDER BY e.edition_date DESC"
+        )
+        with self._lock:
+            return [dict(row) for row in self._connection.execute(query, (supplier,) if supplier else ())]
+
+    def lookup(self, codice: str, supplier: Optional[str] = None) -> List[Dict]:
+        """
+        Prodotto con il codice indicato nell'edizione più recente di ogni fornitore.
+
+        Args:
+            codice: Codice del prodotto (senza distinzione tra maiuscole e minuscole)
+            supplier: Limita la ricerca a un fornitore
+
+        Returns:
+            List[Dict]: Un prodotto per fornitore, con prezzi_quantita
+        """
+        latest: Dict[str, Dict] = {}
+        for product in self._history(codice, supplier, None):
+            latest.setdefault(product['supplier'], product)
+        return list(latest.values())
+
+    def price_history(
+        self,
+        codice: str,
+        supplier: Optional[str] = None,
+        editions: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Prezzi di un codice nelle edizioni indicizzate, dalla più recente.
+
+        Args:
+            codice: Codice del prodotto (senza distinzione tra maiuscole e minuscole)
+            supplier: Limita lo storico a un fornitore
+            editions: Edizioni massime; se None usa CATALOG_SETTINGS['HISTORY_EDITIONS']
+
+        Returns:
+            List[Dict]: Un prodotto per edizione, con data e file dell'edizione
+        """
+        return self._history(codice, supplier, editions or CATALOG_SETTINGS['HISTORY_EDITIONS'])
+
+    def _history(self, codice: str, supplier: Optional[str], editions: Optional[int]) -> List[Dict]:
+        query = (
+            f"SELECT {_PRODUCT_COLUMNS} FROM products p JOIN editions e ON e.edition = p.edition "
+            f"WHERE p.codice = ?" + (" AND p.supplier = ?" if supplier else "") +
+            " ORDER BY e.edition_date DESC" + (" LIMIT ?" if editions else "")
+        )
+        params = [codice.strip()] + ([supplier] if supplier else []) + ([editions] if editions else [])
+        with self._lock:
+            return self._with_tiers(self._connection.execute(query, params).fetchall())
+
+    def search(self, text: str, supplier: Optional[str] = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Ricerca testuale su codice e descrizione, in ordine di pertinenza (BM25).
+
+        Ogni parola deve comparire, anche come inizio di parola e senza
+        distinzione di accenti ('reclin' trova 'reclinabile'). Per ogni
+        prodotto viene cercata l'edizione più recente; le precedenti sono
+        in price_history.
+
+        Args:
+            text: Testo da cercare
+            supplier: Limita la ricerca a un fornitore
+            limit: Risultati massimi; se None usa CATALOG_SETTINGS['SEARCH_LIMIT']
+
+        Returns:
+            List[Dict]: Prodotti trovati, con prezzi_quantita
+        """
+        match = _fts_query(text)
+        if match is None:
+            return []
+        query = (
+            f"SELECT {_PRODUCT_COLUMNS} FROM products_fts f JOIN products p ON p.id = f.rowid "
+            f"JOIN editions e ON e.edition = p.edition WHERE products_fts MATCH ?"
+            + (" AND p.supplier = ?" if supplier else "") + " ORDER BY f.rank LIMIT ?"
+        )
+        params = [match] + ([supplier] if supplier else []) + [limit or CATALOG_SETTINGS['SEARCH_LIMIT']]
+        with self._lock:
+            return self._with_tiers(self._connection.execute(query, params).fetchall())
+
+# Catalogo condiviso dal processo
+_catalog: Optional[CatalogIndex] = None
+_catalog_lock = threading.Lock()
+
+def get_catalog_index() -> CatalogIndex:
+    """
+    Restituisce il CatalogIndex condiviso, aprendo il database al primo utilizzo.
+
+    Returns:
+        CatalogIndex: Catalogo del processo
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = CatalogIndex()
+        return _catalog
+
+def _format_price(product: Dict) -> str:
+    if product['prezzo_unitario'] is not None:
+        return f"{product['prezzo_unitario']:.2f}"
+    return ', '.join(f"{tier['quantita']} pz {tier['prezzo']:.2f}" for tier in product['prezzi_quantita']) or '-'
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Interroga il catalogo dei prodotti di tutte le sessioni")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--backfill', action='store_true', help="Indicizza le sessioni salvate non ancora presenti")
+    action.add_argument('--search', help="Ricerca testuale su codice e descrizione")
+    action.add_argument('--code', help="Prodotto nell'ultima edizione di ogni fornitore")
+    action.add_argument('--history', help="Storico dei prezzi di un codice")
+    parser.add_argument('--supplier', default=None, help="Limita a un fornitore")
+    parser.add_argument('--results-dir', type=Path, default=None, help="Directory dei risultati (--backfill)")
+    args = parser.parse_args(argv)
+
+    catalog = CatalogIndex()
+    if args.backfill:
+        print(f"Sessioni indicizzate: {catalog.backfill(args.results_dir)}")
+        return 0
+    if args.search:
+        products = catalog.search(args.search, args.supplier)
+    elif args.code:
+        products = catalog.lookup(args.code, args.supplier)
+    else:
+        products = catalog.price_history(args.history, args.supplier)
+    for product in products:
+        print(
+            f"{product['edition_date'][:10]}  {product['supplier']:<20} {product['codice']:<16} "
+            f"{_format_price(product):>12}  {product['descrizione']}"
+        )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
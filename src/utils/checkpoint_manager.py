@@ -1,106 +1,265 @@
 # src/utils/checkpoint_manager.py
 
 import json
+import os
 import shutil
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from src.config.settings import CHECKPOINT_SETTINGS
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+JOURNAL_VERSION = 1
+
+class _Journal:
+    """Stato in memoria del journal di una sessione."""
+
+    __slots__ = ('encoded', 'header', 'updates', 'unsynced', 'last_sync')
+
+    def __init__(self, encoded: Dict[str, str], header: Dict[str, Any], updates: int = 0):
+        self.encoded = encoded      # Chiave di primo livello -> valore serializzato in JSON
+        self.header = header
+        self.updates = updates      # Aggiornamenti dopo l'ultima istantanea
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
 class CheckpointManager:
     """
     Gestisce il salvataggio e il ripristino dello stato di elaborazione.
+
+    Ogni sessione ha un journal append-only (checkpoint_<sessione>.jsonl):
+    una riga di intestazione compatta, un'istantanea dello stato e poi un
+    record per salvataggio con le sole chiavi di primo livello cambiate.
+    Le scritture vengono sincronizzate su disco (fsync) a gruppi; dopo
+    CHECKPOINT_SETTINGS['COMPACT_RECORDS'] aggiornamenti, e al checkpoint
+    finale, il journal viene riscritto come istantanea in un file
+    temporaneo e sostituito atomicamente. Una riga troncata da
+    un'interruzione viene ignorata al caricamento.
+
+    I checkpoint nel vecchio formato (checkpoint_<sessione>.json) restano
+    leggibili.
     """
-    
-    def __init__(self, base_dir: Path = Path("temp/checkpoints")):
+
+    def __init__(self, base_dir: Optional[Path] = None):
         """
         Inizializza il gestore dei checkpoint.
-        
+
         Args:
-            base_dir: Directory base per i checkpoint
+            base_dir: Directory base per i checkpoint; se None usa CHECKPOINT_SETTINGS['DIR']
         """
-        self.base_dir = base_dir
+        self.base_dir = Path(base_dir or CHECKPOINT_SETTINGS['DIR'])
+        self._journals: Dict[str, _Journal] = {}
+        self._lock = threading.Lock()
         self._ensure_directories()
-        
+
     def _ensure_directories(self):
         """Crea le directory necessarie se non esistono."""
         (self.base_dir / "current").mkdir(parents=True, exist_ok=True)
         (self.base_dir / "history").mkdir(parents=True, exist_ok=True)
-    
+
+    def _journal_path(self, session_id: str, final: bool = False) -> Path:
+        return self.base_dir / ("history" if final else "current") / f"checkpoint_{session_id}.jsonl"
+
+    @staticmethod
+    def _file_name(state: Dict[str, Any]) -> Optional[str]:
+        """Nome del file elaborato, se presente nello stato o nei suoi metadati."""
+        metadata = state.get('metadata')
+        return state.get('original_file_name') or (
+            metadata.get('original_file_name') if isinstance(metadata, dict) else None
+        )
+
     def save_checkpoint(self, session_id: str, state: Dict[str, Any], is_final: bool = False) -> bool:
         """
         Salva un checkpoint dello stato corrente.
-        
+
+        Lo stato sostituisce quello precedente, ma sul journal viene
+        aggiunto solo ciò che è cambiato.
+
         Args:
             session_id: Identificatore univoco della sessione
             state: Stato da salvare
-            is_final: Se True, sposta il checkpoint nella cronologia
-            
+            is_final: Se True, compatta il journal e lo sposta nella cronologia
+
         Returns:
             bool: True se il salvataggio è avvenuto con successo
         """
         try:
-            # Aggiungi timestamp e metadati
-            checkpoint_data = {
-                "timestamp": datetime.now().isoformat(),
-                "session_id": session_id,
-                "state": state
-            }
-            
-            # Determina il percorso di salvataggio
-            target_dir = self.base_dir / ("history" if is_final else "current")
-            checkpoint_file = target_dir / f"checkpoint_{session_id}.json"
-            
-            # Salva il checkpoint
-            with open(checkpoint_file, 'w', encoding='utf-8') as f:
-                json.dump(checkpoint_data, f, ensure_ascii=False, indent=2)
-            
+            timestamp = datetime.now().isoformat()
+            encoded = {key: json.dumps(value, ensure_ascii=False) for key, value in state.items()}
+
+            with self._lock:
+                journal = self._journals.get(session_id) or self._open_journal(session_id)
+                path = self._journal_path(session_id)
+                file_name = self._file_name(state)
+
+                if not path.exists():
+                    journal = _Journal(encoded, {
+                        'type': 'header', 'version': JOURNAL_VERSION, 'session_id': session_id,
+                        'created': timestamp, 'file_name': file_name
+                    })
+                    self._write_snapshot(path, journal, timestamp)
+                else:
+                    changed = {key: value for key, value in encoded.items() if journal.encoded.get(key) != value}
+                    removed = [key for key in journal.encoded if key not in encoded]
+                    self._append(path, journal, self._update_line(timestamp, changed, removed))
+                    journal.encoded = encoded
+                    journal.updates += 1
+                    if file_name and not journal.header.get('file_name'):
+                        journal.header['file_name'] = file_name
+                        journal.updates = CHECKPOINT_SETTINGS['COMPACT_RECORDS']  # Intestazione da riscrivere
+                    if journal.updates >= CHECKPOINT_SETTINGS['COMPACT_RECORDS']:
+                        self._write_snapshot(path, journal, timestamp)
+                self._journals[session_id] = journal
+
+                if is_final:
+                    # L'istantanea finale va in cronologia; il journal corrente non serve più
+                    journal.header['completed'] = timestamp
+                    self._write_snapshot(self._journal_path(session_id, final=True), journal, timestamp)
+                    path.unlink(missing_ok=True)
+                    self._legacy_path(session_id).unlink(missing_ok=True)
+                    del self._journals[session_id]
+
             # Se è un checkpoint finale, copia anche i file associati
             if is_final and "file_paths" in state:
                 self._archive_files(session_id, state["file_paths"])
-            
-            logger.info(f"Checkpoint salvato: {checkpoint_file}")
+
+            logger.debug(f"Checkpoint salvato per la sessione {session_id}")
             return True
-            
+
         except Exception as e:
             logger.error(f"Errore nel salvataggio del checkpoint: {e}")
             return False
-    
+
+    @staticmethod
+    def _update_line(timestamp: str, changed: Dict[str, str], removed: List[str]) -> str:
+        """Riga di aggiornamento composta dai valori già serializzati."""
+        fields = ", ".join(f"{json.dumps(key)}: {value}" for key, value in changed.items())
+        return (
+            f'{{"type": "update", "timestamp": {json.dumps(timestamp)}, '
+            f'"set": {{{fields}}}, "unset": {json.dumps(removed)}}}\n'
+        )
+
+    def _append(self, path: Path, journal: _Journal, line: str):
+        """Aggiunge una riga al journal, con fsync a gruppi."""
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            journal.unsynced += 1
+            if (journal.unsynced >= CHECKPOINT_SETTINGS['FSYNC_EVERY']
+                    or time.monotonic() - journal.last_sync >= CHECKPOINT_SETTINGS['FSYNC_INTERVAL']):
+                f.flush()
+                os.fsync(f.fileno())
+                journal.unsynced = 0
+                journal.last_sync = time.monotonic()
+
+    def _write_snapshot(self, path: Path, journal: _Journal, timestamp: str):
+        """Riscrive il journal come intestazione più istantanea (file temporaneo e rename atomico)."""
+        fields = ", ".join(f"{json.dumps(key)}: {value}" for key, value in journal.encoded.items())
+        temp_path = path.with_name(path.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(journal.header, ensure_ascii=False) + '\n')
+            f.write(f'{{"type": "snapshot", "timestamp": {json.dumps(timestamp)}, "state": {{{fields}}}}}\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+        journal.updates = 0
+        journal.unsynced = 0
+        journal.last_sync = time.monotonic()
+
+    def _legacy_path(self, session_id: str, final: bool = False) -> Path:
+        return self.base_dir / ("history" if final else "current") / f"checkpoint_{session_id}.json"
+
+    @staticmethod
+    def _replay(path: Path) -> Optional[Dict[str, Any]]:
+        """
+        Ricostruisce stato, intestazione e timestamp dell'ultimo record di un journal.
+
+        Returns:
+            Optional[Dict]: header, state (valori serializzati), timestamp,
+            updates e damaged (righe scartate), o None se il journal non
+            contiene un'istantanea valida
+        """
+        header, encoded, timestamp, updates, damaged = None, None, None, 0, False
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Record non valido ignorato nel journal {path.name}")
+                    damaged = True
+                    continue
+                kind = record.get('type')
+                if kind == 'header':
+                    header = record
+                elif kind == 'snapshot':
+                    encoded = {key: json.dumps(value, ensure_ascii=False) for key, value in record['state'].items()}
+                    timestamp, updates = record['timestamp'], 0
+                elif kind == 'update' and encoded is not None:
+                    for key, value in record['set'].items():
+                        encoded[key] = json.dumps(value, ensure_ascii=False)
+                    for key in record['unset']:
+                        encoded.pop(key, None)
+                    timestamp = record['timestamp']
+                    updates += 1
+        if header is None or encoded is None:
+            return None
+        return {'header': header, 'state': encoded, 'timestamp': timestamp, 'updates': updates, 'damaged': damaged}
+
+    def _open_journal(self, session_id: str) -> _Journal:
+        """Riprende il journal corrente di una sessione (ad es. dopo un riavvio)."""
+        path = self._journal_path(session_id)
+        replayed = self._replay(path) if path.exists() else None
+        if replayed is None:
+            path.unlink(missing_ok=True)  # Journal assente o inutilizzabile: si riparte da un'istantanea
+            return _Journal({}, {})
+        # Con righe scartate (ad es. troncate) si compatta subito: un append le completerebbe
+        updates = CHECKPOINT_SETTINGS['COMPACT_RECORDS'] if replayed['damaged'] else replayed['updates']
+        return _Journal(replayed['state'], replayed['header'], updates)
+
     def load_checkpoint(self, session_id: str) -> Optional[Dict[str, Any]]:
         """
         Carica l'ultimo checkpoint disponibile per una sessione.
-        
+
         Args:
             session_id: Identificatore della sessione
-            
+
         Returns:
-            Optional[Dict]: Stato del checkpoint o None se non trovato
+            Optional[Dict]: Checkpoint (timestamp, session_id, state) o None se non trovato
         """
         try:
-            # Cerca prima nei checkpoint correnti
-            checkpoint_file = self.base_dir / "current" / f"checkpoint_{session_id}.json"
-            if not checkpoint_file.exists():
-                # Cerca nella cronologia
-                checkpoint_file = self.base_dir / "history" / f"checkpoint_{session_id}.json"
-                if not checkpoint_file.exists():
-                    return None
-            
-            with open(checkpoint_file, 'r', encoding='utf-8') as f:
-                checkpoint_data = json.load(f)
-            
-            logger.info(f"Checkpoint caricato: {checkpoint_file}")
-            return checkpoint_data
-            
+            # Cerca prima nei checkpoint correnti, poi nella cronologia
+            for final in (False, True):
+                path = self._journal_path(session_id, final)
+                if path.exists():
+                    replayed = self._replay(path)
+                    if replayed is None:
+                        continue
+                    logger.info(f"Checkpoint caricato: {path}")
+                    return {
+                        "timestamp": replayed['timestamp'],
+                        "session_id": session_id,
+                        "state": {key: json.loads(value) for key, value in replayed['state'].items()}
+                    }
+
+                legacy_path = self._legacy_path(session_id, final)
+                if legacy_path.exists():
+                    with open(legacy_path, 'r', encoding='utf-8') as f:
+                        checkpoint_data = json.load(f)
+                    logger.info(f"Checkpoint caricato: {legacy_path}")
+                    return checkpoint_data
+            return None
+
         except Exception as e:
             logger.error(f"Errore nel caricamento del checkpoint: {e}")
             return None
-    
+
     def _archive_files(self, session_id: str, file_paths: list):
         """
         Archivia i file associati a una sessione.
-        
+
         Args:
             session_id: Identificatore della sessione
             file_paths: Lista dei percorsi dei file da archiviare
@@ -108,53 +267,87 @@ class CheckpointManager:
         try:
             archive_dir = self.base_dir / "history" / session_id / "files"
             archive_dir.mkdir(parents=True, exist_ok=True)
-            
+
             for file_path in file_paths:
                 if isinstance(file_path, (str, Path)):
                     path = Path(file_path)
                     if path.exists():
                         shutil.copy2(path, archive_dir / path.name)
-                        
+
         except Exception as e:
             logger.error(f"Errore nell'archiviazione dei file: {e}")
-    
+
     def list_sessions(self, include_current: bool = True, include_history: bool = True) -> list:
         """
         Lista tutte le sessioni disponibili.
-        
+
+        Dei journal viene letta solo la riga di intestazione; l'ora
+        dell'ultimo checkpoint è quella di modifica del file.
+
         Args:
             include_current: Includi sessioni correnti
             include_history: Includi sessioni dalla cronologia
-            
+
         Returns:
             list: Lista delle sessioni trovate
         """
         sessions = []
-        
+
         try:
+            directories = []
             if include_current:
-                current_files = list((self.base_dir / "current").glob("checkpoint_*.json"))
-                sessions.extend([self._load_session_info(f) for f in current_files])
-                
+                directories.append(self.base_dir / "current")
             if include_history:
-                history_files = list((self.base_dir / "history").glob("checkpoint_*.json"))
-                sessions.extend([self._load_session_info(f) for f in history_files])
-                
+                directories.append(self.base_dir / "history")
+
+            for directory in directories:
+                sessions.extend(self._load_session_info(f) for f in directory.glob("checkpoint_*.jsonl"))
+                sessions.extend(self._load_legacy_session_info(f) for f in directory.glob("checkpoint_*.json"))
+
             # Ordina per timestamp decrescente
-            sessions.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+            sessions.sort(key=lambda x: str(x.get('timestamp', '')), reverse=True)
             return sessions
-            
+
         except Exception as e:
             logger.error(f"Errore nel listing delle sessioni: {e}")
             return []
-    
-    def _load_session_info(self, checkpoint_file: Path) -> dict:
+
+    def _load_session_info(self, journal_file: Path) -> dict:
         """
-        Carica le informazioni base di una sessione.
-        
+        Legge le informazioni base di una sessione dall'intestazione del journal.
+
+        Args:
+            journal_file: Percorso del journal
+
+        Returns:
+            dict: Informazioni della sessione
+        """
+        session_id = journal_file.name[len("checkpoint_"):-len(".jsonl")]
+        try:
+            with open(journal_file, 'r', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+            modified = datetime.fromtimestamp(journal_file.stat().st_mtime).isoformat()
+            return {
+                "session_id": header.get("session_id", session_id),
+                "timestamp": modified,
+                "is_complete": journal_file.parent.name == "history",
+                "file_name": header.get("file_name")
+            }
+        except Exception:
+            return {
+                "session_id": session_id,
+                "timestamp": journal_file.stat().st_mtime,
+                "is_complete": journal_file.parent.name == "history",
+                "file_name": "Unknown"
+            }
+
+    def _load_legacy_session_info(self, checkpoint_file: Path) -> dict:
+        """
+        Carica le informazioni base di una sessione da un checkpoint nel vecchio formato.
+
         Args:
             checkpoint_file: Percorso del file di checkpoint
-            
+
         Returns:
             dict: Informazioni della sessione
         """
@@ -174,33 +367,33 @@ class CheckpointManager:
                 "is_complete": checkpoint_file.parent.name == "history",
                 "file_name": "Unknown"
             }
-    
+
     def cleanup_old_sessions(self, days: int = 7):
         """
         Rimuove le sessioni più vecchie di X giorni.
-        
+
         Args:
             days: Numero di giorni dopo i quali eliminare le sessioni
         """
         try:
             current_time = datetime.now().timestamp()
             max_age = days * 24 * 3600
-            
-            # Pulisci directory current
-            for checkpoint_file in (self.base_dir / "current").glob("checkpoint_*.json"):
-                if (current_time - checkpoint_file.stat().st_mtime) > max_age:
-                    checkpoint_file.unlink()
-            
-            # Pulisci directory history
-            for checkpoint_file in (self.base_dir / "history").glob("checkpoint_*.json"):
-                if (current_time - checkpoint_file.stat().st_mtime) > max_age:
-                    session_id = checkpoint_file.stem.replace("checkpoint_", "")
+
+            for folder in ("current", "history"):
+                for checkpoint_file in list((self.base_dir / folder).glob("checkpoint_*.json*")):
+                    if checkpoint_file.suffix not in ('.json', '.jsonl'):
+                        continue
+                    if (current_time - checkpoint_file.stat().st_mtime) <= max_age:
+                        continue
+                    session_id = checkpoint_file.name[len("checkpoint_"):].rsplit('.', 1)[0]
+                    with self._lock:
+                        self._journals.pop(session_id, None)
                     session_dir = checkpoint_file.parent / session_id
-                    if session_dir.exists():
+                    if folder == "history" and session_dir.exists():
                         shutil.rmtree(session_dir)
                     checkpoint_file.unlink()
-                    
+
             logger.info(f"Pulizia completata per sessioni più vecchie di {days} giorni")
-            
+
         except Exception as e:
-            logger.error(f"Errore durante la pulizia delle sessioni: {e}")
\ No newline at end of file
+            logger.error(f"Errore durante la pulizia delle sessioni: {e}")
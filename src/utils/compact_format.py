@@ -0,0 +1,112 @@
+# src/utils/compact_format.py
+
+from typing import Any, Dict, List, Optional
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Ordine dei valori posizionali in una riga del formato compatto
+COMPACT_COLUMNS = [
+    "codice",
+    "descrizione",
+    "tipo_prezzo",
+    "prezzo_unitario",
+    "descrizione_quantita",
+    "prezzi_quantita"
+]
+
+# Ordine dei valori posizionali in uno scaglione di prezzo per quantità
+TIER_COLUMNS = [
+    "quantita",
+    "prezzo",
+    "quantita_minima",
+    "non_vendibile_separatamente"
+]
+
+# Abbreviazioni del tipo di prezzo usate nel formato compatto
+PRICE_TYPES = {
+    "s": "singolo",
+    "q": "quantita"
+}
+
+def is_compact(data: Any) -> bool:
+    """
+    Verifica se una risposta decodificata è nel formato compatto.
+
+    Args:
+        data: Risposta JSON decodificata
+
+    Returns:
+        bool: True se contiene le righe posizionali ("r")
+    """
+    return isinstance(data, dict) and isinstance(data.get("r"), list)
+
+def expand_row(row: Any, columns: Optional[List[str]] = None) -> Optional[Dict]:
+    """
+    Converte una riga posizionale nel dizionario prodotto canonico.
+
+    Esempio:
+        ["RC330-40", "Sedia - Misura 40 cm", "s", 148.0, null, null]
+        ["AB12", "Guanti", "q", null, "Pz.4 non vendibili separatamente",
+         [[4, 39.0, 1, 1], [12, 35.0, 0, 1]]]
+
+    I valori null vengono omessi: la validazione successiva applica le
+    stesse regole del formato esteso.
+
+    Args:
+        row: Riga del formato compatto
+        columns: Intestazione della risposta; se None usa COMPACT_COLUMNS
+
+    Returns:
+        Optional[Dict]: Prodotto espanso o None se la riga non è una lista
+    """
+    if not isinstance(row, list):
+        return None
+
+    columns = columns or COMPACT_COLUMNS
+    product = {}
+    for name, value in zip(columns, row):
+        if value is None:
+            continue
+        if name == "tipo_prezzo":
+            value = PRICE_TYPES.get(value, value)
+        elif name == "prezzi_quantita":
+            value = [_expand_tier(tier) for tier in value if isinstance(tier, list)]
+        product[name] = value
+    return product
+
+def _expand_tier(tier: List) -> Dict:
+    """
+    Converte uno scaglione posizionale in dizionario.
+
+    Args:
+        tier: [quantita, prezzo, quantita_minima, non_vendibile_separatamente]
+
+    Returns:
+        Dict: Scaglione espanso; i flag 0/1 diventano booleani
+    """
+    expanded = dict(zip(TIER_COLUMNS, tier))
+    for flag in ("quantita_minima", "non_vendibile_separatamente"):
+        if flag in expanded:
+            expanded[flag] = bool(expanded[flag])
+    return expanded
+
+def expand_compact(data: Dict) -> Dict:
+    """
+    Converte una risposta compatta nella forma canonica {"prodotti": [...]}.
+
+    Args:
+        data: Risposta compatta {"c": [intestazione], "r": [[...], ...]}
+
+    Returns:
+        Dict: Dati nel formato atteso da JSONValidator
+    """
+    columns = data.get("c") if isinstance(data.get("c"), list) else None
+    products = []
+    for row in data.get("r", []):
+        product = expand_row(row, columns)
+        if product is None:
+            logger.warning(f"Riga compatta non valida ignorata: {row!r}")
+            continue
+        products.append(product)
+    return {"prodotti": products}
@@ -0,0 +1,57 @@
+# src/utils/file_spool.py
+
+import hashlib
+import os
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+from src.config.settings import OUTPUT_SETTINGS
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+def spool_to_disk(
+    source: BinaryIO,
+    destination: Path,
+    chunk_size: Optional[int] = None
+) -> Tuple[int, str]:
+    """
+    Copia un file caricato su disco a blocchi, calcolando l'hash durante la copia.
+    
+    Il contenuto non viene mai materializzato per intero in memoria: ogni
+    blocco viene scritto e aggiunto all'hash SHA-256 prima di leggere il
+    successivo. La scrittura avviene su un file temporaneo rinominato solo
+    a copia completata, così un file interrotto non viene mai aperto dalle
+    fasi successive.
+    
+    Args:
+        source: Oggetto con metodo read (ad es. UploadedFile di Streamlit)
+        destination: Percorso finale del file
+        chunk_size: Dimensione dei blocchi; se None usa OUTPUT_SETTINGS['SPOOL_CHUNK_SIZE']
+        
+    Returns:
+        Tuple[int, str]: (byte scritti, hash SHA-256 esadecimale)
+    """
+    chunk_size = chunk_size or OUTPUT_SETTINGS['SPOOL_CHUNK_SIZE']
+    partial = destination.with_name(destination.name + '.part')
+    digest = hashlib.sha256()
+    size = 0
+    
+    if hasattr(source, 'seek'):
+        source.seek(0)
+        
+    try:
+        with open(partial, 'wb') as f:
+            while True:
+                chunk = source.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(partial, destination)
+    except Exception:
+        partial.unlink(missing_ok=True)
+        raise
+        
+    logger.debug(f"File salvato in {destination} ({size} byte, sha256 {digest.hexdigest()[:12]})")
+    return size, digest.hexdigest()
@@ -1,7 +1,10 @@
+import io
+from base64 import b64encode
 from PIL import Image
 from typing import Tuple, Optional
 from src.config.settings import IMAGE_SETTINGS
 from src.utils.logger import setup_logger
+from src.utils.timing import timed
 
 logger = setup_logger(__name__)
 
@@ -38,6 +41,7 @@ def validate_image(image: Image.Image) -> bool:
         logger.error(f"Errore durante la validazione dell'immagine: {e}")
         return False
 
+@timed('optimize_image')
 def optimize_image(
     image: Image.Image,
     max_size: Optional[Tuple[int, int]] = None
@@ -95,3 +99,184 @@ def get_image_info(image: Image.Image) -> dict:
         'mode': image.mode,
         'dpi': image.info.get('dpi', 'N/A')
     }
+
+class PageImage:
+    """
+    Pagina già codificata in JPEG, pronta per l'invio all'API.
+    
+    Il base64 viene calcolato una sola volta e riusato da tutte le
+    richieste della pagina (retry, continuazioni); l'immagine PIL viene
+    decodificata solo se serve (ad es. per dividere la pagina in metà).
+    """
+    
+    __slots__ = ('data', 'width', 'height', 'mode', '_base64')
+    
+    def __init__(self, data: bytes, width: int, height: int, mode: str = 'RGB'):
+        """
+        Args:
+            data: Contenuto JPEG
+            width: Larghezza in pixel
+            height: Altezza in pixel
+            mode: 'RGB' o 'L' (scala di grigi)
+        """
+        self.data = data
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self._base64: Optional[str] = None
+    
+    @property
+    def size(self) -> Tuple[int, int]:
+        """Dimensioni (larghezza, altezza), come Image.size."""
+        return self.width, self.height
+    
+    @property
+    def base64(self) -> str:
+        """Contenuto JPEG codificato in base64 (calcolato al primo accesso)."""
+        if self._base64 is None:
+            self._base64 = b64encode(self.data).decode('ascii')
+        return self._base64
+    
+    def to_pil(self) -> Image.Image:
+        """Decodifica il JPEG in un'immagine PIL."""
+        image = Image.open(io.BytesIO(self.data))
+        image.load()
+        return image
+
+def render_page(
+    page,
+    dpi: int,
+    max_size: Optional[Tuple[int, int]] = None,
+    grayscale: bool = False,
+    quality: Optional[int] = None
+) -> PageImage:
+    """
+    Renderizza una pagina PyMuPDF direttamente in JPEG, senza passare da PIL.
+    
+    La pagina viene rasterizzata già alla dimensione finale (la minore tra
+    la risoluzione richiesta e quella che rientra in max_size), quindi non
+    esistono copie a piena risoluzione né ridimensionamenti successivi.
+    
+    Args:
+        page: Pagina PyMuPDF
+        dpi: Risoluzione massima di rendering
+        max_size: Dimensioni massime (width, height). Se None, usa IMAGE_SETTINGS
+        grayscale: Se True rasterizza in scala di grigi (JPEG a un canale)
+        quality: Qualità JPEG. Se None, usa IMAGE_SETTINGS['QUALITY']
+        
+    Returns:
+        PageImage: Pagina codificata
+    """
+    import fitz  # PyMuPDF, import differito perché pesante
+    
+    if max_size is None:
+        max_size = (IMAGE_SETTINGS['MAX_SIZE']['WIDTH'], IMAGE_SETTINGS['MAX_SIZE']['HEIGHT'])
+    rect = page.rect
+    zoom = min(dpi / 72, max_size[0] / rect.width, max_size[1] / rect.height)
+    
+    pix = page.get_pixmap(
+        matrix=fitz.Matrix(zoom, zoom),
+        colorspace=fitz.csGRAY if grayscale else fitz.csRGB,
+        alpha=False
+    )
+    data = pix.tobytes('jpeg', jpg_quality=quality or IMAGE_SETTINGS['QUALITY'])
+    return PageImage(data, pix.width, pix.height, 'L' if grayscale else 'RGB')
+
+def _scanned_image(page, min_coverage: float) -> Optional[tuple]:
+    """
+    Riconosce una pagina scansionata: un solo JPEG disegnato diritto a tutta
+    pagina, senza testo visibile né grafica vettoriale (un eventuale livello
+    OCR invisibile è ammesso).
+    
+    Usa solo metadati e content stream, senza decodificare l'immagine
+    (get_image_rects la decodifica e costa quanto un rendering).
+    
+    Returns:
+        Optional[tuple]: Voce di page.get_images(full=True) dell'immagine, o
+        None se la pagina va renderizzata
+    """
+    if page.rotation:
+        return None
+    images = page.get_images(full=True)
+    # Una sola immagine JPEG, senza maschera, disegnata direttamente dalla pagina
+    if len(images) != 1:
+        return None
+    xref, smask, width, height, _, _, _, _, image_filter, referencer = images[0]
+    if smask or referencer or image_filter != 'DCTDecode':
+        return None
+    document = page.parent
+    if document.xref_get_key(xref, 'Decode')[0] != 'null':
+        return None
+    
+    boxes = page.get_bboxlog()
+    image_boxes = [box for kind, box in boxes if kind == 'fill-image']
+    if len(image_boxes) != 1 or any(kind not in ('fill-image', 'ignore-text') for kind, _ in boxes):
+        return None
+    
+    import fitz  # PyMuPDF, import differito perché pesante
+    
+    page_rect = page.rect
+    if (fitz.Rect(image_boxes[0]) & page_rect).get_area() < min_coverage * page_rect.get_area():
+        return None
+    
+    # Un'unica trasformazione, senza rotazioni né specchiature
+    tokens = page.read_contents().split()
+    if tokens.count(b'cm') != 1 or tokens.count(b'Do') != 1:
+        return None
+    position = tokens.index(b'cm')
+    try:
+        a, b, c, d = (float(token) for token in tokens[position - 6:position - 2])
+    except ValueError:
+        return None
+    if b or c or a <= 0 or d <= 0:
+        return None
+    return images[0]
+
+def extract_scanned_page(
+    page,
+    dpi: int,
+    max_size: Optional[Tuple[int, int]] = None,
+    grayscale: bool = False,
+    min_coverage: Optional[float] = None
+) -> Optional[PageImage]:
+    """
+    Riusa il JPEG incorporato di una pagina scansionata senza renderizzarla.
+    
+    I byte vengono restituiti senza modifiche (nessuna decodifica né
+    ricompressione) se l'immagine è RGB o in scala di grigi e rientra nelle
+    dimensioni che render_page produrrebbe. Le scansioni più grandi vanno
+    renderizzate: MuPDF decodifica il JPEG già ridotto (scala DCT) e lo
+    ricampiona una sola volta, più in fretta di una decodifica con PIL.
+    
+    Args:
+        page: Pagina PyMuPDF
+        dpi: Risoluzione massima equivalente
+        max_size: Dimensioni massime (width, height). Se None, usa IMAGE_SETTINGS
+        grayscale: Se True sono ammesse solo scansioni in scala di grigi
+        min_coverage: Frazione minima della pagina coperta dall'immagine.
+            Se None, usa IMAGE_SETTINGS['SCAN_MIN_COVERAGE']
+        
+    Returns:
+        Optional[PageImage]: Pagina con il JPEG originale, o None se la
+        pagina va renderizzata con render_page
+    """
+    if max_size is None:
+        max_size = (IMAGE_SETTINGS['MAX_SIZE']['WIDTH'], IMAGE_SETTINGS['MAX_SIZE']['HEIGHT'])
+    image = _scanned_image(page, min_coverage or IMAGE_SETTINGS['SCAN_MIN_COVERAGE'])
+    if image is None:
+        return None
+    
+    # Stesso limite di render_page: la pagina alla risoluzione richiesta, entro max_size
+    rect = page.rect
+    zoom = min(dpi / 72, max_size[0] / rect.width, max_size[1] / rect.height)
+    width, height = image[2], image[3]
+    if width > round(rect.width * zoom) or height > round(rect.height * zoom):
+        return None
+    
+    extracted = page.parent.extract_image(image[0])
+    if not extracted or extracted['ext'] != 'jpeg' or extracted['colorspace'] not in (1, 3):
+        return None  # CMYK e simili: la conversione la fa MuPDF
+    mode = 'L' if extracted['colorspace'] == 1 else 'RGB'
+    if grayscale and mode != 'L':
+        return None
+    return PageImage(extracted['image'], width, height, mode)
@@ -0,0 +1,97 @@
+# src/utils/json_recovery.py
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+from src.utils.json_stream import IncrementalJSONParser
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Virgole finali prima della chiusura di un oggetto o di un array
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+
+def repair_json(content: str) -> Optional[Any]:
+    """
+    Decodifica un JSON correggendo gli errori più comuni dei modelli.
+
+    Gestisce le virgole finali e il testo extra prima o dopo il valore
+    radice. Non tenta di completare un JSON troncato: per quello si usa
+    salvage_items.
+
+    Args:
+        content: Testo da decodificare
+
+    Returns:
+        Optional[Any]: Valore decodificato o None se non recuperabile
+    """
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError:
+        pass
+
+    # Considera solo il testo tra la prima apertura e l'ultima chiusura
+    start = min((i for i in (content.find('{'), content.find('[')) if i >= 0), default=-1)
+    end = max(content.rfind('}'), content.rfind(']'))
+    if start < 0 or end <= start:
+        return None
+
+    candidate = _TRAILING_COMMA.sub(r'\1', content[start:end + 1])
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        return None
+
+def salvage_items(content: str) -> List[Any]:
+    """
+    Estrae tutti gli elementi completi dell'array dei prodotti da un testo
+    troncato o parzialmente malformato.
+
+    Args:
+        content: Testo della risposta
+
+    Returns:
+        List[Any]: Elementi completi trovati (eventualmente vuota)
+    """
+    parser = IncrementalJSONParser()
+    return parser.feed(content)
+
+def product_key(product: Dict) -> str:
+    """
+    Restituisce la chiave di deduplicazione di un prodotto.
+
+    Il codice identifica il prodotto; in sua assenza si usa l'intero record.
+
+    Args:
+        product: Prodotto sanitizzato
+
+    Returns:
+        str: Chiave di deduplicazione
+    """
+    codice = str(product.get("codice", "")).strip()
+    if codice:
+        return f"codice:{codice}"
+    return "record:" + json.dumps(product, sort_keys=True, ensure_ascii=False)
+
+def merge_products(*groups: List[Dict]) -> List[Dict]:
+    """
+    Unisce più liste di prodotti mantenendo l'ordine ed eliminando i duplicati.
+
+    In caso di duplicati vince la prima occorrenza.
+
+    Args:
+        *groups: Liste di prodotti da unire
+
+    Returns:
+        List[Dict]: Prodotti unici
+    """
+    merged = []
+    seen = set()
+    for group in groups:
+        for product in group:
+            key = product_key(product)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(product)
+    return merged
@@ -0,0 +1,116 @@
+# src/utils/json_stream.py
+
+import json
+from typing import Any, List, Optional
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+class IncrementalJSONParser:
+    """
+    Parser JSON incrementale per le risposte in streaming.
+
+    Riceve il testo a frammenti ed emette ogni elemento dell'array dei
+    prodotti non appena il relativo oggetto viene chiuso, senza attendere
+    la fine della risposta. Il testo che precede la prima parentesi (ad es.
+    i delimitatori markdown ```json) viene ignorato.
+
+    Sono supportate entrambe le forme:
+        {"prodotti": [{...}, {...}]}  -> elementi a profondità 2
+        [{...}, {...}]                -> elementi a profondità 1
+    """
+
+    def __init__(self):
+        """Inizializza lo stato del parser."""
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._item_depth: Optional[int] = None
+        self._item_start: Optional[int] = None
+        self.items_emitted = 0
+
+    @property
+    def text(self) -> str:
+        """Testo ricevuto finora."""
+        return self._text
+
+    @property
+    def is_complete(self) -> bool:
+        """True se il valore JSON radice è stato chiuso."""
+        return self._item_depth is not None and not self._stack
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        Aggiunge un frammento di testo e restituisce gli elementi completati.
+
+        Args:
+            chunk: Frammento di testo ricevuto dallo stream
+
+        Returns:
+            List[Any]: Elementi dell'array chiusi grazie a questo frammento
+        """
+        if not chunk:
+            return []
+
+        self._text += chunk
+        completed = []
+
+        text = self._text
+        for index in range(self._pos, len(text)):
+            char = text[index]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if char == '"':
+                # Le stringhe fuori da qualsiasi contenitore non ci interessano
+                if self._stack:
+                    self._in_string = True
+
+            elif char in '{[':
+                if self._item_depth is None:
+                    # Il tipo del valore radice determina dove si trovano i prodotti
+                    self._item_depth = 2 if char == '{' else 1
+                if (len(self._stack) == self._item_depth
+                        and self._stack[-1] == '['
+                        and self._item_start is None):
+                    self._item_start = index
+                self._stack.append(char)
+
+            elif char in '}]':
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if len(self._stack) == self._item_depth and self._item_start is not None:
+                    item = self._decode(text[self._item_start:index + 1])
+                    self._item_start = None
+                    if item is not None:
+                        completed.append(item)
+
+        self._pos = len(text)
+        self.items_emitted += len(completed)
+        return completed
+
+    def _decode(self, fragment: str) -> Optional[Any]:
+        """
+        Decodifica un singolo elemento, ignorandolo se non è JSON valido.
+
+        Args:
+            fragment: Testo dell'elemento completo
+
+        Returns:
+            Optional[Any]: Elemento decodificato o None
+        """
+        try:
+            return json.loads(fragment)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Elemento JSON non valido ignorato: {str(e)}")
+            return None
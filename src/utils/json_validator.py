@@ -1,7 +1,7 @@
 # src/utils/json_validator.py
 
+import copy
 from typing import Dict, Optional, Tuple, Any
-from jsonschema import validate, ValidationError, Draft7Validator
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -82,6 +82,70 @@ class JSONValidator:
         "additionalProperties": False
     }
 
+    # Validatore compilato, creato al primo utilizzo (import di jsonschema differito)
+    _validator = None
+
+    # Parole chiave non supportate dagli structured output in modalità strict
+    _UNSUPPORTED_STRICT_KEYWORDS = ("allOf", "if", "then", "not", "minimum")
+
+    @classmethod
+    def build_response_schema(cls) -> Dict:
+        """
+        Genera dal PRODUCT_SCHEMA lo schema per gli structured output
+        (response_format di tipo json_schema in modalità strict).
+        
+        In modalità strict ogni proprietà deve essere obbligatoria: i campi
+        facoltativi diventano quindi nullable, e le parole chiave non
+        supportate (condizioni e minimi) vengono rimosse. I vincoli rimossi
+        restano verificati da validate_and_sanitize sulla risposta.
+        
+        Returns:
+            Dict: Schema JSON compatibile con la modalità strict
+        """
+        return cls._to_strict_schema(copy.deepcopy(cls.PRODUCT_SCHEMA))
+
+    @classmethod
+    def _to_strict_schema(cls, schema: Dict, nullable: bool = False) -> Dict:
+        """
+        Converte ricorsivamente uno (sotto)schema nella forma strict.
+        
+        Args:
+            schema: Schema da convertire
+            nullable: Se True, il valore può essere null
+            
+        Returns:
+            Dict: Schema convertito
+        """
+        strict = {
+            key: value for key, value in schema.items()
+            if key not in cls._UNSUPPORTED_STRICT_KEYWORDS
+            and key not in ("properties", "items", "required", "additionalProperties")
+        }
+        
+        if "enum" in strict and "type" not in strict:
+            strict["type"] = "string"
+        
+        if "properties" in schema:
+            required = set(schema.get("required", []))
+            strict["properties"] = {
+                name: cls._to_strict_schema(subschema, nullable=name not in required)
+                for name, subschema in schema["properties"].items()
+            }
+            strict["required"] = list(schema["properties"])
+            strict["additionalProperties"] = False
+            
+        if "items" in schema:
+            strict["items"] = cls._to_strict_schema(schema["items"])
+            
+        if nullable:
+            types = strict["type"] if isinstance(strict["type"], list) else [strict["type"]]
+            if "null" not in types:
+                strict["type"] = types + ["null"]
+            if "enum" in strict and None not in strict["enum"]:
+                strict["enum"] = strict["enum"] + [None]
+                
+        return strict
+
     @classmethod
     def validate_product_data(cls, data: Dict) -> Tuple[bool, Optional[str]]:
         """
@@ -93,8 +157,10 @@ class JSONValidator:
         Returns:
             Tuple[bool, Optional[str]]: (validazione_ok, messaggio_errore)
         """
+        from jsonschema import ValidationError
+        
         try:
-            validate(instance=data, schema=cls.PRODUCT_SCHEMA)
+            cls._get_validator().validate(data)
             return True, None
         except ValidationError as e:
             error_path = " -> ".join(str(p) for p in e.path)
@@ -102,6 +168,19 @@ class JSONValidator:
             logger.error(error_message)
             return False, error_message
 
+    @classmethod
+    def _get_validator(cls):
+        """
+        Restituisce il validatore dello schema, compilato una sola volta.
+        
+        Returns:
+            Draft7Validator: Validatore per PRODUCT_SCHEMA
+        """
+        if cls._validator is None:
+            from jsonschema import Draft7Validator
+            cls._validator = Draft7Validator(cls.PRODUCT_SCHEMA)
+        return cls._validator
+
     @classmethod
     def get_validation_errors(cls, data: Dict) -> list:
         """
@@ -113,9 +192,8 @@ class JSONValidator:
         Returns:
             list: Lista degli errori di validazione
         """
-        validator = Draft7Validator(cls.PRODUCT_SCHEMA)
         errors = []
-        for error in validator.iter_errors(data):
+        for error in cls._get_validator().iter_errors(data):
             error_path = " -> ".join(str(p) for p in error.path)
             errors.append(f"{error_path}: {error.message}")
         return errors
@@ -155,7 +233,8 @@ class JSONValidator:
                     
             elif sanitized_product["tipo_prezzo"] == "quantita":
                 prezzi_quantita = []
-                for prezzo in prodotto.get("prezzi_quantita", []):
+                # Con gli structured output i campi assenti arrivano come null
+                for prezzo in prodotto.get("prezzi_quantita") or []:
                     if isinstance(prezzo, dict):
                         quantita = prezzo.get("quantita")
                         prezzo_val = prezzo.get("prezzo")
@@ -170,7 +249,7 @@ class JSONValidator:
                             })
                             
                 sanitized_product["prezzi_quantita"] = prezzi_quantita
-                if "descrizione_quantita" in prodotto:
+                if prodotto.get("descrizione_quantita") is not None:
                     sanitized_product["descrizione_quantita"] = str(prodotto["descrizione_quantita"])
                     
             sanitized_data["prodotti"].append(sanitized_product)
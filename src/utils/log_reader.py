@@ -0,0 +1,130 @@
+# src/utils/log_reader.py
+
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Intestazione di una riga scritta con LOG_SETTINGS['FORMAT']:
+# "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+_LINE_PATTERN = re.compile(
+    r'^(?P<asctime>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) - (?P<name>\S+) - (?P<levelname>[A-Z]+) - '
+)
+
+def tail_lines(path: Path, count: int, block_size: int = 8192) -> Tuple[List[str], int]:
+    """
+    Legge le ultime righe di un file partendo dalla fine, senza caricarlo
+    per intero.
+    
+    Args:
+        path: Percorso del file di log
+        count: Numero di righe da restituire
+        block_size: Dimensione dei blocchi letti a ritroso
+        
+    Returns:
+        Tuple[List[str], int]: (ultime righe, offset della fine del file)
+    """
+    if count <= 0 or not path.exists():
+        return [], 0
+        
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        position = end
+        data = b''
+        
+        # Una riga in più per scartare quella eventualmente tagliata a metà
+        while position > 0 and data.count(b'\n') <= count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            data = f.read(read_size) + data
+            
+    lines = data.decode('utf-8', errors='replace').splitlines()
+    if position > 0 and lines:
+        lines = lines[1:]
+    return lines[-count:], end
+
+def read_new_lines(path: Path, offset: int, max_bytes: int = 1024 * 1024) -> Tuple[List[str], int]:
+    """
+    Legge le righe aggiunte al file dopo un offset.
+    
+    Se il file è più corto dell'offset (rotazione del log) la lettura
+    riparte dall'inizio del nuovo file. Una riga finale incompleta viene
+    lasciata per la lettura successiva.
+    
+    Args:
+        path: Percorso del file di log
+        offset: Posizione raggiunta con la lettura precedente
+        max_bytes: Massimo numero di byte da leggere in una chiamata
+        
+    Returns:
+        Tuple[List[str], int]: (nuove righe complete, nuovo offset)
+    """
+    if not path.exists():
+        return [], 0
+        
+    size = path.stat().st_size
+    if size < offset:
+        offset = 0
+    if size == offset:
+        return [], offset
+        
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        data = f.read(max_bytes)
+        
+    last_newline = data.rfind(b'\n')
+    if last_newline < 0:
+        return [], offset
+        
+    complete = data[:last_newline + 1]
+    return complete.decode('utf-8', errors='replace').splitlines(), offset + len(complete)
+
+def parse_line(line: str) -> Optional[Dict[str, str]]:
+    """
+    Estrae timestamp, logger e livello dall'intestazione di una riga di log.
+    
+    Args:
+        line: Riga di log
+        
+    Returns:
+        Optional[Dict[str, str]]: Campi dell'intestazione, None per le righe
+        di continuazione (ad es. traceback)
+    """
+    match = _LINE_PATTERN.match(line)
+    return match.groupdict() if match else None
+
+def filter_lines(
+    lines: List[str],
+    min_level: int = logging.NOTSET,
+    logger_prefix: str = ''
+) -> List[str]:
+    """
+    Filtra le righe per livello minimo e prefisso del nome del logger.
+    
+    Le righe di continuazione seguono la sorte del record a cui appartengono.
+    
+    Args:
+        lines: Righe di log
+        min_level: Livello minimo da mostrare
+        logger_prefix: Prefisso del nome del logger (vuoto = tutti)
+        
+    Returns:
+        List[str]: Righe che soddisfano i filtri
+    """
+    if min_level <= logging.NOTSET and not logger_prefix:
+        return list(lines)
+        
+    selected = []
+    keep = False
+    for line in lines:
+        fields = parse_line(line)
+        if fields is not None:
+            level = logging.getLevelName(fields['levelname'])
+            level = level if isinstance(level, int) else logging.NOTSET
+            keep = level >= min_level and fields['name'].startswith(logger_prefix)
+        if keep:
+            selected.append(line)
+    return selected
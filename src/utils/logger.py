@@ -1,47 +1,189 @@
+import atexit
 import logging
+import queue
+import random
+import threading
 from pathlib import Path
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+from typing import Dict, Optional, Set
 from src.config.settings import LOG_SETTINGS
 
+# Handler condiviso da tutti i logger: i record vengono messi in coda e
+# scritti su file/console da un thread dedicato (QueueListener), così il
+# percorso critico non attende mai il disco
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+# Nomi dei logger configurati, per staccare e riattaccare l'handler condiviso
+_logger_names: Set[str] = set()
+
+def _parse_module_levels(spec: str) -> Dict[str, int]:
+    """
+    Interpreta la configurazione dei livelli per modulo.
+    
+    Formato: "src.extractor.vision_api=DEBUG,src.utils=WARNING"
+    
+    Args:
+        spec: Stringa di configurazione
+        
+    Returns:
+        Dict[str, int]: Prefisso del nome del logger -> livello
+    """
+    levels = {}
+    for entry in spec.split(','):
+        if '=' not in entry:
+            continue
+        name, level = (part.strip() for part in entry.split('=', 1))
+        value = logging.getLevelName(level.upper())
+        if name and isinstance(value, int):
+            levels[name] = value
+    return levels
+
+def get_log_level(name: str) -> int:
+    """
+    Restituisce il livello di log per un logger.
+    
+    Vale la voce di LOG_SETTINGS['MODULE_LEVELS'] con il prefisso più lungo
+    che corrisponde al nome, altrimenti LOG_SETTINGS['LEVEL'].
+    
+    Args:
+        name: Nome del logger
+        
+    Returns:
+        int: Livello di logging
+    """
+    module_levels = _parse_module_levels(LOG_SETTINGS['MODULE_LEVELS'])
+    matches = [
+        prefix for prefix in module_levels
+        if name == prefix or name.startswith(prefix + '.')
+    ]
+    if matches:
+        return module_levels[max(matches, key=len)]
+    level = LOG_SETTINGS['LEVEL']
+    # Un nome di livello non valido in LOG_LEVEL non deve impedire l'avvio
+    return level if isinstance(level, int) else logging.INFO
+
+def _get_queue_handler() -> QueueHandler:
+    """
+    Installa, una sola volta per processo, la coda di log con i relativi
+    handler su file (con rotazione) e console.
+    
+    Returns:
+        QueueHandler: Handler condiviso da aggiungere ai logger
+    """
+    global _queue_handler, _listener
+    
+    with _lock:
+        if _queue_handler is not None:
+            return _queue_handler
+            
+        # Crea la directory dei log se non esiste
+        log_file = Path(LOG_SETTINGS['FILE'])
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Formattazione
+        formatter = logging.Formatter(
+            fmt=LOG_SETTINGS['FORMAT'],
+            datefmt=LOG_SETTINGS['DATE_FORMAT']
+        )
+        
+        # Handler per il file con rotazione
+        file_handler = RotatingFileHandler(
+            log_file,
+            maxBytes=LOG_SETTINGS['MAX_BYTES'],
+            backupCount=LOG_SETTINGS['BACKUP_COUNT'],
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(formatter)
+        
+        # Handler per la console
+        console_handler = logging.StreamHandler()
+        console_handler.setFormatter(formatter)
+        
+        log_queue = queue.SimpleQueue()
+        _listener = QueueListener(log_queue, file_handler, console_handler)
+        _listener.start()
+        atexit.register(stop_logging)
+        
+        _queue_handler = QueueHandler(log_queue)
+        # Dopo stop_logging i logger già creati (ad es. a livello di modulo)
+        # tornano a scrivere sulla nuova coda
+        for name in _logger_names:
+            logging.getLogger(name).addHandler(_queue_handler)
+        return _queue_handler
+
+def stop_logging() -> None:
+    """
+    Svuota la coda di log e ferma il thread di scrittura.
+    
+    L'handler della coda viene staccato dai logger, altrimenti i record
+    successivi finirebbero in una coda che nessuno legge: fino alla
+    prossima chiamata di setup_logger risalgono al logger radice.
+    """
+    global _queue_handler, _listener
+    
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        if _queue_handler is not None:
+            for name in _logger_names:
+                logging.getLogger(name).removeHandler(_queue_handler)
+        _queue_handler = None
+
 def setup_logger(name: str = "pdf_extractor") -> logging.Logger:
     """
     Configura e restituisce un logger con rotazione dei file.
     
+    La configurazione è idempotente: chiamate ripetute (ad es. ad ogni
+    rerun di Streamlit) non aggiungono handler duplicati.
+    
     Args:
         name: Nome del logger
         
     Returns:
         Logger configurato
     """
-    # Crea la directory dei log se non esiste
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
-    # Configura il logger
     logger = logging.getLogger(name)
-    logger.setLevel(LOG_SETTINGS['LEVEL'])
-    
-    # Formattazione
-    formatter = logging.Formatter(
-        fmt=LOG_SETTINGS['FORMAT'],
-        datefmt=LOG_SETTINGS['DATE_FORMAT']
-    )
-    
-    # Handler per il file con rotazione
-    file_handler = RotatingFileHandler(
-        LOG_SETTINGS['FILE'],
-        maxBytes=LOG_SETTINGS['MAX_BYTES'],
-        backupCount=LOG_SETTINGS['BACKUP_COUNT']
-    )
-    file_handler.setFormatter(formatter)
-    
-    # Handler per la console
-    console_handler = logging.StreamHandler()
-    console_handler.setFormatter(formatter)
-    
-    # Aggiungi gli handler
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
-    
-    logger.info("Logger inizializzato")
-    return logger  
+    handler = _get_queue_handler()
+    with _lock:
+        _logger_names.add(name)
+    
+    if handler in logger.handlers:
+        return logger
+        
+    # Rimuove eventuali handler di una configurazione precedente (ad es. dopo stop_logging)
+    for old_handler in [h for h in logger.handlers if isinstance(h, QueueHandler)]:
+        logger.removeHandler(old_handler)
+        
+    logger.setLevel(get_log_level(name))
+    logger.addHandler(handler)
+    
+    logger.debug("Logger inizializzato")
+    return logger
+
+def truncate_payload(payload: str, max_chars: Optional[int] = None) -> str:
+    """
+    Tronca un contenuto voluminoso (ad es. una risposta API) prima del logging.
+    
+    Args:
+        payload: Testo da registrare
+        max_chars: Lunghezza massima; se None usa LOG_SETTINGS['PAYLOAD_MAX_CHARS']
+        
+    Returns:
+        str: Testo eventualmente troncato, con l'indicazione dei caratteri omessi
+    """
+    max_chars = LOG_SETTINGS['PAYLOAD_MAX_CHARS'] if max_chars is None else max_chars
+    if len(payload) <= max_chars:
+        return payload
+    return f"{payload[:max_chars]}... (+{len(payload) - max_chars} caratteri)"
+
+def should_log_payload() -> bool:
+    """
+    Decide se registrare per intero un contenuto voluminoso, secondo
+    LOG_SETTINGS['PAYLOAD_SAMPLE_RATE'].
+    
+    Returns:
+        bool: True se il contenuto va registrato
+    """
+    return random.random() < LOG_SETTINGS['PAYLOAD_SAMPLE_RATE']
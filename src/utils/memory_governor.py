@@ -0,0 +1,365 @@
+# src/utils/memory_governor.py
+
+import gc
+import threading
+import time
+from typing import Dict, List, Optional
+from src.config.settings import MEMORY_SETTINGS
+from src.utils.logger import setup_logger
+from src.utils.metrics import JOBS_ACTIVE, JOBS_QUEUED
+
+logger = setup_logger(__name__)
+
+# Livelli di pressione sulla memoria
+LEVEL_OK = 'ok'
+LEVEL_SOFT = 'soft'
+LEVEL_HARD = 'hard'
+
+class MemoryPressureError(Exception):
+    """Eccezione sollevata quando la memoria non consente di avviare o proseguire un job."""
+    pass
+
+class JobMemoryTracker:
+    """
+    Stato della memoria di una singola elaborazione.
+
+    Registra il picco di RSS e le decisioni prese dal governor (attese,
+    riduzione della risoluzione, riduzione del parallelismo), che finiscono
+    nelle metriche del job.
+    """
+
+    def __init__(self, governor: "MemoryGovernor", job_id: str):
+        """
+        Args:
+            governor: Governor che ha ammesso il job
+            job_id: Identificativo del job (ad es. l'id della sessione)
+        """
+        self.governor = governor
+        self.job_id = job_id
+        self.peak_rss_mb = 0.0
+        self.decisions: List[Dict] = []
+        self.queued_seconds = 0.0
+        self.throttled_seconds = 0.0
+        self.level = LEVEL_OK
+        self._degraded_dpi: Optional[int] = None
+
+    def sample(self) -> Dict:
+        """
+        Campiona la memoria e aggiorna picco e livello di pressione.
+
+        Returns:
+            Dict: Campione restituito da MemoryGovernor.sample
+        """
+        sample = self.governor.sample()
+        self.peak_rss_mb = max(self.peak_rss_mb, sample['rss_mb'])
+        self.level = sample['level']
+        return sample
+
+    def record(self, action: str, sample: Dict, **detail):
+        """
+        Registra una decisione del governor.
+
+        Args:
+            action: Tipo di decisione (queue, throttle, degrade_dpi, ...)
+            sample: Campione di memoria che l'ha motivata
+            **detail: Informazioni aggiuntive
+        """
+        decision = {
+            'action': action,
+            'level': sample['level'],
+            'rss_mb': round(sample['rss_mb'], 1),
+            'available_mb': round(sample['available_mb'], 1),
+            'time': round(time.time(), 3),
+            **detail
+        }
+        self.decisions.append(decision)
+        logger.warning(f"Job {self.job_id}: {action} ({decision})")
+
+    def throttle(self, stage: str = ''):
+        """
+        Rallenta il job prima di una fase che alloca memoria (rendering di
+        una pagina, richiesta API).
+
+        Sotto pressione lieve libera memoria e fa una breve pausa; sotto
+        pressione grave attende che la memoria rientri e, se non succede
+        entro MAX_THROTTLE_WAIT, interrompe il job.
+
+        Args:
+            stage: Descrizione della fase, usata nelle decisioni registrate
+
+        Raises:
+            MemoryPressureError: Se la pressione grave non rientra in tempo
+        """
+        sample = self.sample()
+        if sample['level'] == LEVEL_OK:
+            return
+
+        started = time.monotonic()
+        self.governor.cleanup()
+
+        if sample['level'] == LEVEL_SOFT:
+            self.record('throttle', sample, stage=stage, delay=MEMORY_SETTINGS['THROTTLE_DELAY'])
+            time.sleep(MEMORY_SETTINGS['THROTTLE_DELAY'])
+        else:
+            self.record('wait', sample, stage=stage)
+            deadline = started + MEMORY_SETTINGS['MAX_THROTTLE_WAIT']
+            while sample['level'] == LEVEL_HARD:
+                if time.monotonic() >= deadline:
+                    self.record('abort', sample, stage=stage)
+                    raise MemoryPressureError(
+                        f"Memoria insufficiente per proseguire l'elaborazione "
+                        f"(RSS {sample['rss_mb']:.0f} MB, disponibili {sample['available_mb']:.0f} MB)"
+                    )
+                time.sleep(MEMORY_SETTINGS['SAMPLE_INTERVAL'])
+                self.governor.cleanup()
+                sample = self.sample()
+
+        self.throttled_seconds += time.monotonic() - started
+
+    def render_dpi(self, dpi: int) -> int:
+        """
+        Restituisce la risoluzione di rendering da usare per la prossima pagina.
+
+        Sotto pressione la risoluzione scende a DEGRADED_DPI e resta tale
+        fino alla fine del job, così le pagine hanno qualità uniforme.
+
+        Args:
+            dpi: Risoluzione richiesta
+
+        Returns:
+            int: Risoluzione da usare
+        """
+        if self._degraded_dpi is not None:
+            return min(dpi, self._degraded_dpi)
+        if self.level != LEVEL_OK and dpi > MEMORY_SETTINGS['DEGRADED_DPI']:
+            self._degraded_dpi = MEMORY_SETTINGS['DEGRADED_DPI']
+            self.record('degrade_dpi', self.sample(), from_dpi=dpi, to_dpi=self._degraded_dpi)
+            return self._degraded_dpi
+        return dpi
+
+    def max_in_flight(self, requested: int) -> int:
+        """
+        Restituisce il numero di richieste contemporanee consentite.
+
+        Args:
+            requested: Parallelismo desiderato
+
+        Returns:
+            int: requested senza pressione, 1 altrimenti
+        """
+        if requested <= 1:
+            return requested
+        sample = self.sample()
+        if sample['level'] != LEVEL_OK:
+            self.record('limit_in_flight', sample, from_workers=requested, to_workers=1)
+            return 1
+        return requested
+
+    def to_dict(self) -> Dict:
+        """
+        Restituisce il riepilogo da salvare nelle metriche del job.
+
+        Returns:
+            Dict: Picco di RSS, attese e decisioni
+        """
+        return {
+            'job_id': self.job_id,
+            'peak_rss_mb': round(self.peak_rss_mb, 1),
+            'queued_seconds': round(self.queued_seconds, 3),
+            'throttled_seconds': round(self.throttled_seconds, 3),
+            'degraded_dpi': self._degraded_dpi,
+            'decisions': self.decisions
+        }
+
+class MemoryGovernor:
+    """
+    Controlla la memoria del processo e regola il carico di lavoro.
+
+    Il processo Streamlit è condiviso da tutte le sessioni: il governor
+    limita i job contemporanei, mette in coda i nuovi job quando la memoria
+    supera la soglia grave e fornisce a ogni job un JobMemoryTracker per
+    rallentare e degradare la qualità sotto pressione.
+    """
+
+    def __init__(self):
+        """Inizializza il governor con i limiti di MEMORY_SETTINGS."""
+        self._slots = threading.BoundedSemaphore(MEMORY_SETTINGS['MAX_CONCURRENT_JOBS'])
+        self._active = 0
+        self._active_lock = threading.Lock()
+        self._process = None
+        self._psutil_missing = False
+
+    def sample(self) -> Dict:
+        """
+        Misura RSS del processo e memoria disponibile nel sistema.
+
+        Returns:
+            Dict: rss_mb, available_mb, total_mb e level (ok, soft, hard);
+            senza psutil i valori sono 0 e il livello è sempre ok
+        """
+        try:
+            import psutil
+        except ImportError:
+            if not self._psutil_missing:
+                logger.warning("psutil non installato, impossibile monitorare la memoria")
+                self._psutil_missing = True
+            return {'rss_mb': 0.0, 'available_mb': 0.0, 'total_mb': 0.0, 'level': LEVEL_OK}
+
+        if self._process is None:
+            self._process = psutil.Process()
+        virtual = psutil.virtual_memory()
+        rss_mb = self._process.memory_info().rss / (1024 * 1024)
+        available_mb = virtual.available / (1024 * 1024)
+        return {
+            'rss_mb': rss_mb,
+            'available_mb': available_mb,
+            'total_mb': virtual.total / (1024 * 1024),
+            'level': self.pressure_level(rss_mb, available_mb)
+        }
+
+    @staticmethod
+    def pressure_level(rss_mb: float, available_mb: float) -> str:
+        """
+        Classifica la pressione sulla memoria.
+
+        Args:
+            rss_mb: Memoria residente del processo
+            available_mb: Memoria disponibile nel sistema
+
+        Returns:
+            str: LEVEL_OK, LEVEL_SOFT o LEVEL_HARD
+        """
+        if (rss_mb >= MEMORY_SETTINGS['RSS_HARD_LIMIT_MB']
+                or available_mb < MEMORY_SETTINGS['MIN_AVAILABLE_HARD_MB']):
+            return LEVEL_HARD
+        if (rss_mb >= MEMORY_SETTINGS['RSS_SOFT_LIMIT_MB']
+                or available_mb < MEMORY_SETTINGS['MIN_AVAILABLE_SOFT_MB']):
+            return LEVEL_SOFT
+        return LEVEL_OK
+
+    def cleanup(self):
+        """Forza il garbage collector per liberare memoria."""
+        gc.collect()
+
+    def admit(self, job_id: str, timeout: Optional[float] = None) -> JobMemoryTracker:
+        """
+        Ammette un nuovo job, mettendolo in coda se necessario.
+
+        Il job attende finché c'è uno slot libero e la memoria non è sotto
+        pressione grave. L'RSS del processo spesso non scende dopo un picco
+        (l'allocatore non restituisce la memoria): se nessun altro job è in
+        corso e la memoria di sistema basta, dopo RSS_ADMISSION_WAIT secondi
+        il job viene ammesso comunque. Il chiamante deve invocare release al
+        termine.
+
+        Args:
+            job_id: Identificativo del job
+            timeout: Attesa massima in coda; se None usa ADMISSION_TIMEOUT
+
+        Returns:
+            JobMemoryTracker: Tracker del job ammesso
+
+        Raises:
+            MemoryPressureError: Se il job non può essere ammesso in tempo
+        """
+        timeout = MEMORY_SETTINGS['ADMISSION_TIMEOUT'] if timeout is None else timeout
+        tracker = JobMemoryTracker(self, job_id)
+        started = time.monotonic()
+        deadline = started + timeout
+
+        JOBS_QUEUED.inc()
+        try:
+            if not self._slots.acquire(blocking=False):
+                tracker.record('queue', tracker.sample(), reason='max_concurrent_jobs')
+                if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                    tracker.record('reject', tracker.sample(), reason='max_concurrent_jobs')
+                    raise MemoryPressureError("Troppe elaborazioni in corso, riprovare più tardi")
+
+            try:
+                sample = self._wait_for_memory(tracker, deadline)
+            except BaseException:
+                # Anche un errore nel campionamento non deve trattenere lo slot
+                self._slots.release()
+                raise
+        finally:
+            JOBS_QUEUED.dec()
+
+        with self._active_lock:
+            self._active += 1
+        JOBS_ACTIVE.inc()
+        tracker.queued_seconds = time.monotonic() - started
+        logger.info(f"Job {job_id} ammesso (RSS {sample['rss_mb']:.0f} MB, livello {sample['level']})")
+        return tracker
+
+    def _wait_for_memory(self, tracker: JobMemoryTracker, deadline: float) -> Dict:
+        """
+        Attende che la pressione grave rientri, con lo slot già acquisito.
+
+        Args:
+            tracker: Tracker del job in attesa
+            deadline: Istante (time.monotonic) oltre cui il job viene rifiutato
+
+        Returns:
+            Dict: Ultimo campione di memoria
+
+        Raises:
+            MemoryPressureError: Se la pressione grave non rientra in tempo
+        """
+        sample = tracker.sample()
+        if sample['level'] != LEVEL_HARD:
+            return sample
+
+        tracker.record('queue', sample, reason='memory')
+        waiting_since = time.monotonic()
+        while sample['level'] == LEVEL_HARD:
+            with self._active_lock:
+                idle = self._active == 0
+            if (idle and sample['available_mb'] >= MEMORY_SETTINGS['MIN_AVAILABLE_HARD_MB']
+                    and time.monotonic() - waiting_since >= MEMORY_SETTINGS['RSS_ADMISSION_WAIT']):
+                # Solo l'RSS è oltre la soglia e nessun job lo sta facendo crescere:
+                # è il residuo di un picco passato, che non deve bloccare il processo
+                tracker.record('admit_stale_rss', sample)
+                break
+            if time.monotonic() >= deadline:
+                tracker.record('reject', sample, reason='memory')
+                raise MemoryPressureError(
+                    f"Memoria insufficiente per avviare l'elaborazione "
+                    f"(RSS {sample['rss_mb']:.0f} MB, disponibili {sample['available_mb']:.0f} MB)"
+                )
+            self.cleanup()
+            time.sleep(MEMORY_SETTINGS['SAMPLE_INTERVAL'])
+            sample = tracker.sample()
+        return sample
+
+    def release(self, tracker: JobMemoryTracker):
+        """
+        Libera lo slot di un job terminato.
+
+        Args:
+            tracker: Tracker restituito da admit
+        """
+        tracker.sample()
+        with self._active_lock:
+            self._active -= 1
+        self._slots.release()
+        JOBS_ACTIVE.dec()
+        self.cleanup()
+        logger.info(f"Job {tracker.job_id} terminato: picco RSS {tracker.peak_rss_mb:.0f} MB, "
+                    f"{len(tracker.decisions)} decisioni del governor")
+
+# Governor condiviso dal processo
+_governor: Optional[MemoryGovernor] = None
+_lock = threading.Lock()
+
+def get_memory_governor() -> MemoryGovernor:
+    """
+    Restituisce il MemoryGovernor condiviso, creandolo al primo utilizzo.
+
+    Returns:
+        MemoryGovernor: Governor del processo
+    """
+    global _governor
+    with _lock:
+        if _governor is None:
+            _governor = MemoryGovernor()
+        return _governor
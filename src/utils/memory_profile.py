@@ -0,0 +1,231 @@
+# src/utils/memory_profile.py
+
+import contextvars
+import json
+import threading
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Optional
+from src.config.settings import MEMORY_PROFILE_SETTINGS
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MB = 1024 * 1024
+
+# Profilo di memoria del job corrente (propagato ai worker con copy_context)
+_current_profile: contextvars.ContextVar[Optional["MemoryProfile"]] = contextvars.ContextVar('memory_profile', default=None)
+
+def _rss_mb() -> Optional[float]:
+    """RSS del processo in MB, o None senza psutil."""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / MB
+
+class _OpenStage:
+    """Fase in corso: stato all'ingresso e picco osservato finora."""
+
+    __slots__ = ('name', 'start_current', 'peak', 'snapshot')
+
+    def __init__(self, name: str, start_current: int, snapshot):
+        self.name = name
+        self.start_current = start_current
+        self.peak = start_current
+        self.snapshot = snapshot
+
+class MemoryProfile:
+    """
+    Profilo di memoria delle fasi di un job, basato su tracemalloc.
+
+    Per ogni fase (gli stessi nomi degli span di src.utils.timing) registra
+    il picco di memoria allocata da Python oltre il livello di ingresso, la
+    memoria trattenuta all'uscita, l'RSS del processo e, per le prime
+    occorrenze, i punti del codice che hanno allocato di più (confronto
+    tra snapshot di ingresso e di uscita).
+
+    tracemalloc vede solo le allocazioni fatte tramite Python: i buffer
+    interni di PIL e MuPDF compaiono solo nell'RSS. tracemalloc è globale
+    al processo, quindi con più job in parallelo le misure si sommano.
+    """
+
+    def __init__(self, job_id: str, trace_frames: Optional[int] = None):
+        """
+        Args:
+            job_id: Identificativo del job
+            trace_frames: Frame registrati per allocazione; se None usa
+                MEMORY_PROFILE_SETTINGS['TRACE_FRAMES']
+        """
+        self.job_id = job_id
+        self.trace_frames = trace_frames or MEMORY_PROFILE_SETTINGS['TRACE_FRAMES']
+        self.top_sites = MEMORY_PROFILE_SETTINGS['TOP_SITES']
+        self.snapshots_per_stage = MEMORY_PROFILE_SETTINGS['SNAPSHOTS_PER_STAGE']
+        self.stages: Dict[str, Dict] = {}
+        self.peak_traced_mb = 0.0
+        self.peak_rss_mb = 0.0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._snapshots_taken: Dict[str, int] = {}
+        self._started_tracing = False
+        self._token = None
+
+    def start(self) -> "MemoryProfile":
+        """Avvia tracemalloc (se non attivo) e rende il profilo quello corrente."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.trace_frames)
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self._token = _current_profile.set(self)
+        logger.info(f"Profilo di memoria del job {self.job_id} avviato")
+        return self
+
+    def stop(self):
+        """Ferma il profilo; le chiamate successive non fanno nulla."""
+        if self._token is None:
+            return
+        _current_profile.reset(self._token)
+        self._token = None
+        self._update_peaks(tracemalloc.get_traced_memory()[1])
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        logger.info(f"Profilo di memoria del job {self.job_id} terminato: picco tracemalloc "
+                    f"{self.peak_traced_mb:.1f} MB, picco RSS {self.peak_rss_mb:.1f} MB")
+
+    def __enter__(self) -> "MemoryProfile":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _stack(self) -> List[_OpenStage]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _update_peaks(self, traced_peak: int):
+        rss = _rss_mb()
+        with self._lock:
+            self.peak_traced_mb = max(self.peak_traced_mb, traced_peak / MB)
+            if rss is not None:
+                self.peak_rss_mb = max(self.peak_rss_mb, rss)
+        return rss
+
+    def enter(self, stage: str):
+        """
+        Apre una fase.
+
+        Il picco di tracemalloc viene azzerato a ogni ingresso: prima il
+        picco corrente viene attribuito alle fasi già aperte, così le fasi
+        annidate non falsano quelle esterne.
+        """
+        if not tracemalloc.is_tracing():
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        stack = self._stack()
+        for open_stage in stack:
+            open_stage.peak = max(open_stage.peak, peak)
+        self._update_peaks(peak)
+        tracemalloc.reset_peak()
+
+        snapshot = None
+        with self._lock:
+            if self._snapshots_taken.get(stage, 0) < self.snapshots_per_stage:
+                self._snapshots_taken[stage] = self._snapshots_taken.get(stage, 0) + 1
+                snapshot = True
+        if snapshot:
+            snapshot = tracemalloc.take_snapshot()
+        stack.append(_OpenStage(stage, current, snapshot))
+
+    def exit(self, stage: str):
+        """Chiude la fase aperta più recente e ne registra le misure."""
+        stack = self._stack()
+        if not stack or stack[-1].name != stage or not tracemalloc.is_tracing():
+            return
+        open_stage = stack.pop()
+        current, peak = tracemalloc.get_traced_memory()
+        open_stage.peak = max(open_stage.peak, peak)
+        for outer in stack:
+            outer.peak = max(outer.peak, open_stage.peak)
+        rss = self._update_peaks(peak)
+
+        top = None
+        if open_stage.snapshot is not None:
+            top = self._top_sites(open_stage.snapshot, tracemalloc.take_snapshot())
+
+        with self._lock:
+            stats = self.stages.setdefault(stage, {
+                'count': 0, 'peak_mb': 0.0, 'retained_mb': 0.0, 'max_retained_mb': 0.0,
+                'rss_mb': None, 'top_sites': []
+            })
+            retained = (current - open_stage.start_current) / MB
+            stats['count'] += 1
+            stats['peak_mb'] = max(stats['peak_mb'], (open_stage.peak - open_stage.start_current) / MB)
+            stats['retained_mb'] += retained
+            stats['max_retained_mb'] = max(stats['max_retained_mb'], retained)
+            if rss is not None:
+                stats['rss_mb'] = max(stats['rss_mb'] or 0.0, rss)
+            if top and (not stats['top_sites'] or top[0]['size_mb'] > stats['top_sites'][0]['size_mb']):
+                stats['top_sites'] = top
+
+    def _top_sites(self, before, after) -> List[Dict]:
+        """Punti del codice con la maggiore allocazione netta tra due snapshot."""
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        differences = after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+        return [
+            {
+                'site': f"{diff.traceback[0].filename}:{diff.traceback[0].lineno}",
+                'size_mb': round(diff.size_diff / MB, 3),
+                'count': diff.count_diff
+            }
+            for diff in differences[:self.top_sites]
+            if diff.size_diff >= 1024
+        ]
+
+    def summary(self) -> Dict:
+        """
+        Riepilogo del profilo.
+
+        Returns:
+            Dict: job_id, peak_traced_mb, peak_rss_mb e stages (count,
+            peak_mb, mean_retained_mb, max_retained_mb, rss_mb, top_sites)
+        """
+        with self._lock:
+            stages = {
+                name: {
+                    'count': stats['count'],
+                    'peak_mb': round(stats['peak_mb'], 3),
+                    'mean_retained_mb': round(stats['retained_mb'] / stats['count'], 3),
+                    'max_retained_mb': round(stats['max_retained_mb'], 3),
+                    'rss_mb': round(stats['rss_mb'], 1) if stats['rss_mb'] is not None else None,
+                    'top_sites': stats['top_sites']
+                }
+                for name, stats in self.stages.items()
+            }
+        return {
+            'job_id': self.job_id,
+            'peak_traced_mb': round(self.peak_traced_mb, 3),
+            'peak_rss_mb': round(self.peak_rss_mb, 1),
+            'stages': stages
+        }
+
+    def save(self, path: Path) -> Path:
+        """
+        Salva il riepilogo in JSON.
+
+        Args:
+            path: Percorso del file
+
+        Returns:
+            Path: Percorso scritto
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
+
+def current_memory_profile() -> Optional[MemoryProfile]:
+    """Restituisce il MemoryProfile attivo nel contesto corrente, se presente."""
+    return _current_profile.get()
@@ -0,0 +1,407 @@
+# src/utils/metrics.py
+
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from src.config.settings import METRICS_SETTINGS
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+OPENMETRICS_CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+
+# Limiti predefiniti degli istogrammi di latenza, in secondi
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+def _format_value(value: float) -> str:
+    """Formatta un valore numerico come richiesto dal formato di esposizione."""
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape_label(value: str) -> str:
+    """Applica l'escape di backslash, virgolette e a capo nei valori delle etichette."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    """Restituisce le etichette nella forma {nome="valore",...}."""
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (f'{name}="{_escape_label(value)}"' for name, value in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+class _Metric:
+    """Base delle metriche: nome, descrizione ed etichette."""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        """Converte le etichette nella chiave interna, verificandone i nomi."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Etichette attese per {self.name}: {self.labelnames}, ricevute: {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self, openmetrics: bool) -> List[str]:
+        """Restituisce le righe dei campioni."""
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Contatore monotono (esposto con il suffisso _total)."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        """
+        Incrementa il contatore.
+
+        Args:
+            amount: Incremento (non negativo)
+            **labels: Valori delle etichette
+        """
+        if amount < 0:
+            raise ValueError("Un contatore non può diminuire")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        """Restituisce il valore corrente per le etichette indicate."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self, openmetrics: bool) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+class Gauge(_Metric):
+    """Valore istantaneo; può essere calcolato al momento della lettura."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        """Imposta il valore."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        """Incrementa il valore."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        """Decrementa il valore."""
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]):
+        """
+        Calcola il valore (senza etichette) a ogni lettura.
+
+        Args:
+            function: Funzione senza argomenti che restituisce il valore
+        """
+        self._function = function
+
+    def value(self, **labels) -> float:
+        """Restituisce il valore corrente per le etichette indicate."""
+        if self._function is not None:
+            return float(self._function())
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def samples(self, openmetrics: bool) -> List[str]:
+        if self._function is not None:
+            try:
+                return [f"{self.name} {_format_value(self._function())}"]
+            except Exception as e:
+                logger.debug(f"Lettura della metrica {self.name} non riuscita: {e}")
+                return []
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+class Histogram(_Metric):
+    """Distribuzione di osservazioni in bucket cumulativi."""
+
+    kind = 'histogram'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        """
+        Registra un'osservazione.
+
+        Args:
+            value: Valore osservato (ad es. secondi)
+            **labels: Valori delle etichette
+        """
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def count(self, **labels) -> int:
+        """Restituisce il numero di osservazioni per le etichette indicate."""
+        with self._lock:
+            return sum(self._counts.get(self._key(labels), []))
+
+    def samples(self, openmetrics: bool) -> List[str]:
+        lines = []
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, ('le', _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """Insieme delle metriche del processo, esportabili in formato testo."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metrica {metric.name} già registrata con un'altra definizione")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Registra (o restituisce) un contatore."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """Registra (o restituisce) un gauge."""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Registra (o restituisce) un istogramma."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self, openmetrics: bool = True) -> str:
+        """
+        Esporta tutte le metriche in formato testo.
+
+        Args:
+            openmetrics: True per OpenMetrics 1.0 (endpoint HTTP), False per
+                il formato testo di Prometheus (textfile di node-exporter)
+
+        Returns:
+            str: Testo di esposizione
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            # In OpenMetrics la famiglia di un contatore non include _total
+            family = metric.name if openmetrics or metric.kind != 'counter' else f"{metric.name}_total"
+            lines.append(f"# HELP {family} {metric.documentation}")
+            lines.append(f"# TYPE {family} {metric.kind}")
+            lines.extend(metric.samples(openmetrics))
+        if openmetrics:
+            lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path: Path):
+        """
+        Scrive le metriche per il textfile collector di node-exporter.
+
+        La scrittura è atomica (file temporaneo rinominato), così il
+        collector non legge mai un file a metà.
+
+        Args:
+            path: File di destinazione (estensione .prom)
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        partial.write_text(self.render(openmetrics=False), encoding='utf-8')
+        os.replace(partial, path)
+
+# Registro del processo e metriche dell'estrazione
+REGISTRY = MetricsRegistry()
+
+PAGES_PROCESSED = REGISTRY.counter(
+    'extractor_pages_processed', "Pagine elaborate per esito", ['stage', 'outcome']
+)
+PRODUCTS_EXTRACTED = REGISTRY.counter(
+    'extractor_products', "Prodotti estratti e validati", ['stage']
+)
+API_CALLS = REGISTRY.counter(
+    'extractor_api_calls', "Chiamate all'API Vision per esito", ['outcome']
+)
+HTTP_RESPONSES = REGISTRY.counter(
+    'extractor_http_responses', "Risposte HTTP ricevute dall'API per codice (inclusi i retry dell'SDK)", ['code']
+)
+RETRIES = REGISTRY.counter(
+    'extractor_retries', "Nuovi tentativi eseguiti da RetryManager", ['function']
+)
+TOKENS = REGISTRY.counter(
+    'extractor_tokens', "Token consumati", ['direction']
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'extractor_cache_requests', "Accessi alle cache per esito", ['cache', 'result']
+)
+JOBS_QUEUED = REGISTRY.gauge(
+    'extractor_jobs_queued', "Job in attesa di ammissione (MemoryGovernor)"
+)
+JOBS_ACTIVE = REGISTRY.gauge(
+    'extractor_jobs_active', "Job in elaborazione"
+)
+STAGE_DURATION = REGISTRY.histogram(
+    'extractor_stage_duration_seconds', "Durata delle fasi di elaborazione", ['stage']
+)
+RETENTION_RECLAIMED = REGISTRY.counter(
+    'extractor_retention_reclaimed_bytes', "Byte liberati dalla conservazione dei file", ['category']
+)
+STORAGE_BYTES = REGISTRY.gauge(
+    'extractor_storage_bytes', "Byte occupati su disco per categoria", ['category']
+)
+RESIDENT_MEMORY = REGISTRY.gauge(
+    'process_resident_memory_bytes', "Memoria residente del processo"
+)
+
+def _resident_memory() -> float:
+    """Legge l'RSS del processo con psutil."""
+    import psutil
+    return float(psutil.Process().memory_info().rss)
+
+RESIDENT_MEMORY.set_function(_resident_memory)
+
+# Esportatori avviati (una sola volta per processo)
+_exporter_lock = threading.Lock()
+_http_server: Optional[ThreadingHTTPServer] = None
+_textfile_thread: Optional[threading.Thread] = None
+
+def start_http_server(port: int, addr: str = '127.0.0.1', registry: MetricsRegistry = REGISTRY) -> ThreadingHTTPServer:
+    """
+    Espone le metriche su http://addr:port/metrics in un thread in background.
+
+    Args:
+        port: Porta (0 = porta libera scelta dal sistema)
+        addr: Indirizzo di ascolto
+        registry: Registro da esporre
+
+    Returns:
+        ThreadingHTTPServer: Server avviato
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render(openmetrics=True).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((addr, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    logger.info(f"Metriche esposte su http://{addr}:{server.server_address[1]}/metrics")
+    return server
+
+def start_textfile_writer(path: Path, interval: float, registry: MetricsRegistry = REGISTRY) -> threading.Thread:
+    """
+    Riscrive periodicamente il textfile delle metriche in un thread in background.
+
+    Args:
+        path: File di destinazione
+        interval: Secondi tra due scritture
+        registry: Registro da esportare
+
+    Returns:
+        threading.Thread: Thread avviato
+    """
+    def run():
+        while True:
+            try:
+                registry.write_textfile(path)
+            except Exception as e:
+                logger.warning(f"Scrittura del textfile delle metriche non riuscita: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='metrics-textfile', daemon=True)
+    thread.start()
+    logger.info(f"Metriche scritte in {path} ogni {interval:.0f} secondi")
+    return thread
+
+def start_exporters():
+    """
+    Avvia gli esportatori configurati in METRICS_SETTINGS, una sola volta
+    per processo (le chiamate successive non fanno nulla).
+    """
+    global _http_server, _textfile_thread
+    with _exporter_lock:
+        if METRICS_SETTINGS['HTTP_PORT'] and _http_server is None:
+            try:
+                _http_server = start_http_server(int(METRICS_SETTINGS['HTTP_PORT']), METRICS_SETTINGS['HTTP_ADDR'])
+            except OSError as e:
+                logger.error(f"Impossibile avviare l'endpoint delle metriche: {e}")
+        if METRICS_SETTINGS['TEXTFILE'] and _textfile_thread is None:
+            _textfile_thread = start_textfile_writer(
+                Path(METRICS_SETTINGS['TEXTFILE']), METRICS_SETTINGS['TEXTFILE_INTERVAL']
+            )
@@ -0,0 +1,105 @@
+# src/utils/openai_client.py
+
+import importlib.util
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+from src.config.settings import HTTP_SETTINGS
+from src.utils.logger import setup_logger
+from src.utils.metrics import CACHE_REQUESTS, HTTP_RESPONSES
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import OpenAI
+
+logger = setup_logger(__name__)
+
+# Registro dei client condivisi dal processo, per chiave API e base URL
+_clients: Dict[Tuple[str, Optional[str]], "OpenAI"] = {}
+_lock = threading.Lock()
+
+def _http2_available() -> bool:
+    """Verifica se il pacchetto h2, necessario per HTTP/2 in httpx, è installato."""
+    return importlib.util.find_spec("h2") is not None
+
+def build_http_client() -> "httpx.Client":
+    """
+    Crea il client httpx con pool di connessioni keep-alive e timeout espliciti.
+    
+    Returns:
+        httpx.Client: Client configurato secondo HTTP_SETTINGS
+    """
+    import httpx
+    
+    http2 = HTTP_SETTINGS['HTTP2'] and _http2_available()
+    if HTTP_SETTINGS['HTTP2'] and not http2:
+        logger.info("Pacchetto h2 non installato: uso HTTP/1.1")
+        
+    return httpx.Client(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=HTTP_SETTINGS['MAX_CONNECTIONS'],
+            max_keepalive_connections=HTTP_SETTINGS['MAX_KEEPALIVE_CONNECTIONS'],
+            keepalive_expiry=HTTP_SETTINGS['KEEPALIVE_EXPIRY']
+        ),
+        timeout=httpx.Timeout(
+            connect=HTTP_SETTINGS['CONNECT_TIMEOUT'],
+            read=HTTP_SETTINGS['READ_TIMEOUT'],
+            write=HTTP_SETTINGS['WRITE_TIMEOUT'],
+            pool=HTTP_SETTINGS['POOL_TIMEOUT']
+        ),
+        # Conta ogni risposta, compresi i 429/5xx ritentati internamente dall'SDK
+        event_hooks={'response': [_count_response]}
+    )
+
+def _count_response(response: "httpx.Response") -> None:
+    """Registra il codice di stato di una risposta HTTP nelle metriche."""
+    HTTP_RESPONSES.inc(code=str(response.status_code))
+
+def get_openai_client(api_key: str, base_url: Optional[str] = None) -> "OpenAI":
+    """
+    Restituisce il client OpenAI condiviso dal processo per la chiave data.
+    
+    Tutte le sessioni e i worker riusano così le stesse connessioni già
+    aperte (handshake TLS e pool pagati una volta sola). Il client è
+    thread-safe e può essere usato da più richieste concorrenti.
+    
+    Args:
+        api_key: Chiave API OpenAI
+        base_url: URL base alternativo (ad es. un server compatibile locale);
+            se None vale OPENAI_BASE_URL o l'endpoint ufficiale
+        
+    Returns:
+        OpenAI: Client condiviso
+    """
+    key = (api_key, base_url)
+    client = _clients.get(key)
+    if client is not None:
+        CACHE_REQUESTS.inc(cache='openai_client', result='hit')
+        return client
+        
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            CACHE_REQUESTS.inc(cache='openai_client', result='miss')
+            # Import differito: l'SDK è pesante e serve solo alla prima richiesta
+            from openai import OpenAI
+            
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=HTTP_SETTINGS['SDK_MAX_RETRIES'],
+                http_client=build_http_client()
+            )
+            _clients[key] = client
+            logger.info(f"Client OpenAI condiviso creato (base_url={base_url or 'default'})")
+    return client
+
+def close_clients() -> None:
+    """Chiude tutti i client condivisi e le relative connessioni."""
+    with _lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception as e:
+                logger.error(f"Errore nella chiusura del client OpenAI: {e}")
+        _clients.clear()
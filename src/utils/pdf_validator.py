@@ -1,8 +1,8 @@
 # src/utils/pdf_validator.py
 
-import fitz  # PyMuPDF
 from pathlib import Path
-from typing import Tuple, Optional
+from typing import Dict, List, Optional, Tuple
+from src.config.settings import IMAGE_SETTINGS, PDF_SETTINGS
 from src.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
@@ -15,12 +15,91 @@ class PDFValidator:
     """Classe per la validazione approfondita dei file PDF."""
     
     @staticmethod
-    def validate_pdf(file_path: Path) -> Tuple[bool, Optional[str]]:
+    def select_pages(page_count: int, sample_pages: Optional[int] = None) -> List[int]:
+        """
+        Sceglie le pagine da esaminare.
+        
+        Fino a SAMPLE_THRESHOLD_PAGES si esaminano tutte le pagine, oltre
+        solo un campione distribuito uniformemente che include la prima e
+        l'ultima pagina.
+        
+        Args:
+            page_count: Numero di pagine del documento
+            sample_pages: Dimensione del campione; se None usa PDF_SETTINGS
+            
+        Returns:
+            List[int]: Indici delle pagine da esaminare (in ordine)
+        """
+        if sample_pages is None:
+            if page_count <= PDF_SETTINGS['SAMPLE_THRESHOLD_PAGES']:
+                return list(range(page_count))
+            sample_pages = PDF_SETTINGS['SAMPLE_PAGES']
+            
+        if sample_pages >= page_count:
+            return list(range(page_count))
+        if sample_pages <= 1:
+            return [0]
+        step = (page_count - 1) / (sample_pages - 1)
+        return sorted({round(i * step) for i in range(sample_pages)})
+    
+    @classmethod
+    def scan_document(cls, pdf_document, sample_pages: Optional[int] = None) -> Dict:
+        """
+        Raccoglie in una sola passata le statistiche per pagina del documento.
+        
+        Le dimensioni di tutte le pagine si leggono senza caricarle; testo e
+        immagini vengono estratti solo per le pagine scelte da select_pages.
+        Il risultato viene riusato da check_pdf_structure ed
+        estimate_processing_requirements.
+        
+        Args:
+            pdf_document: Documento PDF aperto con PyMuPDF
+            sample_pages: Dimensione del campione (None = automatica)
+            
+        Returns:
+            Dict: page_count, sampled, sizes (larghezza e altezza di ogni
+            pagina) e pages (statistiche delle pagine esaminate per indice)
+        """
+        page_count = pdf_document.page_count
+        sizes = []
+        for page_num in range(page_count):
+            rect = pdf_document.page_cropbox(page_num)
+            sizes.append((rect.width, rect.height))
+            
+        selected = cls.select_pages(page_count, sample_pages)
+        pages = {}
+        for page_num in selected:
+            try:
+                page = pdf_document[page_num]
+                pages[page_num] = {
+                    'text_chars': len(page.get_text().strip()),
+                    'image_count': len(page.get_images()),
+                    'error': None
+                }
+            except Exception as e:
+                pages[page_num] = {'text_chars': 0, 'image_count': 0, 'error': str(e)}
+                
+        sampled = len(selected) < page_count
+        if sampled:
+            logger.info(f"Scansione a campione: {len(selected)} pagine su {page_count}")
+            
+        return {
+            'page_count': page_count,
+            'sampled': sampled,
+            'has_metadata': bool(pdf_document.metadata),
+            'sizes': sizes,
+            'pages': pages
+        }
+    
+    @classmethod
+    def validate_pdf(cls, file_path: Path, sample_pages: Optional[int] = None) -> Tuple[bool, Optional[str]]:
         """
         Esegue una validazione approfondita del file PDF.
         
         Args:
             file_path: Percorso del file PDF
+            sample_pages: Dimensione del campione per i documenti grandi
+                (None = automatica, vedi select_pages)
             
         Returns:
             Tuple[bool, Optional[str]]: (validazione_ok, messaggio_errore)
@@ -34,7 +113,9 @@ class PDFValidator:
             if file_path.stat().st_size == 0:
                 return False, "Il file PDF è vuoto"
             
-            # Apertura e validazione con PyMuPDF
+            # Apertura e validazione con PyMuPDF (import differito perché pesante)
+            import fitz
+            
             pdf_document = None
             try:
                 pdf_document = fitz.open(str(file_path))
@@ -48,17 +129,14 @@ class PDFValidator:
                     return False, "Il PDF non contiene pagine"
                 
                 # Verifica corruzione pagine
-                for page_num in range(pdf_document.page_count):
-                    try:
-                        page = pdf_document[page_num]
-                        # Tenta di accedere ai contenuti della pagina
-                        _ = page.get_text()
-                    except Exception as e:
+                scan = cls.scan_document(pdf_document, sample_pages)
+                for page_num, stats in scan['pages'].items():
+                    if stats['error']:
                         return False, f"La pagina {page_num + 1} è corrotta o non accessibile"
                 
                 return True, None
                 
-            except fitz.fitz.FileDataError:
+            except fitz.FileDataError:
                 return False, "Il file non è un PDF valido o è corrotto"
             except Exception as e:
                 return False, f"Errore durante la validazione del PDF: {str(e)}"
@@ -70,32 +148,33 @@ class PDFValidator:
             logger.error(f"Errore durante la validazione del PDF: {e}")
             return False, "Errore imprevisto durante la validazione del PDF"
     
-    @staticmethod
-    def check_pdf_structure(pdf_document) -> Tuple[bool, Optional[str]]:
+    @classmethod
+    def check_pdf_structure(cls, pdf_document, scan: Optional[Dict] = None) -> Tuple[bool, Optional[str]]:
         """
         Verifica la struttura interna del PDF.
         
         Args:
             pdf_document: Documento PDF aperto con PyMuPDF
+            scan: Risultato di scan_document; se None la scansione viene eseguita
             
         Returns:
             Tuple[bool, Optional[str]]: (struttura_ok, messaggio_errore)
         """
         try:
+            scan = scan or cls.scan_document(pdf_document)
+            
             # Verifica metadati
-            if not pdf_document.metadata:
+            if not scan['has_metadata']:
                 logger.warning("PDF senza metadati")
             
-            # Verifica struttura pagine
-            for page_num in range(pdf_document.page_count):
-                page = pdf_document[page_num]
-                
-                # Verifica dimensioni pagina
-                if page.rect.width <= 0 or page.rect.height <= 0:
+            # Verifica dimensioni pagine
+            for page_num, (width, height) in enumerate(scan['sizes']):
+                if width <= 0 or height <= 0:
                     return False, f"Dimensioni non valide alla pagina {page_num + 1}"
-                
-                # Verifica contenuto
-                if len(page.get_text().strip()) == 0 and len(page.get_images()) == 0:
+            
+            # Verifica contenuto
+            for page_num, stats in scan['pages'].items():
+                if stats['text_chars'] == 0 and stats['image_count'] == 0:
                     logger.warning(f"Pagina {page_num + 1} potrebbe essere vuota")
             
             return True, None
@@ -105,23 +184,94 @@ class PDFValidator:
             return False, f"Errore nella struttura del PDF: {str(e)}"
     
     @staticmethod
-    def estimate_processing_requirements(pdf_document) -> dict:
+    def memory_model_inputs(scan: Dict, dpi: Optional[int] = None) -> Dict[str, float]:
+        """
+        Calcola le grandezze del modello di memoria dalle dimensioni delle pagine.
+        
+        Args:
+            scan: Risultato di scan_document
+            dpi: Risoluzione di rendering; se None usa IMAGE_SETTINGS['DPI']
+            
+        Returns:
+            Dict[str, float]: raster_mb (RGB della pagina più grande così
+            come viene rasterizzata: alla risoluzione di rendering o, con
+            FAST_ENCODE, già ridotta) e optimized_mb (media delle immagini
+            ridotte a IMAGE_SETTINGS['MAX_SIZE'])
+        """
+        dpi = dpi or IMAGE_SETTINGS['DPI']
+        zoom = dpi / 72
+        max_width, max_height = IMAGE_SETTINGS['MAX_SIZE']['WIDTH'], IMAGE_SETTINGS['MAX_SIZE']['HEIGHT']
+        raster_bytes = 0.0
+        optimized_bytes = 0.0
+        for width, height in scan['sizes']:
+            pixel_width, pixel_height = width * zoom, height * zoom
+            # Come Image.thumbnail: riduzione proporzionale, mai ingrandimento
+            scale = min(1.0, max_width / pixel_width, max_height / pixel_height) if pixel_width and pixel_height else 0.0
+            page_optimized = (pixel_width * scale) * (pixel_height * scale) * 3
+            optimized_bytes += page_optimized
+            page_raster = page_optimized if IMAGE_SETTINGS['FAST_ENCODE'] else pixel_width * pixel_height * 3
+            raster_bytes = max(raster_bytes, page_raster)
+        return {
+            'raster_mb': round(raster_bytes / (1024 * 1024), 3),
+            'optimized_mb': round(optimized_bytes / max(len(scan['sizes']), 1) / (1024 * 1024), 3)
+        }
+    
+    @classmethod
+    def estimate_memory_mb(cls, scan: Dict, dpi: Optional[int] = None) -> float:
+        """
+        Stima la memoria aggiuntiva necessaria per elaborare il documento.
+        
+        Il modello segue la pipeline: durante il rendering di una pagina
+        convivono alcune copie del raster (pixmap, campioni, immagine PIL),
+        mentre le immagini di tutte le pagine restano in memoria fino
+        all'estrazione (in JPEG con FAST_ENCODE). I coefficienti di
+        PDF_SETTINGS['MEMORY_MODEL'] sono calibrati per ciascun percorso
+        con benchmarks.memory_calibration.
+        
+        Args:
+            scan: Risultato di scan_document
+            dpi: Risoluzione di rendering; se None usa IMAGE_SETTINGS['DPI']
+            
+        Returns:
+            float: Memoria stimata in MB
+        """
+        inputs = cls.memory_model_inputs(scan, dpi)
+        model = PDF_SETTINGS['MEMORY_MODEL']['FAST_ENCODE' if IMAGE_SETTINGS['FAST_ENCODE'] else 'PIL']
+        return (
+            model['OVERHEAD_MB']
+            + model['RENDER_COPIES'] * inputs['raster_mb']
+            + model['RETAINED_FACTOR'] * scan['page_count'] * inputs['optimized_mb']
+        )
+    
+    @classmethod
+    def estimate_processing_requirements(
+        cls,
+        pdf_document,
+        scan: Optional[Dict] = None,
+        dpi: Optional[int] = None
+    ) -> dict:
         """
         Stima i requisiti di elaborazione del PDF.
         
+        Con una scansione a campione il numero di immagini viene estrapolato
+        all'intero documento.
+        
         Args:
             pdf_document: Documento PDF aperto con PyMuPDF
+            scan: Risultato di scan_document; se None la scansione viene eseguita
+            dpi: Risoluzione di rendering; se None usa IMAGE_SETTINGS['DPI']
             
         Returns:
             dict: Dizionario con stime di memoria e tempo
         """
         try:
-            total_pages = pdf_document.page_count
-            total_images = sum(len(page.get_images()) for page in pdf_document)
-            avg_page_size = sum(page.rect.width * page.rect.height for page in pdf_document) / total_pages
+            scan = scan or cls.scan_document(pdf_document)
+            total_pages = scan['page_count']
+            scanned_images = sum(stats['image_count'] for stats in scan['pages'].values())
+            total_images = round(scanned_images * total_pages / max(len(scan['pages']), 1))
             
-            # Stima memoria richiesta (molto approssimativa)
-            est_memory_mb = (avg_page_size * total_pages * 4) / (1024 * 1024)  # 4 byte per pixel
+            # Stima memoria calibrata sulle misure della pipeline
+            est_memory_mb = cls.estimate_memory_mb(scan, dpi)
             
             # Stima tempo di elaborazione (molto approssimativa)
             est_time_seconds = total_pages * 2 + total_images * 0.5  # 2 sec per pagina + 0.5 sec per immagine
@@ -129,6 +279,7 @@ class PDFValidator:
             return {
                 'total_pages': total_pages,
                 'total_images': total_images,
+                'sampled': scan['sampled'],
                 'estimated_memory_mb': round(est_memory_mb, 2),
                 'estimated_time_seconds': round(est_time_seconds, 2)
             }
@@ -137,4 +288,4 @@ class PDFValidator:
             logger.error(f"Errore durante la stima dei requisiti: {e}")
             return {
                 'error': str(e)
-            }
\ No newline at end of file
+            }
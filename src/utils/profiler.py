@@ -0,0 +1,217 @@
+# src/utils/profiler.py
+
+import contextvars
+import marshal
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+from src.config.settings import PROFILER_SETTINGS
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MODE_SAMPLING = 'sampling'
+MODE_CPROFILE = 'cprofile'
+
+# Profiler del job corrente (propagato ai worker con copy_context)
+_current_profiler: contextvars.ContextVar[Optional["JobProfiler"]] = contextvars.ContextVar('job_profiler', default=None)
+
+# Chiave di funzione nel formato di pstats: (file, riga, nome)
+FuncKey = Tuple[str, int, str]
+
+def _func_key(code) -> FuncKey:
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+def _frame_label(key: FuncKey) -> str:
+    """Etichetta di una funzione nel formato collapsed (senza ';')."""
+    filename, line, name = key
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(';', ':')
+
+class JobProfiler:
+    """
+    Profilo su richiesta di un singolo job.
+
+    Un thread campiona a intervalli regolari gli stack dei soli thread del
+    job (quello che avvia il profiler e i worker in cui il profiler è
+    propagato, vedi watch_current_thread), quindi l'overhead non dipende
+    dal numero di chiamate ed è adatto anche ai job di produzione. Il
+    risultato viene salvato come file collapsed (una riga "f1;f2;f3 N" per
+    stack, per i flame graph) e come file pstats.
+
+    In modalità 'sampling' il file pstats è ricavato dai campioni (tempi
+    stimati come campioni x intervallo); in modalità 'cprofile' il thread
+    del job viene profilato anche con cProfile, più preciso ma più costoso.
+    """
+
+    def __init__(self, job_id: str, mode: Optional[str] = None, interval: Optional[float] = None):
+        """
+        Args:
+            job_id: Identificativo del job
+            mode: 'sampling' o 'cprofile'; se None usa PROFILER_SETTINGS['MODE']
+            interval: Secondi tra due campioni; se None usa PROFILER_SETTINGS['SAMPLE_INTERVAL']
+        """
+        self.job_id = job_id
+        self.mode = mode or PROFILER_SETTINGS['MODE']
+        if self.mode not in (MODE_SAMPLING, MODE_CPROFILE):
+            raise ValueError(f"Modalità di profilazione non supportata: {self.mode}")
+        self.interval = interval or PROFILER_SETTINGS['SAMPLE_INTERVAL']
+        self.max_depth = PROFILER_SETTINGS['MAX_STACK_DEPTH']
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._threads: Set[int] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._cprofile = None
+        self._token = None
+        self._started = 0.0
+
+    def start(self) -> "JobProfiler":
+        """Avvia il profilo e lo rende quello corrente per il contesto del chiamante."""
+        self._token = _current_profiler.set(self)
+        self.watch_current_thread()
+        if self.mode == MODE_CPROFILE:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.job_id}", daemon=True)
+        self._sampler.start()
+        logger.info(f"Profilazione del job {self.job_id} avviata (modalità {self.mode})")
+        return self
+
+    def stop(self):
+        """Ferma il profilo; le chiamate successive non fanno nulla."""
+        if self._sampler is None:
+            return
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+        self.duration = time.perf_counter() - self._started
+        if self._token is not None:
+            _current_profiler.reset(self._token)
+            self._token = None
+        logger.info(f"Profilazione del job {self.job_id} terminata: {self.samples} campioni "
+                    f"in {self.duration:.1f} secondi")
+
+    def __enter__(self) -> "JobProfiler":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def watch_current_thread(self):
+        """Include il thread corrente tra quelli campionati."""
+        with self._lock:
+            self._threads.add(threading.get_ident())
+
+    def _run(self):
+        """Ciclo del thread di campionamento."""
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        """Registra lo stack corrente di ogni thread del job."""
+        frames = sys._current_frames()
+        with self._lock:
+            threads = list(self._threads)
+        for ident in threads:
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_func_key(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """
+        Restituisce i campioni nel formato collapsed di flamegraph.pl/speedscope.
+
+        Returns:
+            str: Una riga "radice;...;foglia conteggio" per stack
+        """
+        lines = [
+            f"{';'.join(_frame_label(key) for key in stack)} {count}"
+            for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1])
+        ]
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def _sampled_stats(self) -> Dict:
+        """
+        Converte i campioni nella struttura di pstats.
+
+        Per ogni funzione: chiamate primitive e totali (campioni in cui è
+        sulla pila, contati una volta per campione), tempo proprio (campioni
+        in cui è la foglia) e cumulativo, chiamanti con gli stessi valori.
+        """
+        stats: Dict[FuncKey, list] = {}
+        for stack, count in self.stacks.items():
+            seconds = count * self.interval
+            seen = set()
+            for i, key in enumerate(stack):
+                entry = stats.setdefault(key, [0, 0, 0.0, 0.0, {}])
+                if key not in seen:
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += seconds
+                    seen.add(key)
+                if i == len(stack) - 1:
+                    entry[2] += seconds
+                if i > 0:
+                    caller = entry[4].setdefault(stack[i - 1], [0, 0, 0.0, 0.0])
+                    caller[0] += count
+                    caller[1] += count
+                    caller[3] += seconds
+                    if i == len(stack) - 1:
+                        caller[2] += seconds
+        return {
+            key: (cc, nc, tt, ct, {caller: tuple(values) for caller, values in callers.items()})
+            for key, (cc, nc, tt, ct, callers) in stats.items()
+        }
+
+    def save(self, directory: Path, prefix: str) -> Dict[str, Path]:
+        """
+        Salva il profilo.
+
+        Args:
+            directory: Directory di destinazione (ad es. temp/results)
+            prefix: Prefisso dei file (ad es. profile_<timestamp>)
+
+        Returns:
+            Dict[str, Path]: Percorsi dei file 'pstats' e 'collapsed'
+        """
+        self.stop()
+        directory.mkdir(parents=True, exist_ok=True)
+        pstats_path = directory / f"{prefix}.pstats"
+        collapsed_path = directory / f"{prefix}.folded"
+
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(str(pstats_path))
+        else:
+            with open(pstats_path, 'wb') as f:
+                marshal.dump(self._sampled_stats(), f)
+        collapsed_path.write_text(self.collapsed(), encoding='utf-8')
+
+        logger.info(f"Profilo salvato in: {pstats_path}, {collapsed_path}")
+        return {'pstats': pstats_path, 'collapsed': collapsed_path}
+
+def current_profiler() -> Optional[JobProfiler]:
+    """Restituisce il JobProfiler attivo nel contesto corrente, se presente."""
+    return _current_profiler.get()
+
+def watch_current_thread():
+    """Se nel contesto c'è un profiler attivo, vi include il thread corrente."""
+    profiler = _current_profiler.get()
+    if profiler is not None:
+        profiler.watch_current_thread()
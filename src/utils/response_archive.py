@@ -0,0 +1,288 @@
+# src/utils/response_archive.py
+
+import atexit
+import gzip
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+from src.config.settings import ARCHIVE_SETTINGS
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+INDEX_FILE = 'index.jsonl'
+ARCHIVE_SUFFIX = '.jsonl.gz'
+# Segnaposto in coda: compatta l'indice della directory indicata
+_COMPACT_INDEX = object()
+
+class ArchiveWriter:
+    """
+    Scrittore in background dell'archivio delle risposte.
+
+    Un solo thread per processo serializza, comprime e accoda i record:
+    chi registra una risposta si limita a metterla in coda. Ogni record è
+    un membro gzip a sé stante (la concatenazione resta un file gzip
+    valido, leggibile come JSONL) e nell'indice vengono annotati offset e
+    lunghezza del membro per rileggerlo senza decomprimere il resto.
+    """
+
+    def __init__(self, compress_level: Optional[int] = None):
+        """
+        Args:
+            compress_level: Livello gzip; se None usa ARCHIVE_SETTINGS['COMPRESS_LEVEL']
+        """
+        self.compress_level = (
+            compress_level if compress_level is not None else ARCHIVE_SETTINGS['COMPRESS_LEVEL']
+        )
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='response-archive', daemon=True)
+        self._thread.start()
+
+    def submit(self, path: Path, record: Dict):
+        """Accoda un record da aggiungere all'archivio indicato (non blocca)."""
+        self._queue.put((path, record))
+
+    def compact_index(self, directory: Path):
+        """
+        Accoda la compattazione dell'indice di una directory (non blocca).
+
+        Viene eseguita dal thread di scrittura, quindi non perde le voci
+        aggiunte nel frattempo.
+        """
+        self._queue.put((Path(directory), _COMPACT_INDEX))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Attende che i record in coda siano scritti.
+
+        Args:
+            timeout: Secondi massimi di attesa (None = senza limite)
+
+        Returns:
+            bool: True se la coda è stata svuotata in tempo
+        """
+        done = threading.Event()
+        self._queue.put((None, done))
+        return done.wait(timeout)
+
+    def _run(self):
+        while True:
+            path, record = self._queue.get()
+            if path is None:
+                record.set()
+                continue
+            try:
+                if record is _COMPACT_INDEX:
+                    self._compact_index(path)
+                else:
+                    self._write(path, record)
+            except Exception as e:
+                logger.error(f"Scrittura nell'archivio delle risposte {path} non riuscita: {e}")
+
+    def _write(self, path: Path, record: Dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        member = gzip.compress(line.encode('utf-8'), compresslevel=self.compress_level)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'ab') as f:
+            offset = f.tell()
+            f.write(member)
+        entry = {
+            'document_hash': record.get('document_hash'),
+            'page': record.get('page'),
+            'job_id': record.get('job_id'),
+            'file': path.name,
+            'offset': offset,
+            'length': len(member)
+        }
+        with open(path.parent / INDEX_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+
+    def _compact_index(self, directory: Path):
+        """Riscrive l'indice con la sola voce più recente delle pagine il cui archivio esiste ancora."""
+        index_path = directory / INDEX_FILE
+        if not index_path.exists():
+            return
+        with open(index_path, encoding='utf-8') as f:
+            total = sum(1 for _ in f)
+        entries = [
+            entry for entry in ResponseArchive.load_index(directory).values()
+            if (directory / entry['file']).exists()
+        ]
+        partial = index_path.with_name(INDEX_FILE + '.tmp')
+        with open(partial, 'w', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        os.replace(partial, index_path)
+        logger.debug(f"Indice dell'archivio compattato: {total} -> {len(entries)} voci")
+
+_writer: Optional[ArchiveWriter] = None
+_writer_lock = threading.Lock()
+
+def get_archive_writer() -> ArchiveWriter:
+    """Restituisce lo scrittore condiviso dal processo, avviandolo al primo utilizzo."""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ArchiveWriter()
+            # Le risposte ancora in coda all'uscita del processo non vanno perse
+            atexit.register(_writer.flush, ARCHIVE_SETTINGS['FLUSH_TIMEOUT'])
+        return _writer
+
+class ResponseArchive:
+    """
+    Archivio append-only, compresso, delle risposte grezze di un job.
+
+    Per ogni pagina conserva il testo restituito dal modello (tutte le
+    richieste: continuazioni e metà comprese), i prodotti validati, i token
+    e la chiave della pagina (hash del documento e numero di pagina).
+    L'indice comune alla directory permette di rileggere l'ultima risposta
+    di una pagina di un documento senza scorrere gli archivi.
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        document_hash: Optional[str] = None,
+        directory: Optional[Path] = None,
+        writer: Optional[ArchiveWriter] = None
+    ):
+        """
+        Args:
+            job_id: Identificativo del job (nome del file di archivio)
+            document_hash: SHA-256 del PDF elaborato
+            directory: Directory dell'archivio; se None usa ARCHIVE_SETTINGS['DIR']
+            writer: Scrittore in background; se None usa quello condiviso
+        """
+        self.job_id = job_id
+        self.document_hash = document_hash
+        self.directory = Path(directory or ARCHIVE_SETTINGS['DIR'])
+        self.path = self.directory / f"{job_id}{ARCHIVE_SUFFIX}"
+        self._writer = writer
+
+    @staticmethod
+    def page_key(document_hash: Optional[str], page: Optional[int]) -> str:
+        """Chiave della pagina: hash del documento e numero di pagina."""
+        return f"{document_hash or '-'}:{page if page is not None else '-'}"
+
+    def record(
+        self,
+        page: Optional[int],
+        responses: List[Dict],
+        products: List[Dict],
+        info: Optional[Dict] = None
+    ):
+        """
+        Aggiunge all'archivio le risposte di una pagina (in background).
+
+        Args:
+            page: Numero della pagina
+            responses: Risposte del modello (content, finish_reason,
+                structured_output, output_format), nell'ordine delle richieste
+            products: Prodotti validati della pagina
+            info: Informazioni sull'estrazione (token, troncamenti, ...)
+        """
+        info = info or {}
+        record = {
+            'job_id': self.job_id,
+            'document_hash': self.document_hash,
+            'page': page,
+            'page_key': self.page_key(self.document_hash, page),
+            'archived_at': datetime.now().isoformat(timespec='seconds'),
+            'responses': responses,
+            'products': products,
+            'usage': {
+                'prompt_tokens': info.get('prompt_tokens', 0),
+                'completion_tokens': info.get('completion_tokens', 0)
+            },
+            'info': {key: value for key, value in info.items() if key not in ('prompt_tokens', 'completion_tokens')}
+        }
+        (self._writer or get_archive_writer()).submit(self.path, record)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Attende che le risposte di questo job (e quelle in coda prima) siano scritte."""
+        return (self._writer or get_archive_writer()).flush(timeout)
+
+    @staticmethod
+    def read(path: Path) -> Iterator[Dict]:
+        """
+        Legge in ordine tutti i record di un file di archivio.
+
+        Args:
+            path: File <job>.jsonl.gz
+
+        Yields:
+            Dict: Record di una pagina
+        """
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    @classmethod
+    def jobs(cls, directory: Optional[Path] = None) -> List[str]:
+        """Identificativi dei job presenti nell'archivio, in ordine di nome."""
+        directory = Path(directory or ARCHIVE_SETTINGS['DIR'])
+        if not directory.exists():
+            return []
+        return sorted(path.name[:-len(ARCHIVE_SUFFIX)] for path in directory.glob(f"*{ARCHIVE_SUFFIX}"))
+
+    @staticmethod
+    def load_index(directory: Optional[Path] = None) -> Dict[str, Dict]:
+        """
+        Carica l'indice della directory.
+
+        Returns:
+            Dict[str, Dict]: Voce più recente (file, offset, length, job_id)
+            per chiave di pagina
+        """
+        index_path = Path(directory or ARCHIVE_SETTINGS['DIR']) / INDEX_FILE
+        index = {}
+        if not index_path.exists():
+            return index
+        with open(index_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Riga troncata da un'interruzione
+                index[ResponseArchive.page_key(entry['document_hash'], entry['page'])] = entry
+        return index
+
+    @classmethod
+    def lookup(
+        cls,
+        document_hash: str,
+        page: int,
+        directory: Optional[Path] = None,
+        index: Optional[Dict[str, Dict]] = None
+    ) -> Optional[Dict]:
+        """
+        Rilegge l'ultima risposta archiviata per una pagina di un documento.
+
+        Args:
+            document_hash: SHA-256 del PDF
+            page: Numero della pagina
+            directory: Directory dell'archivio; se None usa ARCHIVE_SETTINGS['DIR']
+            index: Indice già caricato con load_index (per più ricerche)
+
+        Returns:
+            Optional[Dict]: Record della pagina, o None se non archiviata
+            (o se il suo archivio è stato rimosso dalla conservazione dei file)
+        """
+        directory = Path(directory or ARCHIVE_SETTINGS['DIR'])
+        if index is None:
+            index = cls.load_index(directory)
+        entry = index.get(cls.page_key(document_hash, page))
+        if entry is None:
+            return None
+        try:
+            with open(directory / entry['file'], 'rb') as f:
+                f.seek(entry['offset'])
+                member = f.read(entry['length'])
+        except FileNotFoundError:
+            return None
+        return json.loads(gzip.decompress(member))
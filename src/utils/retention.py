@@ -0,0 +1,424 @@
+# src/utils/retention.py
+
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.config.settings import RETENTION_SETTINGS
+from src.utils.logger import setup_logger
+from src.utils.metrics import RETENTION_RECLAIMED, STORAGE_BYTES
+
+logger = setup_logger(__name__)
+
+# File mai rimossi: l'indice dell'archivio delle risposte e i file temporanei delle scritture atomiche
+PROTECTED_NAMES = {'index.jsonl'}
+TEMP_SUFFIX = '.tmp'
+
+def _group_key(category: str, name: str) -> str:
+    """
+    Gruppo di un file o di una directory: i membri di un gruppo vengono rimossi insieme.
+
+    - results: results_/metadata_/performance_/memory_/profile_<timestamp>.* della stessa sessione
+    - checkpoints: journal corrente, journal in cronologia e file archiviati della stessa sessione
+    - responses: archivio <job>.jsonl.gz
+    - uploads, json: ogni file fa gruppo a sé
+    """
+    if category == 'results' and '_' in name:
+        return name.split('_', 1)[1].split('.', 1)[0]
+    if category == 'checkpoints':
+        return name[len('checkpoint_'):].split('.', 1)[0] if name.startswith('checkpoint_') else name
+    if category == 'responses':
+        return name.split('.', 1)[0]
+    return name
+
+def _disk_usage(path: Path) -> Tuple[int, float]:
+    """Byte occupati e ultima modifica di un file o di una directory (visitata per intero)."""
+    stat = path.stat()
+    if not path.is_dir():
+        return stat.st_size, max(stat.st_mtime, stat.st_atime)
+    size, modified = 0, stat.st_mtime
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                file_stat = os.stat(os.path.join(root, name))
+            except FileNotFoundError:
+                continue
+            size += file_stat.st_size
+            modified = max(modified, file_stat.st_mtime)
+    return size, modified
+
+class RetentionManager:
+    """
+    Mantiene i file su disco entro un budget in byte complessivo e per categoria.
+
+    Le categorie (RETENTION_SETTINGS['CATEGORIES']) sono le directory di
+    upload, risultati, checkpoint e archivi delle risposte. Quando una
+    categoria o il totale superano il budget vengono rimossi per interi i
+    gruppi (ad es. tutti i file di una sessione salvata) con l'ultimo
+    accesso più vecchio. Non vengono mai rimossi i gruppi bloccati con pin
+    né quelli usati negli ultimi RETENTION_SETTINGS['IN_USE_SECONDS'].
+
+    Un indice su disco conserva dimensione e ultimo accesso di ogni voce:
+    una directory viene riletta solo se la sua data di modifica è cambiata
+    (file aggiunti o rimossi) e vengono rimisurati solo i gruppi in uso,
+    gli unici che possono crescere. Gli accessi in lettura vanno segnalati
+    con touch, perché l'atime del filesystem spesso non è aggiornato.
+    """
+
+    def __init__(
+        self,
+        categories: Optional[Dict[str, Dict]] = None,
+        max_bytes: Optional[int] = None,
+        index_file: Optional[Path] = None,
+        in_use_seconds: Optional[float] = None
+    ):
+        """
+        Args:
+            categories: Categorie {nome: {'DIRS': [...], 'MAX_BYTES': ...}};
+                se None usa RETENTION_SETTINGS['CATEGORIES']
+            max_bytes: Budget complessivo; se None usa RETENTION_SETTINGS['MAX_BYTES']
+            index_file: File dell'indice; se None usa RETENTION_SETTINGS['INDEX_FILE']
+            in_use_seconds: Finestra di protezione dopo l'ultimo accesso;
+                se None usa RETENTION_SETTINGS['IN_USE_SECONDS']
+        """
+        self.categories = categories or RETENTION_SETTINGS['CATEGORIES']
+        self.max_bytes = max_bytes if max_bytes is not None else RETENTION_SETTINGS['MAX_BYTES']
+        self.index_file = Path(index_file or RETENTION_SETTINGS['INDEX_FILE'])
+        self.in_use_seconds = (
+            in_use_seconds if in_use_seconds is not None else RETENTION_SETTINGS['IN_USE_SECONDS']
+        )
+        self.last_report: Optional[Dict] = None
+
+        self._lock = threading.Lock()        # touch e pin, chiamati dalle sessioni
+        self._sweep_lock = threading.Lock()  # un solo controllo alla volta
+        self._touched: Dict[str, float] = {}
+        self._pins: Dict[Tuple[str, str], int] = {}
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._index = self._load_index()
+
+    # Indice
+
+    def _load_index(self) -> Dict:
+        try:
+            with open(self.index_file, encoding='utf-8') as f:
+                index = json.load(f)
+            if isinstance(index.get('entries'), dict) and isinstance(index.get('dirs'), dict):
+                return index
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Indice della conservazione non leggibile, verrà ricostruito: {e}")
+        return {'dirs': {}, 'entries': {}}
+
+    def _save_index(self):
+        self.index_file.parent.mkdir(parents=True, exist_ok=True)
+        partial = self.index_file.with_name(self.index_file.name + TEMP_SUFFIX)
+        partial.write_text(json.dumps(self._index, separators=(',', ':')), encoding='utf-8')
+        os.replace(partial, self.index_file)
+
+    def classify(self, path: Path) -> Optional[Tuple[str, str, Path]]:
+        """
+        Categoria, gruppo e voce dell'indice di un percorso.
+
+        Returns:
+            Optional[Tuple[str, str, Path]]: (categoria, gruppo, voce), o None
+            se il percorso non è in una directory gestita
+        """
+        path = Path(os.path.abspath(path))
+        for category, config in self.categories.items():
+            for directory in config['DIRS']:
+                try:
+                    relative = path.relative_to(os.path.abspath(directory))
+                except ValueError:
+                    continue
+                if relative.parts:
+                    name = relative.parts[0]
+                    return category, _group_key(category, name), Path(directory) / name
+        return None
+
+    def _managed(self, name: str) -> bool:
+        return name not in PROTECTED_NAMES and not name.endswith(TEMP_SUFFIX) and not name.startswith('.')
+
+    def _refresh_directories(self):
+        """Rilegge le directory cambiate dall'ultimo controllo (senza scendere nelle sottodirectory)."""
+        entries = self._index['entries']
+        for category, config in self.categories.items():
+            for directory in config['DIRS']:
+                directory = Path(directory)
+                key = str(directory)
+                try:
+                    modified = directory.stat().st_mtime_ns
+                except FileNotFoundError:
+                    self._index['dirs'].pop(key, None)
+                    for path in [p for p, e in entries.items() if e['dir'] == key]:
+                        del entries[path]
+                    continue
+                if self._index['dirs'].get(key) == modified:
+                    continue
+
+                present = set()
+                with os.scandir(directory) as scan:
+                    for item in scan:
+                        if not self._managed(item.name):
+                            continue
+                        path = str(directory / item.name)
+                        present.add(path)
+                        if path in entries:
+                            continue
+                        try:
+                            size, accessed = _disk_usage(Path(path))
+                        except FileNotFoundError:
+                            continue
+                        entries[path] = {
+                            'category': category,
+                            'group': _group_key(category, item.name),
+                            'dir': key,
+                            'bytes': size,
+                            'last_access': accessed
+                        }
+                for path in [p for p, e in entries.items() if e['dir'] == key and p not in present]:
+                    del entries[path]
+                self._index['dirs'][key] = modified
+
+    def _refresh_active(self, now: float, touched: Dict[str, float]):
+        """Applica gli accessi segnalati e rimisura le voci dei gruppi in uso."""
+        entries = self._index['entries']
+        for path, accessed in touched.items():
+            entry = entries.get(path)
+            if entry:
+                entry['last_access'] = max(entry['last_access'], accessed)
+
+        active = {
+            (e['category'], e['group']) for e in entries.values()
+            if now - e['last_access'] < self.in_use_seconds
+        } | set(self._pins)
+        for path, entry in list(entries.items()):
+            if (entry['category'], entry['group']) not in active:
+                continue
+            try:
+                size, modified = _disk_usage(Path(path))
+            except FileNotFoundError:
+                del entries[path]
+                continue
+            entry['bytes'] = size
+            entry['last_access'] = max(entry['last_access'], modified)
+
+    # Accessi e protezione
+
+    def touch(self, *paths: Path):
+        """Segnala un accesso (lettura o scrittura) ai percorsi indicati."""
+        now = time.time()
+        with self._lock:
+            for path in paths:
+                target = self.classify(path)
+                if target:
+                    self._touched[str(target[2])] = now
+
+    def pin(self, *paths: Path) -> List[Tuple[str, str]]:
+        """
+        Impedisce la rimozione dei gruppi dei percorsi indicati fino a unpin.
+
+        Returns:
+            List[Tuple[str, str]]: Gruppi bloccati, da passare a unpin
+        """
+        groups = [target[:2] for target in map(self.classify, paths) if target]
+        with self._lock:
+            for group in groups:
+                self._pins[group] = self._pins.get(group, 0) + 1
+        self.touch(*paths)
+        return groups
+
+    def unpin(self, groups: Iterable[Tuple[str, str]]):
+        """Sblocca i gruppi restituiti da pin."""
+        with self._lock:
+            for group in groups:
+                remaining = self._pins.get(group, 0) - 1
+                if remaining > 0:
+                    self._pins[group] = remaining
+                else:
+                    self._pins.pop(group, None)
+
+    # Controllo
+
+    def sweep(self, max_age: Optional[float] = None) -> Dict:
+        """
+        Aggiorna l'indice e rimuove i gruppi in eccesso rispetto ai budget.
+
+        Prima vengono rispettati i budget delle singole categorie, poi quello
+        complessivo; in entrambi i casi si rimuove il gruppo con l'ultimo
+        accesso più vecchio tra quelli non protetti.
+
+        Args:
+            max_age: Se indicato, rimuove anche i gruppi non protetti con
+                l'ultimo accesso più vecchio di questi secondi, a prescindere
+                dai budget (pulizia richiesta dall'utente)
+
+        Returns:
+            Dict: Report con byte liberati e gruppi rimossi per categoria,
+            occupazione residua e categorie rimaste oltre il budget
+        """
+        with self._sweep_lock:
+            started = time.perf_counter()
+            now = time.time()
+            with self._lock:
+                touched, self._touched = self._touched, {}
+                pinned = set(self._pins)
+
+            self._refresh_directories()
+            self._refresh_active(now, touched)
+
+            groups: Dict[Tuple[str, str], Dict] = {}
+            for path, entry in self._index['entries'].items():
+                group = groups.setdefault(
+                    (entry['category'], entry['group']), {'bytes': 0, 'last_access': 0.0, 'paths': []}
+                )
+                group['bytes'] += entry['bytes']
+                group['last_access'] = max(group['last_access'], entry['last_access'])
+                group['paths'].append(path)
+
+            usage = {category: 0 for category in self.categories}
+            for (category, _), group in groups.items():
+                usage[category] += group['bytes']
+
+            # Candidati alla rimozione, dal meno recente
+            candidates = sorted(
+                (key for key, group in groups.items()
+                 if key not in pinned and now - group['last_access'] >= self.in_use_seconds),
+                key=lambda key: groups[key]['last_access']
+            )
+            report = {
+                'reclaimed_bytes': 0,
+                'removed_groups': 0,
+                'removed_files': 0,
+                'by_category': {},
+                'over_budget': []
+            }
+            archive_dirs = set()
+
+            def evict(key: Tuple[str, str]):
+                group = groups.pop(key)
+                for path in group['paths']:
+                    target = Path(path)
+                    if key[0] == 'responses':
+                        archive_dirs.add(target.parent)
+                    try:
+                        if target.is_dir():
+                            shutil.rmtree(target)
+                        else:
+                            target.unlink()
+                    except FileNotFoundError:
+                        pass
+                    self._index['entries'].pop(path, None)
+                category = key[0]
+                usage[category] -= group['bytes']
+                stats = report['by_category'].setdefault(category, {'bytes': 0, 'groups': 0})
+                stats['bytes'] += group['bytes']
+                stats['groups'] += 1
+                report['reclaimed_bytes'] += group['bytes']
+                report['removed_groups'] += 1
+                report['removed_files'] += len(group['paths'])
+                RETENTION_RECLAIMED.inc(group['bytes'], category=category)
+                logger.debug(f"Rimosso il gruppo {key[1]} ({category}, {group['bytes']} byte)")
+
+            for category, config in self.categories.items():
+                for key in [key for key in candidates if key[0] == category]:
+                    if usage[category] <= config['MAX_BYTES']:
+                        break
+                    evict(key)
+            for key in candidates:
+                if sum(usage.values()) <= self.max_bytes:
+                    break
+                if key in groups:
+                    evict(key)
+            if max_age is not None:
+                for key in candidates:
+                    if key in groups and now - groups[key]['last_access'] > max_age:
+                        evict(key)
+
+            report['over_budget'] = [
+                category for category, config in self.categories.items()
+                if usage[category] > config['MAX_BYTES']
+            ]
+            if sum(usage.values()) > self.max_bytes:
+                report['over_budget'].append('total')
+            report['usage_bytes'] = usage
+            report['total_bytes'] = sum(usage.values())
+            report['duration_seconds'] = round(time.perf_counter() - started, 3)
+            report['finished_at'] = now
+
+            # Resta la data di modifica letta prima di scandir: le directory cambiate
+            # da allora (rimozioni o file creati durante il controllo) verranno rilette
+            self._save_index()
+
+        if archive_dirs:
+            # L'indice delle risposte non deve più puntare agli archivi rimossi
+            from src.utils.response_archive import get_archive_writer
+            for directory in archive_dirs:
+                get_archive_writer().compact_index(directory)
+
+        for category, used in usage.items():
+            STORAGE_BYTES.set(used, category=category)
+        if report['removed_groups']:
+            logger.info(
+                f"Conservazione: liberati {report['reclaimed_bytes'] / 1024 ** 2:.1f} MB "
+                f"({report['removed_groups']} gruppi, {report['removed_files']} file), "
+                f"occupati {report['total_bytes'] / 1024 ** 2:.1f} MB"
+            )
+        if report['over_budget']:
+            logger.warning(f"Conservazione: budget superato da file in uso per {', '.join(report['over_budget'])}")
+        self.last_report = report
+        return report
+
+    # Thread in background
+
+    def start(self, interval: Optional[float] = None) -> threading.Thread:
+        """
+        Avvia i controlli periodici in un thread in background (una sola volta).
+
+        Args:
+            interval: Secondi tra due controlli; se None usa RETENTION_SETTINGS['INTERVAL']
+        """
+        interval = interval or RETENTION_SETTINGS['INTERVAL']
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, args=(interval,), name='retention', daemon=True)
+                self._thread.start()
+                logger.info(f"Conservazione dei file attiva: controllo ogni {interval:.0f} secondi")
+        return self._thread
+
+    def trigger(self):
+        """Richiede un controllo immediato al thread in background."""
+        self._wake.set()
+
+    def _run(self, interval: float):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Errore durante la conservazione dei file: {e}")
+            self._wake.wait(interval)
+            self._wake.clear()
+
+# Gestore condiviso dal processo
+_manager: Optional[RetentionManager] = None
+_manager_lock = threading.Lock()
+
+def get_retention_manager() -> RetentionManager:
+    """
+    Restituisce il RetentionManager condiviso, creandolo al primo utilizzo
+    e avviando i controlli in background se RETENTION_SETTINGS['ENABLED'].
+
+    Returns:
+        RetentionManager: Gestore del processo
+    """
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = RetentionManager()
+            if RETENTION_SETTINGS['ENABLED']:
+                _manager.start()
+        return _manager
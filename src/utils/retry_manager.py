@@ -4,12 +4,7 @@ import time
 from typing import TypeVar, Callable, Any, Optional, Tuple
 from functools import wraps
 from src.utils.logger import setup_logger
-import openai
-from openai import (
-    APIError,
-    APIConnectionError,
-    RateLimitError
-)
+from src.utils.metrics import RETRIES
 
 logger = setup_logger(__name__)
 
@@ -82,16 +77,28 @@ class RetryManager:
         Returns:
             bool: True se si dovrebbe ritentare
         """
-        # Lista di errori che giustificano un retry
+        # Import differito: openai è pesante e serve solo in caso di errore
+        from openai import APIConnectionError, APIStatusError, RateLimitError
+        
+        # Errori di rete, timeout e rate limiting giustificano un retry
         RETRIABLE_ERRORS = (
-            APIError,           # Errori API generici
-            APIConnectionError, # Errori di connessione
+            APIConnectionError, # Errori di connessione e timeout dell'SDK
             RateLimitError,    # Rate limiting
             TimeoutError,      # Timeout
             ConnectionError,    # Errori di rete
         )
         
-        return isinstance(error, RETRIABLE_ERRORS)
+        # Gli errori dell'SDK arrivano spesso incapsulati (ad es. VisionAPIError
+        # sollevato "from e"): si esamina anche la catena delle cause
+        while error is not None:
+            if isinstance(error, RETRIABLE_ERRORS):
+                return True
+            if isinstance(error, APIStatusError):
+                # Errori del server e conflitti temporanei; gli altri 4xx non cambiano ritentando
+                return error.status_code >= 500 or error.status_code in (408, 409)
+            error = error.__cause__
+        
+        return False
         
     def execute_with_retry(
         self,
@@ -137,6 +144,7 @@ class RetryManager:
                         f"Tentativo {attempt + 1} fallito con errore: {str(e)}. "
                         f"Nuovo tentativo tra {delay:.2f} secondi"
                     )
+                    RETRIES.inc(function=getattr(func, '__name__', 'unknown'))
                     time.sleep(delay)
                 else:
                     logger.error(
@@ -1,16 +1,22 @@
 # src/utils/session_manager.py
 
 import streamlit as st
-import pandas as pd
 import json
 import uuid
 import shutil
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import TYPE_CHECKING, Optional, Dict, Any
 from .checkpoint_manager import CheckpointManager
+from .file_spool import spool_to_disk
+from .retention import get_retention_manager
+from src.config.settings import CATALOG_SETTINGS
 from src.utils.logger import setup_logger
 
+if TYPE_CHECKING:
+    import pandas as pd
+    from src.utils.profiler import JobProfiler
+
 logger = setup_logger(__name__)
 
 class SessionManager:
@@ -18,7 +24,15 @@ class SessionManager:
     Gestisce la persistenza dei dati di sessione in Streamlit.
     """
     
-    _checkpoint_manager = CheckpointManager()
+    # Creato al primo utilizzo per evitare I/O su disco all'import
+    _checkpoint_manager: Optional[CheckpointManager] = None
+    
+    @classmethod
+    def _get_checkpoint_manager(cls) -> CheckpointManager:
+        """Restituisce il CheckpointManager condiviso, creandolo se necessario."""
+        if cls._checkpoint_manager is None:
+            cls._checkpoint_manager = CheckpointManager()
+        return cls._checkpoint_manager
     
     @classmethod
     def initialize_session(cls):
@@ -133,6 +147,16 @@ class SessionManager:
     def save_file_to_temp(cls, uploaded_file) -> Path:
         """
         Salva il file caricato nella directory temporanea.
+        
+        Il file viene copiato a blocchi con l'hash calcolato durante la
+        copia: le fasi successive aprono il PDF dal percorso restituito
+        invece di ricevere copie in memoria del contenuto.
+        
+        Args:
+            uploaded_file: File caricato (UploadedFile di Streamlit)
+            
+        Returns:
+            Path: Percorso del file salvato
         """
         try:
             temp_dir = Path("temp/uploads")
@@ -143,14 +167,15 @@ class SessionManager:
             temp_path = temp_dir / f"{timestamp}_{uploaded_file.name}"
             
             # Salva il file
-            temp_path.write_bytes(uploaded_file.getvalue())
+            file_size, file_hash = spool_to_disk(uploaded_file, temp_path)
             
             # Crea checkpoint iniziale con metadati estesi
             initial_metadata = {
                 'stage': 'upload',
                 'file_path': str(temp_path),
                 'original_file_name': uploaded_file.name,
-                'file_size': uploaded_file.size,
+                'file_size': file_size,
+                'file_sha256': file_hash,
                 'timestamp': timestamp,
                 'upload_time': datetime.now().isoformat()
             }
@@ -168,7 +193,7 @@ class SessionManager:
             raise
 
     @classmethod
-    def save_results(cls, df: pd.DataFrame):
+    def save_results(cls, df: "pd.DataFrame"):
         """
         Salva i risultati nel session state e su disco.
         
@@ -200,7 +225,12 @@ class SessionManager:
                 'rows_count': len(df),
                 'columns': list(df.columns),
                 'last_operation': 'save_results',
-                'has_exports': bool(st.session_state.get('export_history', []))
+                'has_exports': bool(st.session_state.get('export_history', [])),
+                # Fornitore ed edizione nel catalogo dei prodotti (src.utils.catalog_index)
+                'supplier': st.session_state.session_metadata.get('supplier'),
+                'file_sha256': st.session_state.session_metadata.get('file_sha256'),
+                # Archivio delle risposte grezze, per rigenerare la tabella (src.extractor.replay)
+                'response_archive': st.session_state.session_metadata.get('response_archive')
             }
             
             # Aggiorna i metadati della sessione
@@ -209,6 +239,8 @@ class SessionManager:
             metadata_path = save_dir / f"metadata_{timestamp}.json"
             with open(metadata_path, 'w') as f:
                 json.dump(metadata, f)
+            
+            cls._index_catalog(df, metadata)
                 
             # Salva checkpoint finale
             cls._save_processing_checkpoint({
@@ -225,6 +257,116 @@ class SessionManager:
             logger.error(f"Errore nel salvataggio dei risultati: {e}")
             raise
 
+    @classmethod
+    def _index_catalog(cls, df: "pd.DataFrame", metadata: Dict[str, Any]):
+        """
+        Aggiunge i risultati al catalogo dei prodotti di tutte le sessioni.
+        
+        Un errore del catalogo non impedisce il salvataggio della sessione.
+        """
+        if not CATALOG_SETTINGS['ENABLED']:
+            return
+        try:
+            from .catalog_index import get_catalog_index
+            get_catalog_index().index_results(df, metadata)
+        except Exception as e:
+            logger.error(f"Errore nell'indicizzazione del catalogo: {e}")
+
+    @classmethod
+    def save_performance_report(cls, report: Dict[str, Any], kind: str = 'performance') -> Optional[Path]:
+        """
+        Salva il report dei tempi di elaborazione accanto ai metadati della sessione.
+        
+        Args:
+            report: Riepilogo prodotto da JobTimer.summary (o da
+                MemoryProfile.summary con kind='memory')
+            kind: Tipo di report, usato come prefisso del file
+            
+        Returns:
+            Optional[Path]: Percorso del report o None in caso di errore
+        """
+        try:
+            timestamp = st.session_state.processing_timestamp
+            save_dir = Path("temp/results")
+            save_dir.mkdir(parents=True, exist_ok=True)
+            
+            report_path = save_dir / f"{kind}_{timestamp}.json"
+            with open(report_path, 'w') as f:
+                json.dump(report, f, indent=2)
+                
+            logger.debug(f"Report prestazioni salvato in: {report_path}")
+            return report_path
+            
+        except Exception as e:
+            logger.error(f"Errore nel salvataggio del report prestazioni: {e}")
+            return None
+
+    @classmethod
+    def save_profile(cls, profiler: "JobProfiler") -> Optional[Dict[str, Path]]:
+        """
+        Salva il profilo del job (pstats e collapsed) accanto ai risultati della sessione.
+        
+        Args:
+            profiler: JobProfiler del job
+            
+        Returns:
+            Optional[Dict[str, Path]]: Percorsi dei file o None in caso di errore
+        """
+        try:
+            timestamp = st.session_state.processing_timestamp
+            return profiler.save(Path("temp/results"), f"profile_{timestamp}")
+        except Exception as e:
+            logger.error(f"Errore nel salvataggio del profilo: {e}")
+            return None
+
+    @classmethod
+    def get_profile_paths(cls, timestamp: Optional[str] = None) -> Dict[str, Path]:
+        """
+        Restituisce i file di profilo disponibili per una sessione.
+        
+        Args:
+            timestamp: Timestamp della sessione; se None usa quella corrente
+            
+        Returns:
+            Dict[str, Path]: 'pstats' e/o 'collapsed', se presenti
+        """
+        timestamp = timestamp or st.session_state.get('processing_timestamp')
+        if not timestamp:
+            return {}
+        results_dir = Path("temp/results")
+        candidates = {
+            'pstats': results_dir / f"profile_{timestamp}.pstats",
+            'collapsed': results_dir / f"profile_{timestamp}.folded"
+        }
+        return {kind: path for kind, path in candidates.items() if path.exists()}
+
+    @classmethod
+    def load_performance_report(
+        cls,
+        timestamp: Optional[str] = None,
+        kind: str = 'performance'
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Carica il report dei tempi di elaborazione di una sessione.
+        
+        Args:
+            timestamp: Timestamp della sessione; se None usa quella corrente
+            kind: Tipo di report ('performance' o 'memory')
+            
+        Returns:
+            Optional[Dict[str, Any]]: Report o None se non disponibile
+        """
+        timestamp = timestamp or st.session_state.get('processing_timestamp')
+        report_path = Path("temp/results") / f"{kind}_{timestamp}.json"
+        if not timestamp or not report_path.exists():
+            return None
+        try:
+            with open(report_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Errore nel caricamento del report prestazioni: {e}")
+            return None
+
     @classmethod
     def load_last_session(cls) -> bool:
         """Carica l'ultima sessione salvata."""
@@ -263,7 +405,11 @@ class SessionManager:
             metadata_file = results_dir / f"metadata_{timestamp}.json"
             
             if results_file.exists() and metadata_file.exists():
+                # Accesso alla sessione: la conservazione dei file rimuove prima le meno usate
+                get_retention_manager().touch(results_file, metadata_file)
+                
                 # Carica risultati
+                import pandas as pd
                 st.session_state.results_df = pd.read_csv(results_file)
                 
                 # Carica metadata
@@ -298,7 +444,11 @@ class SessionManager:
             results_dir = Path("temp/results")
             files_to_delete = [
                 results_dir / f"results_{timestamp}.csv",
-                results_dir / f"metadata_{timestamp}.json"
+                results_dir / f"metadata_{timestamp}.json",
+                results_dir / f"performance_{timestamp}.json",
+                results_dir / f"memory_{timestamp}.json",
+                results_dir / f"profile_{timestamp}.pstats",
+                results_dir / f"profile_{timestamp}.folded"
             ]
             
             # Cerca anche eventuali file temporanei associati
@@ -384,7 +534,7 @@ class SessionManager:
             is_final: Se True, segna il checkpoint come finale
         """
         try:
-            cls._checkpoint_manager.save_checkpoint(
+            cls._get_checkpoint_manager().save_checkpoint(
                 st.session_state.session_id,
                 state,
                 is_final
@@ -432,7 +582,7 @@ class SessionManager:
             days: Elimina sessioni più vecchie di questi giorni
         """
         try:
-            cls._checkpoint_manager.cleanup_old_sessions(days)
+            cls._get_checkpoint_manager().cleanup_old_sessions(days)
             
             # Pulizia directory temporanee
             temp_dirs = [Path("temp/uploads"), Path("temp/results")]
@@ -0,0 +1,198 @@
+# src/utils/timing.py
+
+import contextvars
+import functools
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+from src.utils.metrics import STAGE_DURATION
+from src.utils.profiler import watch_current_thread
+from src.utils.memory_profile import current_memory_profile
+
+# Timer del job e pagina correnti, per thread/contesto (vedi copy_context
+# per propagarli ai thread di un executor)
+_current_timer: contextvars.ContextVar[Optional["JobTimer"]] = contextvars.ContextVar('job_timer', default=None)
+_current_page: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar('job_page', default=None)
+
+class JobTimer:
+    """
+    Raccoglie le durate (span) delle fasi di un'elaborazione.
+
+    Gli span vengono aggregati per fase, per pagina e per l'intero job. Senza
+    un JobTimer attivo gli span alimentano solo le metriche di processo,
+    quindi la strumentazione può restare nel codice anche fuori
+    dall'applicazione.
+    """
+
+    def __init__(self, job_id: str):
+        """
+        Args:
+            job_id: Identificativo del job (ad es. l'id della sessione)
+        """
+        self.job_id = job_id
+        self.started_at = datetime.now().isoformat()
+        self.spans: List[Dict] = []
+        self._started = time.perf_counter()
+        self._finished: Optional[float] = None
+        self._lock = threading.Lock()
+        self._token = None
+
+    def activate(self) -> "JobTimer":
+        """Rende il timer quello corrente per il contesto del chiamante."""
+        self._token = _current_timer.set(self)
+        return self
+
+    def deactivate(self):
+        """Ripristina il timer precedente e chiude la misura del job."""
+        if self._token is not None:
+            _current_timer.reset(self._token)
+            self._token = None
+        if self._finished is None:
+            self._finished = time.perf_counter()
+
+    def __enter__(self) -> "JobTimer":
+        return self.activate()
+
+    def __exit__(self, *exc):
+        self.deactivate()
+
+    def record(self, stage: str, seconds: float, page: Optional[int] = None):
+        """
+        Registra uno span.
+
+        Args:
+            stage: Nome della fase (render, encode, api_call, ...)
+            seconds: Durata
+            page: Pagina a cui appartiene lo span, se nota
+        """
+        with self._lock:
+            self.spans.append({'stage': stage, 'page': page, 'seconds': seconds})
+
+    def summary(self) -> Dict:
+        """
+        Aggrega gli span per fase e per pagina.
+
+        Le fasi annidate (ad es. parse dentro api_call) sono contate in
+        entrambe: la percentuale sul totale va letta per fase, non sommata.
+
+        Returns:
+            Dict: total_seconds, stages (count, total, mean, max, share) e
+            pages (secondi per fase di ogni pagina)
+        """
+        end = self._finished or time.perf_counter()
+        total = end - self._started
+        stages: Dict[str, Dict] = {}
+        pages: Dict[str, Dict[str, float]] = {}
+
+        with self._lock:
+            spans = list(self.spans)
+
+        for span in spans:
+            stats = stages.setdefault(span['stage'], {'count': 0, 'total_seconds': 0.0, 'max_seconds': 0.0})
+            stats['count'] += 1
+            stats['total_seconds'] += span['seconds']
+            stats['max_seconds'] = max(stats['max_seconds'], span['seconds'])
+            if span['page'] is not None:
+                page = pages.setdefault(str(span['page']), {})
+                page[span['stage']] = round(page.get(span['stage'], 0.0) + span['seconds'], 4)
+
+        for stats in stages.values():
+            stats['mean_seconds'] = round(stats['total_seconds'] / stats['count'], 4)
+            stats['share'] = round(stats['total_seconds'] / total, 4) if total else 0.0
+            stats['total_seconds'] = round(stats['total_seconds'], 4)
+            stats['max_seconds'] = round(stats['max_seconds'], 4)
+
+        return {
+            'job_id': self.job_id,
+            'started_at': self.started_at,
+            'total_seconds': round(total, 4),
+            'stages': stages,
+            'pages': pages
+        }
+
+    def save(self, path: Path) -> Path:
+        """
+        Salva il riepilogo in JSON.
+
+        Args:
+            path: Percorso del file
+
+        Returns:
+            Path: Percorso scritto
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, indent=2)
+        return path
+
+def current_timer() -> Optional[JobTimer]:
+    """Restituisce il JobTimer attivo nel contesto corrente, se presente."""
+    return _current_timer.get()
+
+def current_page() -> Optional[int]:
+    """Restituisce la pagina in elaborazione nel contesto corrente, se nota."""
+    return _current_page.get()
+
+@contextmanager
+def page_context(page: Optional[int]) -> Iterator[None]:
+    """
+    Associa gli span del blocco a una pagina.
+
+    Args:
+        page: Numero della pagina (da 1)
+    """
+    token = _current_page.set(page)
+    try:
+        yield
+    finally:
+        _current_page.reset(token)
+
+@contextmanager
+def span(stage: str, page: Optional[int] = None) -> Iterator[None]:
+    """
+    Misura la durata del blocco e la registra nel JobTimer attivo e
+    nell'istogramma delle durate per fase (vedi src.utils.metrics); con un
+    MemoryProfile attivo ne misura anche la memoria.
+
+    Args:
+        stage: Nome della fase
+        page: Pagina; se None usa quella del contesto (vedi page_context)
+    """
+    # I worker che eseguono fasi del job entrano nel profilo, se attivo
+    watch_current_thread()
+    memory_profile = current_memory_profile()
+    if memory_profile is not None:
+        memory_profile.enter(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        if memory_profile is not None:
+            memory_profile.exit(stage)
+        STAGE_DURATION.observe(seconds, stage=stage)
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.record(stage, seconds, page if page is not None else _current_page.get())
+
+def timed(stage: str) -> Callable:
+    """
+    Decorator che registra ogni chiamata della funzione come span.
+
+    Args:
+        stage: Nome della fase
+
+    Returns:
+        Callable: Decorator
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,59 @@
+"""
+Test del server Vision simulato e del benchmark end-to-end
+"""
+
+import json
+from src.config.settings import VISION_SETTINGS
+from src.extractor.vision_api import VisionAPI
+from benchmarks.fake_vision_server import FakeVisionServer, LatencyModel
+from benchmarks.run_benchmark import run_scenario, compare_with_baseline, percentile, main
+
+
+def test_fake_server_speaks_openai_protocol_with_errors(monkeypatch):
+    """Il client OpenAI riceve le risposte simulate, anche dopo 429 e 5xx"""
+    content = json.dumps({"prodotti": [
+        {"codice": "A", "descrizione": "Uno", "tipo_prezzo": "singolo", "prezzo_unitario": 1.5}
+    ]})
+
+    with FakeVisionServer([content], error_429_rate=0.2, error_5xx_rate=0.1, seed=2) as server:
+        vision_api = VisionAPI("sk-test", base_url=server.base_url)
+        for stream in (True, False):
+            monkeypatch.setitem(VISION_SETTINGS, "STREAM", stream)
+            for _ in range(3):
+                result = vision_api._request_completion(vision_api._build_messages("abc"))
+                assert [p["codice"] for p in result["products"]] == ["A"]
+
+    assert server.stats["served"] == 6
+    assert server.stats["errors_429"] + server.stats["errors_5xx"] > 0
+
+
+def test_run_scenario_reports_throughput(tmp_path):
+    """Uno scenario piccolo estrae tutti i prodotti attesi e riporta le metriche"""
+    result = run_scenario(2, 5, tmp_path, LatencyModel(), 0.0, 0.0)
+
+    assert result["products_extracted"] == result["products_expected"] == 10
+    assert result["stages"]["extract"]["count"] == 2
+    assert result["pages_per_second"] > 0
+    assert result["peak_rss_mb"] > 0
+
+
+def test_compare_with_baseline_flags_regressions():
+    """Un calo di throughput oltre la tolleranza è una regressione"""
+    baseline = {"5x20": {"pages_per_second": 10.0, "peak_rss_mb": 200.0, "stages": {"extract": {"p95": 0.5}}}}
+    current = {"5x20": {"pages_per_second": 7.0, "peak_rss_mb": 210.0, "stages": {"extract": {"p95": 0.55}},
+                        "products_expected": 100, "products_extracted": 100}}
+
+    regressions = compare_with_baseline(current, baseline, tolerance=0.2)
+
+    assert len(regressions) == 1
+    assert "pagine/s" in regressions[0]
+    assert percentile([1, 2, 3, 4], 0.5) == 2.5
+
+
+def test_missing_baseline_fails_the_comparison(tmp_path):
+    """Senza baseline il confronto termina con errore invece di passare in silenzio"""
+    args = ["--scenario", "1x2", "--output", str(tmp_path / "report.json")]
+
+    assert main(args + ["--baseline", str(tmp_path / "mancante.json")]) == 2
+    assert main(args + ["--baseline", str(tmp_path / "base.json"), "--update-baseline"]) == 0
+    assert main(args + ["--baseline", str(tmp_path / "base.json"), "--tolerance", "100"]) == 0
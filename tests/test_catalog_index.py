@@ -0,0 +1,94 @@
+"""
+Test unitari per il catalogo dei prodotti di tutte le sessioni
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+from src.utils.catalog_index import CatalogIndex, default_supplier
+
+
+def listino(prezzo_sedia, prezzo_tavolo=None):
+    """DataFrame come quello di DataProcessor.process_data"""
+    return pd.DataFrame([
+        {'codice': 'RC330-40', 'descrizione': 'Sedia reclinabile in faggio', 'tipo_prezzo': 'singolo',
+         'prezzo_unitario': prezzo_sedia, 'descrizione_quantita': '', 'non_vendibile_separatamente': False,
+         'PER Pz. 10': None, 'PER Pz. 50': None},
+        {'codice': 'TV-100', 'descrizione': 'Tavolo allungabile', 'tipo_prezzo': 'quantita',
+         'prezzo_unitario': None, 'descrizione_quantita': 'Confezione', 'non_vendibile_separatamente': True,
+         'PER Pz. 10': prezzo_tavolo or 90.0, 'PER Pz. 50': 80.0},
+        {'codice': '', 'descrizione': 'Riga senza codice', 'tipo_prezzo': 'singolo',
+         'prezzo_unitario': 1.0, 'descrizione_quantita': '', 'non_vendibile_separatamente': False,
+         'PER Pz. 10': None, 'PER Pz. 50': None}
+    ])
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = CatalogIndex(tmp_path / "catalog.sqlite3")
+    catalog.index_session(listino(140.0), 'Rossi', 'ed-2023', '2023-01-10T00:00:00', 'rossi_2023.pdf')
+    catalog.index_session(listino(148.0, 95.0), 'Rossi', 'ed-2024', '2024-01-10T00:00:00', 'rossi_2024.pdf')
+    catalog.index_session(listino(150.0), 'Bianchi', 'ed-b', '2024-02-01T00:00:00', 'bianchi.pdf')
+    yield catalog
+    catalog.close()
+
+
+def test_lookup_and_price_history(catalog):
+    """La ricerca per codice dà l'ultima edizione per fornitore, lo storico tutte le edizioni"""
+    latest = {p['supplier']: p for p in catalog.lookup('rc330-40')}
+    assert latest['Rossi']['prezzo_unitario'] == 148.0
+    assert latest['Bianchi']['prezzo_unitario'] == 150.0
+
+    history = catalog.price_history('RC330-40', supplier='Rossi')
+    assert [(p['edition_date'][:4], p['prezzo_unitario']) for p in history] == [('2024', 148.0), ('2023', 140.0)]
+
+    tavolo = catalog.lookup('TV-100', supplier='Rossi')[0]
+    assert tavolo['non_vendibile_separatamente'] is True
+    assert tavolo['prezzi_quantita'] == [{'quantita': 10, 'prezzo': 95.0}, {'quantita': 50, 'prezzo': 80.0}]
+
+
+def test_full_text_search(catalog):
+    """La ricerca testuale trova prefissi e restituisce solo l'edizione più recente"""
+    found = catalog.search('reclin')
+    assert sorted((p['supplier'], p['edition']) for p in found) == [('Bianchi', 'ed-b'), ('Rossi', 'ed-2024')]
+    assert catalog.search('allungabile', supplier='Bianchi')[0]['codice'] == 'TV-100'
+    assert catalog.search('"; DROP') == []
+
+
+def test_reindexing_an_edition_replaces_it(catalog, tmp_path):
+    """Rielaborare la stessa edizione la sostituisce; il backfill indicizza le sessioni salvate"""
+    catalog.index_session(listino(149.0).iloc[:1], 'Rossi', 'ed-2024', '2024-01-10T00:00:00')
+    assert catalog.price_history('RC330-40', 'Rossi')[0]['prezzo_unitario'] == 149.0
+    assert catalog.lookup('TV-100', 'Rossi')[0]['edition'] == 'ed-2023'
+    assert [e['products'] for e in catalog.editions('Rossi')] == [1, 2]
+    assert catalog.search('allungabile', supplier='Rossi')[0]['edition'] == 'ed-2023'
+
+    results_dir = tmp_path / "results"
+    results_dir.mkdir()
+    listino(160.0).to_csv(results_dir / "results_20250101_090000.csv", index=False)
+    (results_dir / "metadata_20250101_090000.json").write_text(
+        json.dumps({'timestamp': '20250101_090000', 'file_name': 'Listino_Verdi_2025.pdf'})
+    )
+    assert catalog.backfill(results_dir) == 1
+    assert catalog.backfill(results_dir) == 0
+    verdi = catalog.lookup('RC330-40', 'Listino Verdi')[0]
+    assert verdi['prezzo_unitario'] == 160.0
+    assert verdi['edition_date'] == '2025-01-01T09:00:00'
+
+
+def test_reindexing_under_another_supplier_keeps_previous_supplier_searchable(catalog):
+    """Se un'edizione cambia fornitore, le edizioni restanti del vecchio tornano nella ricerca"""
+    catalog.index_session(listino(148.0), 'Rossi Srl', 'ed-2024', '2024-01-10T00:00:00')
+
+    found = {(p['supplier'], p['edition']) for p in catalog.search('reclin')}
+    assert found == {('Bianchi', 'ed-b'), ('Rossi', 'ed-2023'), ('Rossi Srl', 'ed-2024')}
+    assert catalog.lookup('RC330-40', 'Rossi')[0]['edition'] == 'ed-2023'
+
+
+def test_default_supplier():
+    """Il fornitore predefinito è il nome del file senza anno"""
+    assert default_supplier('Listino_Rossi_2024.pdf') == 'Listino Rossi'
+    assert default_supplier('2024.pdf') == '2024'
+    assert default_supplier(None) == 'Sconosciuto'
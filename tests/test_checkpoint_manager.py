@@ -0,0 +1,86 @@
+"""
+Test unitari per il journal dei checkpoint
+"""
+
+import json
+
+import pytest
+
+from src.config.settings import CHECKPOINT_SETTINGS
+from src.utils.checkpoint_manager import CheckpointManager
+
+
+def _lines(path):
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+def test_updates_append_only_changed_keys(tmp_path):
+    """Ogni salvataggio aggiunge solo le chiavi cambiate e il caricamento le riapplica"""
+    manager = CheckpointManager(tmp_path)
+    state = {'original_file_name': 'listino.pdf', 'results': list(range(100)), 'status': 'processing'}
+    manager.save_checkpoint('s1', state)
+    manager.save_checkpoint('s1', {**state, 'status': 'completed', 'rows': 3})
+    manager.save_checkpoint('s1', {'original_file_name': 'listino.pdf', 'status': 'completed', 'rows': 3})
+
+    records = _lines(tmp_path / 'current' / 'checkpoint_s1.jsonl')
+    assert [r['type'] for r in records] == ['header', 'snapshot', 'update', 'update']
+    assert records[2]['set'] == {'status': 'completed', 'rows': 3}
+    assert records[3] == {**records[3], 'set': {}, 'unset': ['results']}
+
+    reloaded = CheckpointManager(tmp_path).load_checkpoint('s1')
+    assert reloaded['session_id'] == 's1'
+    assert reloaded['state'] == {'original_file_name': 'listino.pdf', 'status': 'completed', 'rows': 3}
+
+
+def test_compaction_and_truncated_tail(tmp_path, monkeypatch):
+    """Il journal si compatta in un'istantanea e una riga troncata viene ignorata"""
+    monkeypatch.setitem(CHECKPOINT_SETTINGS, 'COMPACT_RECORDS', 3)
+    manager = CheckpointManager(tmp_path)
+    for step in range(5):
+        manager.save_checkpoint('s1', {'step': step})
+
+    path = tmp_path / 'current' / 'checkpoint_s1.jsonl'
+    assert [r['type'] for r in _lines(path)] == ['header', 'snapshot', 'update']
+    assert not list(path.parent.glob('*.tmp'))
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"type": "update", "timestamp": "2024')
+    assert CheckpointManager(tmp_path).load_checkpoint('s1')['state'] == {'step': 4}
+
+    # Un nuovo gestore riprende il journal esistente
+    resumed = CheckpointManager(tmp_path)
+    resumed.save_checkpoint('s1', {'step': 5})
+    assert resumed.load_checkpoint('s1')['state'] == {'step': 5}
+
+
+def test_final_checkpoint_and_session_listing(tmp_path):
+    """Il checkpoint finale va in cronologia; list_sessions legge le intestazioni e i vecchi .json"""
+    manager = CheckpointManager(tmp_path)
+    manager.save_checkpoint('s1', {'metadata': {'original_file_name': 'a.pdf'}})
+    manager.save_checkpoint('s2', {'original_file_name': 'b.pdf'})
+    manager.save_checkpoint('s2', {'original_file_name': 'b.pdf', 'rows': 1}, is_final=True)
+    legacy = {'timestamp': '2020-01-01T00:00:00', 'session_id': 's0', 'state': {'original_file_name': 'c.pdf'}}
+    (tmp_path / 'current' / 'checkpoint_s0.json').write_text(json.dumps(legacy), encoding='utf-8')
+
+    assert not (tmp_path / 'current' / 'checkpoint_s2.jsonl').exists()
+    assert manager.load_checkpoint('s2')['state'] == {'original_file_name': 'b.pdf', 'rows': 1}
+    assert manager.load_checkpoint('s0') == legacy
+
+    sessions = {s['session_id']: s for s in manager.list_sessions()}
+    assert sessions['s1']['file_name'] == 'a.pdf' and not sessions['s1']['is_complete']
+    assert sessions['s2']['file_name'] == 'b.pdf' and sessions['s2']['is_complete']
+    assert sessions['s0']['file_name'] == 'c.pdf'
+
+
+@pytest.mark.parametrize('days, remaining', [(7, 1), (0, 0)])
+def test_cleanup_removes_journals(tmp_path, days, remaining):
+    """La pulizia rimuove journal vecchi"""
+    import os
+    manager = CheckpointManager(tmp_path)
+    manager.save_checkpoint('s1', {'step': 1})
+    path = tmp_path / 'current' / 'checkpoint_s1.jsonl'
+    os.utime(path, (path.stat().st_atime, path.stat().st_mtime - 3600))
+
+    manager.cleanup_old_sessions(days)
+
+    assert len(list((tmp_path / 'current').glob('checkpoint_*'))) == remaining
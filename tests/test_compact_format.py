@@ -0,0 +1,41 @@
+"""
+Test unitari per il modulo compact_format
+"""
+
+from src.utils.compact_format import expand_compact, expand_row, is_compact
+from src.utils.json_validator import JSONValidator
+
+
+def test_expand_compact_to_canonical_products():
+    """Le righe posizionali diventano prodotti canonici validi"""
+    data = {"r": [
+        ["RC330-40", "Sedia - Misura 40 cm", "s", 148.0, None, None],
+        ["GU100", "Guanti", "q", None, "Pz.4 non vendibili separatamente",
+         [[4, 39.0, 1, 1], [12, 35.0, 0, 1]]],
+    ]}
+
+    assert is_compact(data)
+    expanded = expand_compact(data)
+
+    assert expanded["prodotti"][0] == {
+        "codice": "RC330-40",
+        "descrizione": "Sedia - Misura 40 cm",
+        "tipo_prezzo": "singolo",
+        "prezzo_unitario": 148.0
+    }
+    assert expanded["prodotti"][1]["prezzi_quantita"][1] == {
+        "quantita": 12, "prezzo": 35.0, "quantita_minima": False, "non_vendibile_separatamente": True
+    }
+    _, errors = JSONValidator.validate_and_sanitize(expanded)
+    assert errors == []
+
+
+def test_expand_row_with_header():
+    """Un'intestazione esplicita cambia l'ordine delle colonne"""
+    row = ["Sedia", "A1", "s", 10]
+    columns = ["descrizione", "codice", "tipo_prezzo", "prezzo_unitario"]
+
+    assert expand_row(row, columns) == {
+        "descrizione": "Sedia", "codice": "A1", "tipo_prezzo": "singolo", "prezzo_unitario": 10
+    }
+    assert expand_row({"codice": "A1"}) is None
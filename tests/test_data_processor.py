@@ -59,4 +59,21 @@ def test_save_csv_invalid_path(data_processor, sample_data):
     invalid_path = Path("/invalid/path/test.csv")
     
     with pytest.raises(Exception):
-        data_processor.save_csv(df, invalid_path) 
\ No newline at end of file
+        data_processor.save_csv(df, invalid_path)
+
+
+def test_process_data_trusted_skips_validation(data_processor, monkeypatch):
+    """Con trusted=True la validazione a livello di catalogo non viene eseguita"""
+    def fail(*args, **kwargs):
+        raise AssertionError("validazione non attesa")
+    monkeypatch.setattr(data_processor, "_validate_input_data", fail)
+
+    trusted_data = [
+        {"codice": "A1", "descrizione": "Prodotto A", "tipo_prezzo": "singolo", "prezzo_unitario": 12.0},
+        {"codice": "B1", "descrizione": "Prodotto B", "tipo_prezzo": "singolo", "prezzo_unitario": None},
+    ]
+    df = data_processor.process_data(trusted_data, trusted=True)
+
+    assert len(df) == 2
+    assert df["prezzo_unitario"].iloc[0] == 12.0
+    assert pd.isna(df["prezzo_unitario"].iloc[1])
@@ -0,0 +1,22 @@
+"""
+Test unitari per il modulo file_spool
+"""
+
+import hashlib
+import io
+from src.utils.file_spool import spool_to_disk
+
+
+def test_spool_to_disk_writes_in_chunks_and_hashes(tmp_path):
+    """Il file viene copiato a blocchi con l'hash calcolato durante la copia"""
+    content = b"%PDF-1.4\n" + bytes(range(256)) * 100
+    source = io.BytesIO(content)
+    source.read(10)  # Posizione non iniziale, come dopo una validazione
+    destination = tmp_path / "listino.pdf"
+
+    size, digest = spool_to_disk(source, destination, chunk_size=1000)
+
+    assert destination.read_bytes() == content
+    assert size == len(content)
+    assert digest == hashlib.sha256(content).hexdigest()
+    assert not (tmp_path / "listino.pdf.part").exists()
@@ -0,0 +1,61 @@
+"""
+Test sui tempi di import dei moduli del package src
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Budget di import (secondi) per i moduli usati da CLI e worker
+IMPORT_BUDGET_SECONDS = 0.5
+
+# Dipendenze pesanti da caricare solo quando servono davvero
+HEAVY_MODULES = ['streamlit', 'pandas', 'fitz', 'openai', 'httpx', 'jsonschema']
+
+
+def import_time(module: str) -> float:
+    """Misura con python -X importtime il tempo cumulativo di import di un modulo"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        if name == module:
+            return int(cumulative) / 1_000_000
+    raise AssertionError(f"Modulo {module} non trovato nell'output di importtime")
+
+
+def loaded_modules(module: str) -> list:
+    """Restituisce le dipendenze pesanti caricate importando un modulo"""
+    code = (
+        f'import sys, {module}; '
+        f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    )
+    return [m for m in result.stdout.strip().split(',') if m]
+
+
+@pytest.mark.parametrize('module', [
+    'src.utils.logger',
+    'src.extractor.vision_api',
+    'src.extractor.pdf_processor',
+    'src.extractor.data_processor',
+])
+def test_import_does_not_load_heavy_dependencies(module):
+    """I moduli della pipeline non caricano Streamlit, pandas, fitz o openai all'import"""
+    assert loaded_modules(module) == []
+
+
+def test_import_time_budget():
+    """L'import del client Vision resta entro il budget"""
+    elapsed = import_time('src.extractor.vision_api')
+    assert elapsed < IMPORT_BUDGET_SECONDS, f"import in {elapsed:.3f}s"
@@ -0,0 +1,34 @@
+"""
+Test unitari per il modulo json_recovery
+"""
+
+from src.utils.json_recovery import repair_json, salvage_items, merge_products
+
+
+def test_repair_json_trailing_commas_and_extra_text():
+    """Virgole finali e testo extra attorno al JSON vengono tollerati"""
+    content = 'Ecco i dati:\n{"prodotti": [{"codice": "A",}, {"codice": "B"},]}\nFine.'
+    assert repair_json(content) == {"prodotti": [{"codice": "A"}, {"codice": "B"}]}
+
+
+def test_repair_json_unrecoverable():
+    """Un testo senza JSON valido restituisce None"""
+    assert repair_json('{"prodotti": [{"codice": ') is None
+    assert repair_json("nessun dato") is None
+
+
+def test_salvage_items_from_truncated_json():
+    """Da un JSON troncato si recuperano tutti i prodotti completi"""
+    content = '{"prodotti": [{"codice": "A"}, {"codice": "B"}, {"codice": "C", "descr'
+    assert salvage_items(content) == [{"codice": "A"}, {"codice": "B"}]
+
+
+def test_merge_products_deduplicates_by_codice():
+    """L'unione mantiene l'ordine e la prima occorrenza di ogni codice"""
+    first = [{"codice": "A", "descrizione": "uno"}, {"codice": "B", "descrizione": "due"}]
+    second = [{"codice": "B", "descrizione": "due bis"}, {"codice": "C", "descrizione": "tre"}]
+
+    merged = merge_products(first, second)
+
+    assert [p["codice"] for p in merged] == ["A", "B", "C"]
+    assert merged[1]["descrizione"] == "due"
@@ -0,0 +1,55 @@
+"""
+Test unitari per il modulo json_stream
+"""
+
+import json
+from src.utils.json_stream import IncrementalJSONParser
+
+
+def feed_in_chunks(parser, text, size):
+    """Invia il testo al parser a frammenti di dimensione fissa"""
+    items = []
+    for i in range(0, len(text), size):
+        items.extend(parser.feed(text[i:i + size]))
+    return items
+
+
+def test_emits_each_product_when_closed():
+    """Ogni prodotto viene emesso appena il suo oggetto si chiude"""
+    parser = IncrementalJSONParser()
+
+    assert parser.feed('```json\n{"prodotti": [{"codice": "A", ') == []
+    items = parser.feed('"prezzo_unitario": 1.0}, {"codice": "B"')
+    assert items == [{"codice": "A", "prezzo_unitario": 1.0}]
+
+    items = parser.feed('}]}\n```')
+    assert items == [{"codice": "B"}]
+    assert parser.items_emitted == 2
+    assert parser.is_complete
+
+
+def test_braces_inside_strings_are_ignored():
+    """Parentesi e virgolette escape nelle stringhe non alterano il parsing"""
+    products = [
+        {"codice": "X{1}", "descrizione": "Sedia \"comoda\" [40 cm]"},
+        {"codice": "Y", "prezzi_quantita": [{"quantita": 4, "prezzo": 39.0}]},
+    ]
+    text = json.dumps({"prodotti": products})
+
+    parser = IncrementalJSONParser()
+    assert feed_in_chunks(parser, text, 3) == products
+
+
+def test_root_array():
+    """Un array radice produce i propri elementi"""
+    parser = IncrementalJSONParser()
+    assert feed_in_chunks(parser, '[{"a": 1}, {"b": 2}]', 5) == [{"a": 1}, {"b": 2}]
+
+
+def test_truncated_text_keeps_completed_items():
+    """Su testo troncato vengono emessi solo gli elementi completi"""
+    parser = IncrementalJSONParser()
+    items = parser.feed('{"prodotti": [{"codice": "A"}, {"codice": "B", "descr')
+
+    assert items == [{"codice": "A"}]
+    assert not parser.is_complete
@@ -0,0 +1,56 @@
+"""
+Test unitari per il modulo json_validator
+"""
+
+from src.utils.json_validator import JSONValidator
+
+
+def iter_objects(schema):
+    """Restituisce tutti i sottoschemi di tipo oggetto"""
+    if "properties" in schema:
+        yield schema
+        for subschema in schema["properties"].values():
+            yield from iter_objects(subschema)
+    if "items" in schema:
+        yield from iter_objects(schema["items"])
+
+
+def test_response_schema_is_strict():
+    """Lo schema per gli structured output rispetta i vincoli della modalità strict"""
+    schema = JSONValidator.build_response_schema()
+
+    for obj in iter_objects(schema):
+        assert obj["required"] == list(obj["properties"])
+        assert obj["additionalProperties"] is False
+        assert "allOf" not in obj
+
+    product = schema["properties"]["prodotti"]["items"]["properties"]
+    assert product["prezzo_unitario"]["type"] == ["number", "null"]
+    assert product["prezzi_quantita"]["type"] == ["array", "null"]
+    assert product["tipo_prezzo"] == {"enum": ["singolo", "quantita"], "type": "string"}
+    # Lo schema di origine non viene modificato
+    assert "allOf" in JSONValidator.PRODUCT_SCHEMA["properties"]["prodotti"]["items"]
+
+
+def test_sanitize_handles_null_optional_fields():
+    """I campi facoltativi null degli structured output vengono rimossi"""
+    data = {"prodotti": [{
+        "codice": "A",
+        "descrizione": "Prodotto",
+        "tipo_prezzo": "quantita",
+        "prezzo_unitario": None,
+        "prezzi_quantita": [{"quantita": 4, "prezzo": 39.0,
+                             "quantita_minima": True, "non_vendibile_separatamente": None}],
+        "descrizione_quantita": None
+    }]}
+
+    sanitized, errors = JSONValidator.validate_and_sanitize(data)
+
+    assert errors == []
+    assert sanitized["prodotti"][0] == {
+        "codice": "A",
+        "descrizione": "Prodotto",
+        "tipo_prezzo": "quantita",
+        "prezzi_quantita": [{"quantita": 4, "prezzo": 39.0,
+                             "quantita_minima": True, "non_vendibile_separatamente": False}]
+    }
@@ -0,0 +1,58 @@
+"""
+Test unitari per il modulo log_reader
+"""
+
+import logging
+from src.utils.log_reader import tail_lines, read_new_lines, filter_lines, parse_line
+
+
+def write_lines(path, count, start=0):
+    """Aggiunge righe numerate al file"""
+    with open(path, 'a', encoding='utf-8') as f:
+        for i in range(start, start + count):
+            f.write(f"2024-01-01 10:00:00 - src.test - INFO - riga {i}\n")
+
+
+def test_tail_lines_reads_only_last_lines(tmp_path):
+    """Le ultime righe vengono lette a ritroso anche con blocchi piccoli"""
+    log_file = tmp_path / "app.log"
+    write_lines(log_file, 500)
+
+    lines, offset = tail_lines(log_file, 3, block_size=64)
+
+    assert [line.rsplit(' ', 1)[-1] for line in lines] == ["497", "498", "499"]
+    assert offset == log_file.stat().st_size
+
+
+def test_read_new_lines_follows_and_handles_rotation(tmp_path):
+    """Le righe nuove si leggono dall'offset; dopo una rotazione si riparte da zero"""
+    log_file = tmp_path / "app.log"
+    write_lines(log_file, 2)
+    _, offset = tail_lines(log_file, 10)
+
+    write_lines(log_file, 2, start=2)
+    with open(log_file, 'a', encoding='utf-8') as f:
+        f.write("riga incompleta")
+    lines, offset = read_new_lines(log_file, offset)
+    assert [line.rsplit(' ', 1)[-1] for line in lines] == ["2", "3"]
+
+    log_file.write_text("")
+    write_lines(log_file, 1, start=100)
+    lines, _ = read_new_lines(log_file, offset)
+    assert lines[0].endswith("riga 100")
+
+
+def test_filter_lines_keeps_traceback_with_record():
+    """Le righe di continuazione seguono il record a cui appartengono"""
+    lines = [
+        "2024-01-01 10:00:00 - src.extractor.vision_api - INFO - avvio",
+        "2024-01-01 10:00:01 - src.extractor.vision_api - ERROR - errore",
+        "Traceback (most recent call last):",
+        "2024-01-01 10:00:02 - src.utils.logger - ERROR - altro",
+    ]
+
+    filtered = filter_lines(lines, logging.ERROR, "src.extractor")
+
+    assert filtered == lines[1:3]
+    assert parse_line(lines[0])["levelname"] == "INFO"
+    assert parse_line(lines[2]) is None
@@ -0,0 +1,50 @@
+"""
+Test unitari per il modulo logger
+"""
+
+import logging
+from logging.handlers import QueueHandler
+from src.config.settings import LOG_SETTINGS
+from src.utils.logger import setup_logger, stop_logging, get_log_level, truncate_payload
+
+
+def test_setup_logger_is_idempotent():
+    """Chiamate ripetute non aggiungono handler duplicati"""
+    for _ in range(3):
+        logger = setup_logger("test.idempotent")
+
+    assert len(logger.handlers) == 1
+    assert isinstance(logger.handlers[0], QueueHandler)
+    # Tutti i logger condividono la stessa coda
+    assert setup_logger("test.altro").handlers[0] is logger.handlers[0]
+
+
+def test_module_levels_use_longest_prefix(monkeypatch):
+    """Il livello per modulo usa il prefisso più specifico"""
+    monkeypatch.setitem(LOG_SETTINGS, "LEVEL", logging.INFO)
+    monkeypatch.setitem(LOG_SETTINGS, "MODULE_LEVELS", "src=WARNING, src.extractor.vision_api=DEBUG")
+
+    assert get_log_level("src.extractor.vision_api") == logging.DEBUG
+    assert get_log_level("src.utils.logger") == logging.WARNING
+    assert get_log_level("srcx") == logging.INFO
+    assert get_log_level("ui.app") == logging.INFO
+
+
+def test_truncate_payload():
+    """I contenuti lunghi vengono troncati indicando i caratteri omessi"""
+    assert truncate_payload("abc", 5) == "abc"
+    assert truncate_payload("a" * 12, 5) == "aaaaa... (+7 caratteri)"
+
+
+def test_stop_logging_detaches_and_setup_reattaches():
+    """Dopo stop_logging nessun record finisce nella vecchia coda; setup_logger la ripristina"""
+    logger = setup_logger("test.stop")
+    altro = setup_logger("test.stop.altro")
+    vecchio = logger.handlers[0]
+
+    stop_logging()
+    assert vecchio not in logger.handlers and vecchio not in altro.handlers
+
+    setup_logger("test.stop")
+    assert isinstance(altro.handlers[0], QueueHandler)
+    assert altro.handlers[0] is logger.handlers[0] is not vecchio
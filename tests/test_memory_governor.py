@@ -0,0 +1,98 @@
+"""
+Test unitari per il modulo memory_governor
+"""
+
+import pytest
+from src.config.settings import MEMORY_SETTINGS
+from src.utils.memory_governor import (
+    MemoryGovernor, MemoryPressureError, LEVEL_OK, LEVEL_SOFT, LEVEL_HARD
+)
+
+
+def fake_sampler(levels):
+    """Restituisce campioni con i livelli indicati, ripetendo l'ultimo"""
+    levels = list(levels)
+
+    def sample():
+        level = levels.pop(0) if len(levels) > 1 else levels[0]
+        rss = {LEVEL_OK: 100.0, LEVEL_SOFT: 1500.0, LEVEL_HARD: 3000.0}[level]
+        return {'rss_mb': rss, 'available_mb': 4096.0, 'total_mb': 8192.0, 'level': level}
+    return sample
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    """Governor senza pause reali"""
+    monkeypatch.setitem(MEMORY_SETTINGS, 'THROTTLE_DELAY', 0)
+    monkeypatch.setitem(MEMORY_SETTINGS, 'SAMPLE_INTERVAL', 0)
+    monkeypatch.setitem(MEMORY_SETTINGS, 'MAX_CONCURRENT_JOBS', 1)
+    return MemoryGovernor()
+
+
+def test_pressure_level_thresholds():
+    """Le soglie di RSS e memoria disponibile determinano il livello"""
+    assert MemoryGovernor.pressure_level(100, 4096) == LEVEL_OK
+    assert MemoryGovernor.pressure_level(MEMORY_SETTINGS['RSS_SOFT_LIMIT_MB'], 4096) == LEVEL_SOFT
+    assert MemoryGovernor.pressure_level(100, MEMORY_SETTINGS['MIN_AVAILABLE_HARD_MB'] - 1) == LEVEL_HARD
+
+
+def test_soft_pressure_degrades_dpi_and_records_peak(governor, monkeypatch):
+    """Sotto pressione lieve si rallenta, si riduce la risoluzione e si registra il picco"""
+    monkeypatch.setattr(governor, 'sample', fake_sampler([LEVEL_OK, LEVEL_SOFT]))
+    job = governor.admit("job-1")
+
+    job.throttle("pagina 1")
+    assert job.render_dpi(200) == MEMORY_SETTINGS['DEGRADED_DPI']
+    assert job.max_in_flight(2) == 1
+    governor.release(job)
+
+    report = job.to_dict()
+    assert report['peak_rss_mb'] == 1500.0
+    assert report['degraded_dpi'] == MEMORY_SETTINGS['DEGRADED_DPI']
+    assert [d['action'] for d in report['decisions']] == ['throttle', 'degrade_dpi', 'limit_in_flight']
+
+
+def test_hard_pressure_rejects_new_jobs(governor, monkeypatch):
+    """Oltre la soglia grave un nuovo job resta in coda e poi viene rifiutato"""
+    monkeypatch.setattr(governor, 'sample', fake_sampler([LEVEL_HARD]))
+
+    with pytest.raises(MemoryPressureError):
+        governor.admit("job-1", timeout=0)
+
+    # Lo slot è stato liberato: un job successivo può essere ammesso
+    monkeypatch.setattr(governor, 'sample', fake_sampler([LEVEL_OK]))
+    governor.release(governor.admit("job-2", timeout=0))
+
+
+def test_concurrent_jobs_are_limited(governor, monkeypatch):
+    """Oltre MAX_CONCURRENT_JOBS i nuovi job non vengono ammessi"""
+    monkeypatch.setattr(governor, 'sample', fake_sampler([LEVEL_OK]))
+    first = governor.admit("job-1")
+
+    with pytest.raises(MemoryPressureError):
+        governor.admit("job-2", timeout=0)
+
+    governor.release(first)
+
+
+def test_sampling_error_releases_the_slot(governor, monkeypatch):
+    """Un errore nel campionamento dopo aver preso lo slot non lo trattiene"""
+    def broken_sample():
+        raise RuntimeError("psutil non disponibile")
+    monkeypatch.setattr(governor, 'sample', broken_sample)
+
+    with pytest.raises(RuntimeError):
+        governor.admit("job-1", timeout=0)
+
+    monkeypatch.setattr(governor, 'sample', fake_sampler([LEVEL_OK]))
+    governor.release(governor.admit("job-2", timeout=0))
+
+
+def test_stale_rss_does_not_block_admission_forever(governor, monkeypatch):
+    """Senza altri job attivi un RSS rimasto alto non blocca l'ammissione oltre RSS_ADMISSION_WAIT"""
+    monkeypatch.setitem(MEMORY_SETTINGS, 'RSS_ADMISSION_WAIT', 0)
+    monkeypatch.setattr(governor, 'sample', fake_sampler([LEVEL_HARD]))
+
+    job = governor.admit("job-1", timeout=0)
+    assert [d['action'] for d in job.decisions] == ['queue', 'admit_stale_rss']
+    governor.release(job)
@@ -0,0 +1,128 @@
+"""
+Test del profilo di memoria per fase e budget di memoria della pipeline
+"""
+
+import fitz
+import pytest
+from benchmarks.data_generator import ProductGenerator
+from benchmarks.synthetic_pdf import generate_price_list
+from src.config.settings import IMAGE_SETTINGS
+from src.extractor.data_processor import DataProcessor
+from src.extractor.pdf_processor import PDFProcessor
+from src.extractor.vision_api import VisionAPI
+from src.utils.memory_profile import MemoryProfile
+from src.utils.pdf_validator import PDFValidator
+from src.utils.timing import span
+
+MB = 1024 * 1024
+
+
+def test_nested_stages_report_peak_and_retained_memory():
+    """Le fasi annidate non falsano il picco di quelle esterne"""
+    kept = []
+
+    def fasi():
+        with span('esterna'):
+            with span('interna'):
+                transient = bytearray(8 * MB)
+                del transient
+            kept.append(bytearray(2 * MB))
+
+    # Le allocazioni del primo utilizzo (metriche, log, filtri) restano fuori dalla misura
+    with MemoryProfile("warm-up"):
+        fasi()
+    kept.clear()
+    with MemoryProfile("job-1") as profile:
+        fasi()
+
+    stages = profile.summary()['stages']
+    assert stages['interna']['peak_mb'] >= 8
+    assert stages['interna']['max_retained_mb'] < 0.5
+    assert stages['esterna']['peak_mb'] >= 8
+    assert 1.9 < stages['esterna']['max_retained_mb'] < 2.5
+    assert any('test_memory_profile.py' in site['site'] for site in stages['esterna']['top_sites'])
+
+
+def test_spans_without_memory_profile_are_not_traced():
+    """Senza profilo attivo gli span non registrano memoria"""
+    profile = MemoryProfile("job-2")
+    with span('fase'):
+        bytearray(MB)
+    assert profile.stages == {}
+
+
+@pytest.fixture(scope="module")
+def price_list(tmp_path_factory):
+    """Listino sintetico A4 di 4 pagine"""
+    path = tmp_path_factory.mktemp("memoria") / "listino.pdf"
+    generate_price_list(path, pages=4, products_per_page=40)
+    return path
+
+
+def test_render_and_encode_stay_within_budget(price_list):
+    """Rendering e codifica allocano al più una copia del raster per volta"""
+    processor = PDFProcessor()
+    vision_api = VisionAPI("sk-test")
+    with fitz.open(str(price_list)) as document:
+        inputs = PDFValidator.memory_model_inputs(PDFValidator.scan_document(document))
+
+    with MemoryProfile("budget-render") as profile:
+        images = processor.process_pdf(price_list)
+        for image in images:
+            vision_api._convert_to_base64(image)
+
+    stages = profile.summary()['stages']
+    assert stages['render']['count'] == 4
+    # Con FAST_ENCODE il raster resta in MuPDF: in Python arriva solo il JPEG
+    assert stages['render']['peak_mb'] <= 0.25 * inputs['optimized_mb']
+    # Il base64 è già pronto: la codifica non alloca altro
+    assert stages.get('encode', {}).get('peak_mb', 0.0) <= 0.25 * inputs['optimized_mb']
+    assert stages['render']['max_retained_mb'] < 0.5
+
+
+def test_pil_path_stays_within_budget(price_list, monkeypatch):
+    """Senza FAST_ENCODE il rendering alloca al più una copia del raster per volta"""
+    monkeypatch.setitem(IMAGE_SETTINGS, 'FAST_ENCODE', False)
+    processor = PDFProcessor()
+    vision_api = VisionAPI("sk-test")
+    with fitz.open(str(price_list)) as document:
+        inputs = PDFValidator.memory_model_inputs(PDFValidator.scan_document(document))
+
+    with MemoryProfile("budget-render-pil") as profile:
+        images = processor.process_pdf(price_list)
+        for image in images:
+            vision_api._convert_to_base64(image)
+
+    stages = profile.summary()['stages']
+    # I campioni del pixmap sono l'unica copia Python del raster a piena risoluzione
+    assert stages['render']['peak_mb'] <= 1.2 * inputs['raster_mb']
+    # La codifica resta sotto la dimensione dell'immagine ottimizzata non compressa
+    assert stages['encode']['peak_mb'] <= inputs['optimized_mb']
+
+
+def test_process_data_stays_within_budget():
+    """La costruzione del DataFrame resta sotto 10 KB di picco per prodotto"""
+    products = ProductGenerator(seed=0).products(5000)
+    DataProcessor().process_data(products[:10], trusted=True)  # Import di pandas fuori dalla misura
+
+    with MemoryProfile("budget-dataframe") as profile:
+        DataProcessor().process_data(products, trusted=True)
+
+    assert profile.summary()['stages']['process_data']['peak_mb'] <= 5000 * 10 / 1024
+
+
+def test_calibrated_estimate_follows_dpi_and_pages(monkeypatch):
+    """La stima di memoria cresce con le pagine e, nel percorso PIL, con la risoluzione"""
+    a4 = [(595.0, 842.0)]
+    small = {'page_count': 2, 'sizes': a4 * 2}
+    large = {'page_count': 16, 'sizes': a4 * 16}
+
+    assert PDFValidator.estimate_memory_mb(small) < PDFValidator.estimate_memory_mb(large)
+    fast = PDFValidator.estimate_memory_mb(large, 200)
+
+    monkeypatch.setitem(IMAGE_SETTINGS, 'FAST_ENCODE', False)
+    assert PDFValidator.estimate_memory_mb(small, 100) < PDFValidator.estimate_memory_mb(small, 200)
+    assert fast < PDFValidator.estimate_memory_mb(large, 200)
+
+    inputs = PDFValidator.memory_model_inputs(small, IMAGE_SETTINGS['DPI'])
+    assert inputs['optimized_mb'] <= (IMAGE_SETTINGS['MAX_SIZE']['WIDTH'] * IMAGE_SETTINGS['MAX_SIZE']['HEIGHT'] * 3) / MB
@@ -0,0 +1,121 @@
+"""
+Test unitari per il registro delle metriche
+"""
+
+import urllib.request
+import pytest
+from src.utils.metrics import MetricsRegistry, OPENMETRICS_CONTENT_TYPE, STAGE_DURATION, start_http_server
+from src.utils.retry_manager import RetryManager
+from src.utils.timing import span
+
+
+@pytest.fixture
+def registry():
+    """Registro vuoto, separato da quello del processo"""
+    return MetricsRegistry()
+
+
+def test_counter_and_gauge_exposition(registry):
+    """Contatori e gauge vengono esposti con etichette e suffissi corretti"""
+    calls = registry.counter('test_calls', "Chiamate", ['outcome'])
+    calls.inc(outcome='success')
+    calls.inc(2, outcome='rate_limited')
+    queued = registry.gauge('test_queued', "In coda")
+    queued.inc()
+    queued.inc()
+    queued.dec()
+
+    text = registry.render()
+    assert '# TYPE test_calls counter' in text
+    assert 'test_calls_total{outcome="rate_limited"} 2' in text
+    assert 'test_calls_total{outcome="success"} 1' in text
+    assert 'test_queued 1' in text
+    assert text.endswith('# EOF\n')
+
+    # Formato Prometheus per node-exporter: famiglia con _total e senza # EOF
+    prometheus = registry.render(openmetrics=False)
+    assert '# TYPE test_calls_total counter' in prometheus
+    assert '# EOF' not in prometheus
+
+    with pytest.raises(ValueError):
+        calls.inc(-1, outcome='success')
+    with pytest.raises(ValueError):
+        calls.inc(outcome='success', extra='x')
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    """I bucket dell'istogramma sono cumulativi e includono +Inf, _sum e _count"""
+    latency = registry.histogram('test_latency_seconds', "Latenza", ['stage'], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, stage='render')
+
+    text = registry.render()
+    assert 'test_latency_seconds_bucket{stage="render",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{stage="render",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{stage="render",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_sum{stage="render"} 5.55' in text
+    assert 'test_latency_seconds_count{stage="render"} 3' in text
+
+
+def test_label_values_are_escaped(registry):
+    """Virgolette, backslash e a capo nelle etichette vengono protetti"""
+    registry.counter('test_escape', "Escape", ['value']).inc(value='a"b\\c\nd')
+    assert 'test_escape_total{value="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+
+def test_reregistration_returns_same_metric(registry):
+    """Registrare due volte la stessa metrica restituisce l'istanza esistente"""
+    first = registry.counter('test_same', "Uguale", ['a'])
+    assert registry.counter('test_same', "Uguale", ['a']) is first
+    with pytest.raises(ValueError):
+        registry.gauge('test_same', "Diversa")
+
+
+def test_textfile_is_written_atomically(registry, tmp_path):
+    """Il textfile viene scritto senza lasciare file temporanei"""
+    registry.counter('test_pages', "Pagine").inc(3)
+    path = tmp_path / 'textfile' / 'extractor.prom'
+    registry.write_textfile(path)
+
+    assert 'test_pages_total 3' in path.read_text(encoding='utf-8')
+    assert [p.name for p in path.parent.iterdir()] == ['extractor.prom']
+
+
+def test_http_endpoint_serves_openmetrics(registry):
+    """L'endpoint HTTP espone le metriche in formato OpenMetrics"""
+    registry.counter('test_http', "Richieste").inc()
+    server = start_http_server(0, registry=registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers['Content-Type'] == OPENMETRICS_CONTENT_TYPE
+            assert 'test_http_total 1' in response.read().decode('utf-8')
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_spans_feed_stage_histogram_without_job_timer():
+    """Gli span alimentano l'istogramma per fase anche senza JobTimer attivo"""
+    before = STAGE_DURATION.count(stage='test_stage')
+    with span('test_stage'):
+        pass
+    assert STAGE_DURATION.count(stage='test_stage') == before + 1
+
+
+def test_retry_manager_counts_retries():
+    """RetryManager conta ogni nuovo tentativo"""
+    from src.utils.metrics import RETRIES
+
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("connessione persa")
+        return 'ok'
+
+    before = RETRIES.value(function='flaky')
+    manager = RetryManager(max_retries=3, initial_delay=0.0, jitter=False)
+    assert manager.execute_with_retry(flaky) == ('ok', None)
+    assert RETRIES.value(function='flaky') == before + 2
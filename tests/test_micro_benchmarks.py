@@ -0,0 +1,40 @@
+"""
+Test del generatore di prodotti e dei micro-benchmark
+"""
+
+from benchmarks.baseline import apply_baseline
+from benchmarks.data_generator import ProductGenerator
+from benchmarks.micro_benchmarks import compare_with_baseline, run
+from src.utils.json_validator import JSONValidator
+
+
+def test_product_generator_is_seeded_and_valid():
+    """Lo stesso seme produce gli stessi prodotti, validi per lo schema"""
+    first = ProductGenerator(seed=7).products(300)
+    second = ProductGenerator(seed=7).products(300)
+
+    assert first == second
+    assert {p["tipo_prezzo"] for p in first} == {"singolo", "quantita"}
+    assert any("-" in p["codice"] for p in first)
+    assert JSONValidator.get_validation_errors({"prodotti": first}) == []
+
+
+def test_micro_benchmarks_report_each_function_and_scale():
+    """Ogni funzione viene misurata a ogni scala con l'esponente di crescita"""
+    results = run([50, 100], functions=["process_data_trusted", "save_csv"], with_memory=False)
+
+    assert set(results) == {"process_data_trusted", "save_csv"}
+    assert set(results["save_csv"]) == {"50", "100"}
+    assert "growth_exponent" in results["process_data_trusted"]["100"]
+
+
+def test_apply_baseline_updates_and_compares(tmp_path):
+    """La baseline viene salvata, poi un rallentamento oltre la tolleranza è una regressione"""
+    baseline = tmp_path / "baselines" / "micro.json"
+    results = {"save_csv": {"100": {"us_per_product": 2.0, "peak_memory_mb": None}}}
+    slower = {"save_csv": {"100": {"us_per_product": 3.0, "peak_memory_mb": None}}}
+
+    assert apply_baseline(results, baseline, 0.3, False, compare_with_baseline) == 2
+    assert apply_baseline(results, baseline, 0.3, True, compare_with_baseline) == 0
+    assert apply_baseline(results, baseline, 0.3, False, compare_with_baseline) == 0
+    assert apply_baseline(slower, baseline, 0.3, False, compare_with_baseline) == 1
@@ -0,0 +1,35 @@
+"""
+Test unitari per il modulo openai_client
+"""
+
+import pytest
+from src.config.settings import HTTP_SETTINGS
+from src.utils import openai_client
+from src.utils.openai_client import get_openai_client, close_clients
+
+
+@pytest.fixture(autouse=True)
+def isolated_registry(monkeypatch):
+    """Usa un registro vuoto per ogni test"""
+    monkeypatch.setattr(openai_client, "_clients", {})
+    yield
+    close_clients()
+
+
+def test_client_is_shared_per_key_and_base_url():
+    """Lo stesso client viene riusato per la stessa chiave e base URL"""
+    first = get_openai_client("sk-a")
+
+    assert get_openai_client("sk-a") is first
+    assert get_openai_client("sk-b") is not first
+    assert get_openai_client("sk-a", "http://127.0.0.1:8000/v1") is not first
+
+
+def test_client_uses_configured_pool_and_timeouts():
+    """Il client httpx rispetta limiti di connessione e timeout configurati"""
+    client = get_openai_client("sk-a")
+    timeout = client._client.timeout
+
+    assert client.max_retries == HTTP_SETTINGS['SDK_MAX_RETRIES']
+    assert timeout.connect == HTTP_SETTINGS['CONNECT_TIMEOUT']
+    assert timeout.read == HTTP_SETTINGS['READ_TIMEOUT']
@@ -0,0 +1,102 @@
+"""
+Test unitari per il modulo pdf_processor
+"""
+
+import fitz
+import pytest
+from PIL import Image
+from benchmarks.synthetic_pdf import scan_pdf
+from src.config.settings import IMAGE_SETTINGS, MEMORY_SETTINGS
+from src.extractor.pdf_processor import PDFProcessor
+from src.utils.memory_governor import MemoryGovernor, LEVEL_SOFT
+from src.utils.image_utils import PageImage
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    """PDF di due pagine con del testo"""
+    path = tmp_path / "listino.pdf"
+    document = fitz.open()
+    for i in range(2):
+        page = document.new_page(width=595, height=842)
+        page.insert_text((72, 72), f"RC330-{i} Sedia 148,00")
+    document.save(str(path))
+    document.close()
+    return path
+
+
+def test_process_pdf_opens_document_by_path(sample_pdf):
+    """Il PDF viene aperto dal percorso e ogni pagina diventa un'immagine"""
+    images = PDFProcessor().process_pdf(sample_pdf, dpi=72)
+
+    assert len(images) == 2
+    assert images[0].mode == "RGB"
+    assert images[0].size == (595, 842)
+
+
+def test_fast_encode_returns_jpeg_pages(sample_pdf):
+    """Con FAST_ENCODE le pagine arrivano già in JPEG e il base64 è calcolato una volta"""
+    pages = PDFProcessor().process_pdf(sample_pdf, dpi=100, grayscale=True)
+
+    assert isinstance(pages[0], PageImage)
+    assert pages[0].mode == "L"
+    assert pages[0].data[:2] == b"\xff\xd8"
+    assert max(pages[0].size) <= max(IMAGE_SETTINGS['MAX_SIZE'].values())
+    assert pages[0].base64 is pages[0].base64
+    assert pages[0].to_pil().size == pages[0].size
+
+
+def test_pil_path_when_fast_encode_disabled(sample_pdf, monkeypatch):
+    """Disattivando FAST_ENCODE si torna alle immagini PIL ottimizzate"""
+    monkeypatch.setitem(IMAGE_SETTINGS, 'FAST_ENCODE', False)
+    images = PDFProcessor().process_pdf(sample_pdf, dpi=72)
+
+    assert isinstance(images[0], Image.Image)
+
+
+@pytest.mark.parametrize("fast_encode", [True, False])
+def test_memory_pressure_cleans_up_after_each_page(sample_pdf, monkeypatch, fast_encode):
+    """Sotto pressione la memoria viene liberata dopo il rendering di ogni pagina, in entrambi i percorsi"""
+    monkeypatch.setitem(IMAGE_SETTINGS, 'FAST_ENCODE', fast_encode)
+    monkeypatch.setitem(MEMORY_SETTINGS, 'THROTTLE_DELAY', 0)
+    governor = MemoryGovernor()
+    monkeypatch.setattr(governor, 'sample', lambda: {
+        'rss_mb': 1500.0, 'available_mb': 4096.0, 'total_mb': 8192.0, 'level': LEVEL_SOFT
+    })
+    cleanups = []
+    monkeypatch.setattr(governor, 'cleanup', lambda: cleanups.append(1))
+    job = governor.admit("job-1", timeout=0)
+
+    PDFProcessor().process_pdf(sample_pdf, dpi=72, memory_job=job)
+    governor.release(job)
+
+    # Per pagina una pulizia prima del rendering (throttle) e una dopo, più quella di release
+    assert len(cleanups) == 2 * 2 + 1
+
+
+def test_scanned_pages_reuse_embedded_jpeg(sample_pdf, tmp_path):
+    """Le scansioni entro i limiti passano il JPEG incorporato senza ricodifica"""
+    scanned = scan_pdf(sample_pdf, tmp_path / "scansione.pdf", dpi=72)
+    with fitz.open(str(scanned)) as document:
+        embedded = document.extract_image(document[0].get_images()[0][0])['image']
+
+    pages = PDFProcessor().process_pdf(scanned)
+
+    assert pages[0].data == embedded
+    assert pages[0].size == (595, 842)
+
+
+def test_oversized_or_annotated_scans_are_rendered(sample_pdf, tmp_path):
+    """Scansioni troppo grandi o con testo visibile passano dal rendering"""
+    oversized = scan_pdf(sample_pdf, tmp_path / "scansione_300.pdf", dpi=300)
+    pages = PDFProcessor().process_pdf(oversized)
+    assert max(pages[0].size) <= max(IMAGE_SETTINGS['MAX_SIZE'].values())
+
+    annotated = tmp_path / "scansione_timbro.pdf"
+    with fitz.open(str(scan_pdf(sample_pdf, tmp_path / "base.pdf", dpi=72))) as document:
+        document[0].insert_text((72, 800), "Prezzi IVA esclusa")
+        embedded = [document.extract_image(page.get_images()[0][0])['image'] for page in document]
+        document.save(str(annotated))
+    pages = PDFProcessor().process_pdf(annotated)
+    assert pages[0].data != embedded[0]
+    assert pages[1].data == embedded[1]
@@ -0,0 +1,53 @@
+"""
+Test unitari per il modulo pdf_validator
+"""
+
+import fitz
+from src.config.settings import PDF_SETTINGS
+from src.utils.pdf_validator import PDFValidator
+
+
+def make_document(pages):
+    """Documento in memoria con testo su ogni pagina"""
+    document = fitz.open()
+    for i in range(pages):
+        document.new_page(width=595, height=842).insert_text((72, 72), f"Prodotto {i}")
+    return document
+
+
+def test_select_pages_samples_large_documents(monkeypatch):
+    """Oltre la soglia si esamina un campione che include prima e ultima pagina"""
+    monkeypatch.setitem(PDF_SETTINGS, 'SAMPLE_THRESHOLD_PAGES', 10)
+    monkeypatch.setitem(PDF_SETTINGS, 'SAMPLE_PAGES', 5)
+
+    assert PDFValidator.select_pages(8) == list(range(8))
+    assert PDFValidator.select_pages(101) == [0, 25, 50, 75, 100]
+
+
+def test_scan_is_reused_by_structure_check_and_estimate(monkeypatch):
+    """Controllo struttura e stima usano la stessa scansione senza rileggere le pagine"""
+    monkeypatch.setitem(PDF_SETTINGS, 'SAMPLE_THRESHOLD_PAGES', 10)
+    monkeypatch.setitem(PDF_SETTINGS, 'SAMPLE_PAGES', 4)
+    document = make_document(30)
+
+    scan = PDFValidator.scan_document(document)
+    monkeypatch.setattr(PDFValidator, 'scan_document', None)  # Una nuova scansione fallirebbe
+
+    assert scan['sampled'] is True
+    assert len(scan['pages']) == 4
+    assert len(scan['sizes']) == 30
+    assert PDFValidator.check_pdf_structure(document, scan) == (True, None)
+    requirements = PDFValidator.estimate_processing_requirements(document, scan)
+    assert requirements['total_pages'] == 30
+    assert requirements['sampled'] is True
+
+
+def test_validate_pdf_rejects_invalid_file(tmp_path):
+    """Un file che non è un PDF viene segnalato come non valido"""
+    path = tmp_path / "finto.pdf"
+    path.write_bytes(b"non sono un pdf")
+
+    is_valid, error = PDFValidator.validate_pdf(path)
+
+    assert is_valid is False
+    assert error
@@ -0,0 +1,70 @@
+"""
+Test unitari per il profiler dei job
+"""
+
+import contextvars
+import pstats
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.utils.profiler import JobProfiler, MODE_CPROFILE
+from src.utils.timing import span
+
+
+def lavoro_cpu(seconds: float = 0.15):
+    """Occupa la CPU per il tempo indicato"""
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+
+def lavoro_worker():
+    """Fase eseguita in un thread di un executor"""
+    with span('lavoro_worker'):
+        return lavoro_cpu()
+
+
+def test_sampling_profile_covers_job_and_worker_threads(tmp_path):
+    """Il profilo campiona il thread del job e i worker che eseguono sue fasi"""
+    with JobProfiler("job-1", interval=0.005) as profiler:
+        lavoro_cpu()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(contextvars.copy_context().run, lavoro_worker).result()
+
+    collapsed = profiler.collapsed()
+    assert profiler.samples > 0
+    assert 'lavoro_worker (test_profiler.py' in collapsed
+    assert 'test_sampling_profile_covers_job_and_worker_threads' in collapsed
+
+    paths = profiler.save(tmp_path, "profile_test")
+    assert paths['collapsed'].read_text(encoding='utf-8') == collapsed
+    stats = pstats.Stats(str(paths['pstats']))
+    functions = {name for _, _, name in stats.stats}
+    assert {'lavoro_cpu', 'lavoro_worker'} <= functions
+
+
+def test_collapsed_lines_have_counts():
+    """Ogni riga collapsed termina con il numero di campioni dello stack"""
+    with JobProfiler("job-2", interval=0.005) as profiler:
+        lavoro_cpu(0.05)
+
+    for line in profiler.collapsed().splitlines():
+        stack, count = line.rsplit(' ', 1)
+        assert int(count) > 0
+        assert stack
+
+
+def test_cprofile_mode_writes_deterministic_stats(tmp_path):
+    """In modalità cprofile il file pstats contiene i conteggi esatti delle chiamate"""
+    with JobProfiler("job-3", mode=MODE_CPROFILE) as profiler:
+        for _ in range(3):
+            lavoro_cpu(0.01)
+
+    stats = pstats.Stats(str(profiler.save(tmp_path, "profile_cprofile")['pstats']))
+    calls = {name: values[1] for (_, _, name), values in stats.stats.items()}
+    assert calls['lavoro_cpu'] == 3
+
+    with pytest.raises(ValueError):
+        JobProfiler("job-4", mode='tracing')
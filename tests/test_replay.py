@@ -0,0 +1,80 @@
+"""
+Test unitari per il replay delle risposte archiviate
+"""
+
+import json
+import pandas as pd
+import pytest
+from src.extractor.replay import replay_jobs, replay_session
+from src.utils import catalog_index
+from src.utils.catalog_index import CatalogIndex
+from src.utils.response_archive import ArchiveWriter, ResponseArchive
+
+
+def singolo(codice, prezzo=1.0):
+    """Prodotto a prezzo singolo di esempio"""
+    return {"codice": codice, "descrizione": f"Prodotto {codice}", "tipo_prezzo": "singolo", "prezzo_unitario": prezzo}
+
+
+def risposta(content, finish_reason="stop", structured_output=True):
+    """Risposta grezza come archiviata da VisionAPI"""
+    return {"content": content, "finish_reason": finish_reason,
+            "structured_output": structured_output, "output_format": "standard"}
+
+
+@pytest.fixture
+def archive_dir(tmp_path):
+    """Archivio con un job di due pagine, la seconda troncata e continuata"""
+    directory = tmp_path / "responses"
+    archive = ResponseArchive("job-1", "hash-1", directory, ArchiveWriter())
+    archive.record(1, [risposta("```json\n" + json.dumps({"prodotti": [singolo("A", 2)]}) + "\n```",
+                                structured_output=False)], [], {})
+    troncata = json.dumps({"prodotti": [singolo("B"), singolo("C")]})[:-20]
+    archive.record(2, [
+        risposta(troncata, finish_reason="length"),
+        risposta(json.dumps({"prodotti": [singolo("C"), singolo("D")]}))
+    ], [], {})
+    assert archive.flush(timeout=5)
+    return directory
+
+
+def test_replay_rebuilds_table_from_raw_responses(archive_dir):
+    """Il replay interpreta di nuovo le risposte grezze, non i prodotti salvati"""
+    result = replay_jobs(directory=archive_dir, workers=1)["job-1"]
+
+    assert result["pages"] == 2
+    assert result["failed_responses"] == 0
+    assert [p["codice"] for p in result["products"]] == ["A", "B", "C", "D"]
+    assert list(result["dataframe"]["codice"]) == ["A", "B", "C", "D"]
+
+
+def test_replay_in_process_pool_matches_inline(archive_dir):
+    """Con più processi il risultato è lo stesso dell'esecuzione nel processo corrente"""
+    inline = replay_jobs(directory=archive_dir, workers=1)["job-1"]
+    pooled = replay_jobs(directory=archive_dir, workers=2, chunk_pages=1)["job-1"]
+
+    pd.testing.assert_frame_equal(inline["dataframe"], pooled["dataframe"])
+
+
+def test_replay_session_rewrites_results(archive_dir, tmp_path, monkeypatch):
+    """Il replay di una sessione sovrascrive la tabella, aggiorna i metadati e il catalogo"""
+    catalog = CatalogIndex(tmp_path / "catalog.sqlite3")
+    monkeypatch.setattr(catalog_index, "_catalog", catalog)
+    results_dir = tmp_path / "results"
+    results_dir.mkdir()
+    (results_dir / "metadata_20240101_120000.json").write_text(json.dumps({
+        "timestamp": "20240101_120000", "rows_count": 1,
+        "response_archive": str(archive_dir / "job-1.jsonl.gz")
+    }))
+
+    df = replay_session("20240101_120000", results_dir, workers=1)
+
+    saved = pd.read_csv(results_dir / "results_20240101_120000.csv")
+    assert len(saved) == len(df) == 4
+    metadata = json.loads((results_dir / "metadata_20240101_120000.json").read_text())
+    assert metadata["rows_count"] == 4
+    assert metadata["last_operation"] == "replay"
+    assert [e["products"] for e in catalog.editions()] == [4]
+
+    with pytest.raises(FileNotFoundError):
+        replay_session("20240202_000000", results_dir)
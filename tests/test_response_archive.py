@@ -0,0 +1,76 @@
+"""
+Test unitari per l'archivio delle risposte grezze
+"""
+
+import gzip
+import json
+from src.utils.response_archive import ArchiveWriter, ResponseArchive
+
+
+def risposta(testo):
+    """Risposta grezza di esempio"""
+    return {"content": testo, "finish_reason": "stop", "structured_output": True, "output_format": "standard"}
+
+
+def test_records_are_appended_and_indexed(tmp_path):
+    """Ogni pagina è un record gzip; l'indice punta all'ultimo per documento e pagina"""
+    writer = ArchiveWriter()
+    primo = ResponseArchive("20240101_120000", "hash-a", tmp_path, writer)
+    secondo = ResponseArchive("20240102_090000", "hash-a", tmp_path, writer)
+    for page in (1, 2):
+        primo.record(page, [risposta(f"p{page}")], [{"codice": f"A{page}"}], {"prompt_tokens": 10})
+    secondo.record(2, [risposta("p2 bis")], [], {})
+    assert writer.flush(timeout=5)
+
+    # Il file resta un normale gzip JSONL, leggibile per intero
+    with gzip.open(primo.path, "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["page"] for line in f] == [1, 2]
+    assert [r["page_key"] for r in ResponseArchive.read(primo.path)] == ["hash-a:1", "hash-a:2"]
+    assert ResponseArchive.jobs(tmp_path) == ["20240101_120000", "20240102_090000"]
+
+    index = ResponseArchive.load_index(tmp_path)
+    assert ResponseArchive.lookup("hash-a", 1, tmp_path, index)["products"] == [{"codice": "A1"}]
+    assert ResponseArchive.lookup("hash-a", 2, tmp_path, index)["responses"][0]["content"] == "p2 bis"
+    assert ResponseArchive.lookup("hash-b", 1, tmp_path, index) is None
+
+
+def test_write_errors_do_not_stop_the_writer(tmp_path):
+    """Un errore di scrittura viene registrato e i record successivi vengono scritti"""
+    writer = ArchiveWriter()
+    (tmp_path / "bloccato").write_text("non una directory")
+    ResponseArchive("job", "h", tmp_path / "bloccato", writer).record(1, [], [], {})
+    valido = ResponseArchive("job", "h", tmp_path / "archivio", writer)
+    valido.record(1, [risposta("ok")], [], {})
+
+    assert writer.flush(timeout=5)
+    assert [r["page"] for r in ResponseArchive.read(valido.path)] == [1]
+
+
+def test_compress_level_zero_is_kept(tmp_path):
+    """Il livello 0 (nessuna compressione) non viene sostituito da quello predefinito"""
+    writer = ArchiveWriter(compress_level=0)
+    archive = ResponseArchive("job", "h", tmp_path, writer)
+    archive.record(1, [risposta("x" * 1000)], [], {})
+
+    assert writer.compress_level == 0
+    assert writer.flush(timeout=5)
+    assert archive.path.stat().st_size > 1000
+
+
+def test_compact_index_drops_removed_archives(tmp_path):
+    """La compattazione tiene solo l'ultima voce delle pagine con l'archivio ancora presente"""
+    writer = ArchiveWriter()
+    vecchio = ResponseArchive("20240101_120000", "hash-a", tmp_path, writer)
+    nuovo = ResponseArchive("20240102_090000", "hash-b", tmp_path, writer)
+    vecchio.record(1, [risposta("a")], [], {})
+    nuovo.record(1, [risposta("b")], [], {})
+    nuovo.record(1, [risposta("b bis")], [], {})
+    assert writer.flush(timeout=5)
+
+    vecchio.path.unlink()
+    writer.compact_index(tmp_path)
+    assert writer.flush(timeout=5)
+
+    assert len((tmp_path / "index.jsonl").read_text().splitlines()) == 1
+    assert ResponseArchive.lookup("hash-a", 1, tmp_path) is None
+    assert ResponseArchive.lookup("hash-b", 1, tmp_path)["responses"][0]["content"] == "b bis"
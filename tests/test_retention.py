@@ -0,0 +1,156 @@
+"""
+Test unitari per la conservazione dei file su disco
+"""
+
+import os
+import time
+
+import pytest
+
+from src.utils.retention import RetentionManager
+
+
+def _write(path, size, age):
+    """Crea un file di size byte modificato age secondi fa."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    results, uploads = tmp_path / "results", tmp_path / "uploads"
+    results.mkdir()
+    uploads.mkdir()
+    return tmp_path, results, uploads
+
+
+def _manager(tmp_path, results, uploads, max_bytes=10_000, results_budget=10_000, uploads_budget=10_000):
+    return RetentionManager(
+        categories={
+            'results': {'DIRS': [results], 'MAX_BYTES': results_budget},
+            'uploads': {'DIRS': [uploads], 'MAX_BYTES': uploads_budget}
+        },
+        max_bytes=max_bytes,
+        index_file=tmp_path / "index.json",
+        in_use_seconds=60
+    )
+
+
+def test_category_budget_evicts_least_recent_session_as_a_group(dirs):
+    """Oltre il budget della categoria si rimuovono interi gruppi, dal meno recente"""
+    tmp_path, results, uploads = dirs
+    for age, ts in ((3000, "20240101_100000"), (2000, "20240102_100000"), (1000, "20240103_100000")):
+        _write(results / f"results_{ts}.csv", 300, age)
+        _write(results / f"metadata_{ts}.json", 100, age)
+
+    report = _manager(tmp_path, results, uploads, results_budget=900).sweep()
+
+    assert sorted(p.name for p in results.iterdir()) == [
+        "metadata_20240102_100000.json", "metadata_20240103_100000.json",
+        "results_20240102_100000.csv", "results_20240103_100000.csv"
+    ]
+    assert report['reclaimed_bytes'] == 400
+    assert report['by_category'] == {'results': {'bytes': 400, 'groups': 1}}
+    assert report['usage_bytes'] == {'results': 800, 'uploads': 0}
+
+
+def test_touch_pin_and_recent_files_are_protected(dirs):
+    """Accessi segnalati, pin e file recenti proteggono i gruppi dalla rimozione"""
+    tmp_path, results, uploads = dirs
+    old_read = _write(uploads / "a.pdf", 500, 5000)
+    old_pinned = _write(uploads / "b.pdf", 500, 4000)
+    old = _write(uploads / "c.pdf", 500, 3000)
+    recent = _write(uploads / "d.pdf", 500, 10)
+
+    manager = _manager(tmp_path, results, uploads, max_bytes=600)
+    manager.touch(old_read)
+    pins = manager.pin(old_pinned)
+    report = manager.sweep()
+
+    assert not old.exists()
+    assert old_read.exists() and old_pinned.exists() and recent.exists()
+    assert report['over_budget'] == ['total']
+    manager.unpin(pins)
+
+
+def test_index_avoids_rescanning_unchanged_directories(dirs, monkeypatch):
+    """Una directory non modificata non viene riletta; i file rimossi a mano escono dall'indice"""
+    tmp_path, results, uploads = dirs
+    _write(uploads / "a.pdf", 100, 5000)
+    _manager(tmp_path, results, uploads).sweep()
+
+    manager = _manager(tmp_path, results, uploads)
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(os, 'scandir', lambda path: scans.append(path) or real_scandir(path))
+    assert manager.sweep()['usage_bytes']['uploads'] == 100
+    assert scans == []
+
+    (uploads / "a.pdf").unlink()
+    os.utime(uploads, (time.time() + 5,) * 2)
+    assert manager.sweep()['usage_bytes']['uploads'] == 0
+    assert scans == [uploads]
+
+
+def test_file_created_during_sweep_is_indexed_next_time(dirs, monkeypatch):
+    """Un file creato dopo la lettura della directory entra nell'indice al controllo successivo"""
+    tmp_path, results, uploads = dirs
+    _write(uploads / "a.pdf", 100, 5000)
+    manager = _manager(tmp_path, results, uploads, uploads_budget=1000)
+
+    refresh_active = manager._refresh_active
+    def create_upload(*args):
+        _write(uploads / "b.pdf", 5000, 5000)
+        refresh_active(*args)
+    monkeypatch.setattr(manager, '_refresh_active', create_upload)
+    assert manager.sweep()['usage_bytes']['uploads'] == 100
+
+    monkeypatch.setattr(manager, '_refresh_active', refresh_active)
+    report = manager.sweep()
+    assert report['reclaimed_bytes'] == 5100
+    assert not (uploads / "b.pdf").exists()
+
+
+def test_evicting_archives_compacts_the_response_index(tmp_path, monkeypatch):
+    """Rimuovere un archivio delle risposte ne toglie le voci dall'indice"""
+    from src.utils import response_archive
+
+    writer = response_archive.ArchiveWriter()
+    monkeypatch.setattr(response_archive, "get_archive_writer", lambda: writer)
+    responses = tmp_path / "responses"
+    for job, age in (("20240101_100000", 3000), ("20240102_100000", 2000)):
+        response_archive.ResponseArchive(job, f"hash-{job}", responses, writer).record(1, [], [], {})
+        assert writer.flush(timeout=5)
+        stamp = time.time() - age
+        os.utime(responses / f"{job}.jsonl.gz", (stamp, stamp))
+
+    budget = (responses / "20240102_100000.jsonl.gz").stat().st_size
+    manager = RetentionManager(
+        categories={'responses': {'DIRS': [responses], 'MAX_BYTES': budget}},
+        max_bytes=10_000, index_file=tmp_path / "index.json", in_use_seconds=60
+    )
+    assert manager.sweep()['removed_groups'] == 1
+    assert writer.flush(timeout=5)
+    assert list(response_archive.ResponseArchive.load_index(responses)) == ["hash-20240102_100000:1"]
+    assert len((responses / "index.jsonl").read_text().splitlines()) == 1
+
+
+def test_max_age_removes_old_groups_under_budget(dirs):
+    """La pulizia per età rimuove i gruppi vecchi anche entro il budget, tranne quelli bloccati"""
+    tmp_path, results, uploads = dirs
+    _write(results / "results_20240101_100000.csv", 100, 10 * 86400)
+    old_upload = _write(uploads / "vecchio.pdf", 100, 10 * 86400)
+    _write(uploads / "recente.pdf", 100, 2 * 86400)
+    manager = _manager(tmp_path, results, uploads)
+    manager.pin(old_upload)
+
+    assert manager.sweep()['removed_groups'] == 0
+    report = manager.sweep(max_age=7 * 86400)
+
+    assert report['removed_groups'] == 1
+    assert report['reclaimed_bytes'] == 100
+    assert sorted(p.name for p in uploads.iterdir()) == ["recente.pdf", "vecchio.pdf"]
+    assert list(results.iterdir()) == []
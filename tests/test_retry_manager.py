@@ -0,0 +1,48 @@
+"""
+Test unitari per la scelta degli errori da ritentare
+"""
+
+import httpx
+import pytest
+from openai import APIConnectionError, APIStatusError, BadRequestError, RateLimitError
+
+from src.utils.retry_manager import RetryManager
+
+REQUEST = httpx.Request("POST", "http://localhost/v1/chat/completions")
+
+
+def status_error(cls, status_code):
+    """Errore dell'SDK con il codice HTTP indicato"""
+    return cls(f"Errore {status_code}", response=httpx.Response(status_code, request=REQUEST), body=None)
+
+
+def wrapped(error):
+    """Errore incapsulato come fa VisionAPI ("raise VisionAPIError(...) from e")"""
+    try:
+        raise RuntimeError("Errore nella chiamata API") from error
+    except RuntimeError as outer:
+        return outer
+
+
+@pytest.mark.parametrize("error, expected", [
+    (status_error(RateLimitError, 429), True),
+    (status_error(APIStatusError, 503), True),
+    (status_error(APIStatusError, 408), True),
+    (status_error(APIStatusError, 409), True),
+    (APIConnectionError(request=REQUEST), True),
+    (ConnectionError("connessione persa"), True),
+    (status_error(BadRequestError, 400), False),
+    (status_error(APIStatusError, 401), False),
+    (ValueError("risposta non valida"), False),
+])
+def test_should_retry_transient_errors_only(error, expected):
+    """Si ritentano rete, timeout, 429, 408, 409 e 5xx; gli altri 4xx falliscono subito"""
+    assert RetryManager().should_retry(error) is expected
+
+
+def test_should_retry_follows_the_cause_chain():
+    """Gli errori dell'SDK incapsulati vengono riconosciuti dalla causa"""
+    manager = RetryManager()
+    assert manager.should_retry(wrapped(status_error(RateLimitError, 429))) is True
+    assert manager.should_retry(wrapped(status_error(BadRequestError, 400))) is False
+    assert manager.should_retry(RuntimeError("senza causa")) is False
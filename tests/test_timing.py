@@ -0,0 +1,51 @@
+"""
+Test unitari per il modulo timing
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from src.utils.timing import JobTimer, span, timed, page_context
+
+
+@timed('lavoro')
+def lavoro():
+    """Funzione strumentata di esempio"""
+    time.sleep(0.01)
+
+
+def test_spans_are_aggregated_per_stage_and_page():
+    """Gli span vengono aggregati per fase e per pagina"""
+    with JobTimer("job-1") as timer:
+        for page in (1, 2):
+            with page_context(page):
+                lavoro()
+                with span('render'):
+                    pass
+        lavoro()
+
+    summary = timer.summary()
+
+    assert summary['stages']['lavoro']['count'] == 3
+    assert summary['stages']['render']['count'] == 2
+    assert set(summary['pages']) == {"1", "2"}
+    assert summary['pages']["1"]['lavoro'] >= 0.01
+    assert 0 < summary['stages']['lavoro']['share'] <= 1
+
+
+def test_spans_without_active_timer_are_ignored():
+    """Senza un JobTimer attivo la strumentazione non registra nulla"""
+    timer = JobTimer("job-2")
+    lavoro()
+    assert timer.spans == []
+
+
+def test_spans_in_worker_threads_keep_context():
+    """Con copy_context gli span dei thread finiscono nel timer del job"""
+    with JobTimer("job-3") as timer, page_context(5):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, lavoro) for _ in range(2)]
+            [f.result() for f in futures]
+
+    assert timer.summary()['pages']["5"]['lavoro'] > 0
+    assert len(timer.spans) == 2
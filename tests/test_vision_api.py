@@ -0,0 +1,255 @@
+"""
+Test unitari per il modulo vision_api
+"""
+
+import json
+import httpx
+import pytest
+from types import SimpleNamespace
+from PIL import Image
+from src.config.settings import VISION_SETTINGS
+from openai import BadRequestError
+from src.extractor.vision_api import VisionAPI, UnparseableResponseError
+from src.utils.response_archive import ArchiveWriter, ResponseArchive
+
+
+def make_response(content: str, finish_reason: str = "stop"):
+    """Costruisce un oggetto con la stessa forma di una chat completion"""
+    message = SimpleNamespace(content=content, refusal=None)
+    choice = SimpleNamespace(message=message, finish_reason=finish_reason)
+    usage = SimpleNamespace(prompt_tokens=100, completion_tokens=50, total_tokens=150)
+    return SimpleNamespace(choices=[choice], usage=usage)
+
+
+@pytest.fixture
+def vision_api():
+    """Fixture che fornisce un'istanza di VisionAPI con una chiave fittizia"""
+    return VisionAPI("sk-test")
+
+
+def test_process_response_sanitizes_products(vision_api):
+    """I prodotti vengono validati e sanitizzati già a livello di pagina"""
+    content = json.dumps({
+        "prodotti": [
+            {
+                "codice": 330,
+                "descrizione": "Sedia",
+                "tipo_prezzo": "singolo",
+                "prezzo_unitario": 148,
+                "campo_extra": "da rimuovere"
+            }
+        ]
+    })
+
+    products = vision_api._process_response(make_response(content), page_number=1)
+
+    assert products == [{
+        "codice": "330",
+        "descrizione": "Sedia",
+        "tipo_prezzo": "singolo",
+        "prezzo_unitario": 148.0
+    }]
+
+
+def test_process_response_strips_markdown(vision_api):
+    """Con il prompt tradizionale i delimitatori markdown vengono ignorati"""
+    vision_api.structured_output = False
+    content = '```json\n{"prodotti": [{"codice": "A", "descrizione": "B", ' \
+              '"tipo_prezzo": "singolo", "prezzo_unitario": 1.5}]}\n```'
+
+    products = vision_api._process_response(make_response(content))
+
+    assert len(products) == 1
+    assert products[0]["prezzo_unitario"] == 1.5
+
+
+def test_process_response_empty(vision_api):
+    """Una risposta vuota produce una lista vuota"""
+    assert vision_api._process_response(make_response("   ")) == []
+
+
+def make_chunk(content=None, finish_reason=None, usage=None, with_choice=True):
+    """Costruisce un chunk con la stessa forma di uno stream di chat completion"""
+    choices = []
+    if with_choice:
+        delta = SimpleNamespace(content=content)
+        choices = [SimpleNamespace(delta=delta, finish_reason=finish_reason)]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+def test_streaming_call_emits_products_during_generation(vision_api, monkeypatch):
+    """In streaming ogni prodotto viene validato e notificato appena completo"""
+    text = json.dumps({"prodotti": [
+        {"codice": "A", "descrizione": "Uno", "tipo_prezzo": "singolo", "prezzo_unitario": 1},
+        {"codice": "B", "descrizione": "Due", "tipo_prezzo": "singolo", "prezzo_unitario": 2},
+    ]})
+    chunks = [make_chunk(text[i:i + 7]) for i in range(0, len(text), 7)]
+    chunks.append(make_chunk(finish_reason="stop"))
+    chunks.append(make_chunk(usage=SimpleNamespace(completion_tokens=20), with_choice=False))
+
+    monkeypatch.setattr(
+        vision_api.client.chat.completions, "create", lambda **kwargs: iter(chunks)
+    )
+
+    notified = []
+    result = vision_api._make_streaming_call([], page_number=1, on_product=notified.append)
+
+    assert [p["codice"] for p in result["products"]] == ["A", "B"]
+    assert notified == result["products"]
+    assert result["finish_reason"] == "stop"
+    assert result["usage"].completion_tokens == 20
+    assert result["time_to_first_product"] is not None
+
+
+def singolo(codice):
+    """Prodotto a prezzo singolo di esempio"""
+    return {"codice": codice, "descrizione": f"Prodotto {codice}", "tipo_prezzo": "singolo", "prezzo_unitario": 1.0}
+
+
+def test_truncated_response_is_continued(vision_api, monkeypatch, tmp_path):
+    """Una risposta troncata viene completata con una richiesta di continuazione"""
+    monkeypatch.setitem(VISION_SETTINGS, "STREAM", False)
+    monkeypatch.setitem(VISION_SETTINGS, "TRUNCATION_STRATEGY", "continuation")
+
+    truncated = json.dumps({"prodotti": [singolo("A"), singolo("B")]})[:-20]
+    responses = iter([
+        make_response(truncated, finish_reason="length"),
+        make_response(json.dumps({"prodotti": [singolo("B"), singolo("C")]})),
+    ])
+    requests = []
+
+    def fake_create(**kwargs):
+        requests.append(kwargs["messages"])
+        return next(responses)
+
+    monkeypatch.setattr(vision_api.client.chat.completions, "create", fake_create)
+
+    vision_api.archive = ResponseArchive("job-1", "abc123", tmp_path, ArchiveWriter())
+
+    products = vision_api.extract_data(Image.new("RGB", (100, 100), "white"), page_number=3)
+
+    assert [p["codice"] for p in products] == ["A", "B", "C"]
+    assert len(requests) == 2
+    assert requests[1][-1]["role"] == "user"
+    assert "A" in requests[1][-1]["content"]
+    assert vision_api.page_metrics[-1]["truncated"] is True
+    assert vision_api.page_metrics[-1]["continuations"] == 1
+    assert vision_api.page_metrics[-1]["incomplete"] is False
+    assert "responses" not in vision_api.page_metrics[-1]
+
+    # Entrambe le risposte grezze finiscono nell'archivio della pagina
+    assert vision_api.archive.flush(timeout=5)
+    record = ResponseArchive.lookup("abc123", 3, tmp_path)
+    assert [r["content"] for r in record["responses"]] == [truncated, json.dumps({"prodotti": [singolo("B"), singolo("C")]})]
+    assert record["products"] == products
+    assert record["usage"] == {"prompt_tokens": 200, "completion_tokens": 100}
+
+
+def test_unparseable_response_is_not_silent(vision_api, monkeypatch):
+    """Una risposta non interpretabile viene richiesta di nuovo e poi segnalata"""
+    monkeypatch.setitem(VISION_SETTINGS, "STREAM", False)
+    vision_api.structured_output = False
+    calls = []
+
+    def fake_create(**kwargs):
+        calls.append(kwargs)
+        return make_response("Non riesco a leggere il listino.")
+
+    monkeypatch.setattr(vision_api.client.chat.completions, "create", fake_create)
+
+    with pytest.raises(UnparseableResponseError):
+        vision_api._request_completion([])
+    assert len(calls) == VISION_SETTINGS["MAX_PARSE_RETRIES"] + 1
+
+
+def test_structured_output_request_uses_schema(vision_api, monkeypatch):
+    """Con gli structured output la richiesta include lo schema strict"""
+    monkeypatch.setitem(VISION_SETTINGS, "STREAM", False)
+    captured = {}
+
+    def fake_create(**kwargs):
+        captured.update(kwargs)
+        return make_response(json.dumps({"prodotti": [dict(singolo("A"), prezzi_quantita=None,
+                                                           descrizione_quantita=None)]}))
+
+    monkeypatch.setattr(vision_api.client.chat.completions, "create", fake_create)
+
+    result = vision_api._request_completion(vision_api._build_messages("abc"))
+
+    assert captured["response_format"]["type"] == "json_schema"
+    assert captured["response_format"]["json_schema"]["strict"] is True
+    assert captured["messages"][0]["content"][0]["text"] == VISION_SETTINGS["STRUCTURED_PROMPT_TEMPLATE"]
+    assert result["products"] == [singolo("A")]
+
+
+def test_structured_output_falls_back_to_prompt(vision_api, monkeypatch):
+    """Se il modello rifiuta il json_schema si torna al prompt tradizionale"""
+    monkeypatch.setitem(VISION_SETTINGS, "STREAM", False)
+    prompts = []
+
+    def fake_create(**kwargs):
+        prompts.append(kwargs["messages"][0]["content"][0]["text"])
+        if "response_format" in kwargs:
+            request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+            raise BadRequestError(
+                "Invalid parameter: 'response_format' of type 'json_schema' is not supported with this model.",
+                response=httpx.Response(400, request=request),
+                body=None
+            )
+        return make_response(json.dumps({"prodotti": [singolo("A")]}))
+
+    monkeypatch.setattr(vision_api.client.chat.completions, "create", fake_create)
+
+    products, _ = vision_api._extract_page(Image.new("RGB", (100, 100), "white"))
+
+    assert [p["codice"] for p in products] == ["A"]
+    assert vision_api.structured_output is False
+    assert prompts == [VISION_SETTINGS["STRUCTURED_PROMPT_TEMPLATE"], VISION_SETTINGS["PROMPT_TEMPLATE"]]
+
+
+def test_compact_format_rows_are_expanded_while_streaming(monkeypatch):
+    """In formato compatto le righe in streaming sono espanse e validate"""
+    vision_api = VisionAPI("sk-test", output_format="compact")
+    text = '{"r": [["A", "Uno", "s", 1.5, null, null], ["B", "Due", "q", null, null, [[4, 3.0, 1, 0]]]]}'
+    chunks = [make_chunk(text[i:i + 9]) for i in range(0, len(text), 9)]
+    captured = {}
+
+    def fake_create(**kwargs):
+        captured.update(kwargs)
+        return iter(chunks)
+
+    monkeypatch.setattr(vision_api.client.chat.completions, "create", fake_create)
+
+    result = vision_api._make_streaming_call(vision_api._build_messages("abc"))
+
+    assert vision_api.structured_output is False
+    assert captured["response_format"] == {"type": "json_object"}
+    assert captured["messages"][0]["content"][0]["text"] == VISION_SETTINGS["COMPACT_PROMPT_TEMPLATE"]
+    assert result["products"][0] == {
+        "codice": "A", "descrizione": "Uno", "tipo_prezzo": "singolo", "prezzo_unitario": 1.5
+    }
+    assert result["products"][1]["prezzi_quantita"][0]["quantita"] == 4
+
+
+def test_extraction_updates_process_metrics(vision_api, monkeypatch):
+    """L'estrazione aggiorna le metriche di chiamate, pagine e token"""
+    from src.utils.metrics import API_CALLS, PAGES_PROCESSED, TOKENS
+
+    monkeypatch.setitem(VISION_SETTINGS, "STREAM", False)
+    monkeypatch.setattr(
+        vision_api.client.chat.completions, "create",
+        lambda **kwargs: make_response(json.dumps({"prodotti": [singolo("A")]}))
+    )
+    before = (
+        API_CALLS.value(outcome="success"),
+        PAGES_PROCESSED.value(stage="extract", outcome="ok"),
+        TOKENS.value(direction="in"),
+        TOKENS.value(direction="out")
+    )
+
+    vision_api.extract_data(Image.new("RGB", (100, 100), "white"), page_number=1)
+
+    assert API_CALLS.value(outcome="success") == before[0] + 1
+    assert PAGES_PROCESSED.value(stage="extract", outcome="ok") == before[1] + 1
+    assert TOKENS.value(direction="in") == before[2] + 100
+    assert TOKENS.value(direction="out") == before[3] + 50
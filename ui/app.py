@@ -23,13 +23,34 @@ from src.extractor.data_processor import DataProcessor
 from src.utils.logger import setup_logger
 from src.utils.session_manager import SessionManager
 from src.utils.pdf_validator import PDFValidationError
+from src.utils.memory_governor import get_memory_governor, MemoryPressureError
 from ui.components.file_uploader import custom_file_uploader
 from ui.components.progress import ProgressBar
 from ui.components.results_viewer import display_results
+from ui.components.log_viewer import display_log_viewer
+from ui.components.performance_viewer import display_performance_report, display_memory_profile
+from src.utils.timing import JobTimer, page_context
+from src.utils.metrics import start_exporters
+from src.utils.profiler import JobProfiler
+from src.utils.memory_profile import MemoryProfile
+from src.utils.response_archive import ResponseArchive
+from src.utils.retention import get_retention_manager
+from src.utils.catalog_index import default_supplier
+from src.config.settings import IMAGE_SETTINGS, ARCHIVE_SETTINGS, RETENTION_SETTINGS
 
 # Inizializza il logger
 logger = setup_logger()
 
+@st.cache_resource
+def get_pdf_processor() -> PDFProcessor:
+    """Restituisce il PDFProcessor condiviso tra sessioni e rerun."""
+    return PDFProcessor()
+
+@st.cache_resource
+def get_data_processor() -> DataProcessor:
+    """Restituisce il DataProcessor condiviso tra sessioni e rerun."""
+    return DataProcessor()
+
 def display_error_message(error: Exception, progress_bar: Optional[ProgressBar] = None):
     """
     Mostra un messaggio di errore appropriato all'utente.
@@ -44,6 +65,9 @@ def display_error_message(error: Exception, progress_bar: Optional[ProgressBar]
     if isinstance(error, PDFValidationError):
         title = "Errore nella validazione del PDF"
         detail = f"Dettaglio: {error_message}"
+    elif isinstance(error, MemoryPressureError):
+        title = "Memoria del server insufficiente"
+        detail = f"Dettaglio: {error_message}"
     else:
         title = "Si è verificato un errore durante l'elaborazione"
         detail = error_details
@@ -108,6 +132,11 @@ def main():
         layout="wide"
     )
 
+    # Endpoint/textfile delle metriche, se configurati (una volta per processo)
+    start_exporters()
+    # Conservazione dei file entro i budget di disco, in background (una volta per processo)
+    retention = get_retention_manager()
+
     # Inizializza sessione
     SessionManager.initialize_session()
     
@@ -223,10 +252,35 @@ def main():
         # Opzioni aggiuntive
         with st.expander("⚙️ Opzioni Avanzate"):
             show_logs = st.checkbox("📝 Mostra Log", value=False)
+            grayscale = st.checkbox(
+                "⚫ Pagine in scala di grigi",
+                value=IMAGE_SETTINGS['GRAYSCALE'],
+                help="Rendering più veloce e immagini più leggere per listini monocromatici"
+            )
+            profile_job = st.checkbox(
+                "🔬 Profila l'elaborazione",
+                value=False,
+                help="Salva un profilo (pstats e stack per flame graph) accanto ai risultati"
+            )
+            profile_memory = st.checkbox(
+                "🧠 Profila la memoria",
+                value=False,
+                help="Registra picco e punti di allocazione di ogni fase con tracemalloc (rallenta l'elaborazione)"
+            )
             if st.button("🧹 Pulisci Sessioni Vecchie", type="secondary"):
-                SessionManager.cleanup_old_sessions()
-                st.success("✅ Pulizia completata")
-                # st.rerun()
+                # Pulizia per età, oltre ai budget: i file del job in corso restano bloccati
+                cleanup = retention.sweep(max_age=RETENTION_SETTINGS['CLEANUP_MAX_AGE_DAYS'] * 24 * 3600)
+                st.success(
+                    f"✅ Pulizia completata: liberati {cleanup['reclaimed_bytes'] / 1024 ** 2:.1f} MB "
+                    f"({cleanup['removed_groups']} elementi non usati da "
+                    f"{RETENTION_SETTINGS['CLEANUP_MAX_AGE_DAYS']} giorni)"
+                )
+            report = retention.last_report
+            if report:
+                st.caption(
+                    f"Ultima pulizia: liberati {report['reclaimed_bytes'] / 1024 ** 2:.1f} MB "
+                    f"({report['removed_groups']} elementi), occupati {report['total_bytes'] / 1024 ** 2:.1f} MB"
+                )
 
     # Area principale dei risultati
     if st.session_state.results_df is not None:
@@ -264,6 +318,15 @@ def main():
         
         # Mostra risultati
         display_results(st.session_state.results_df)
+        
+        # Ripartizione dei tempi dell'elaborazione, se disponibile
+        performance_report = SessionManager.load_performance_report()
+        if performance_report:
+            with st.expander("⏱️ Tempi di elaborazione"):
+                display_performance_report(performance_report, SessionManager.get_profile_paths())
+                memory_report = SessionManager.load_performance_report(kind='memory')
+                if memory_report:
+                    display_memory_profile(memory_report)
 
     # Interfaccia per nuova elaborazione
     if st.session_state.results_df is None:
@@ -271,24 +334,59 @@ def main():
 
         if uploaded_file:
             st.session_state.uploaded_file = uploaded_file
+        
+        supplier = st.text_input(
+            "🏷️ Fornitore",
+            placeholder=default_supplier(uploaded_file.name) if uploaded_file else "",
+            help="Nome con cui il listino viene indicizzato nel catalogo (predefinito: ricavato dal nome del file)"
+        )
 
         # Nel blocco di elaborazione principale:
         if st.button("Avvia Estrazione", type="primary"):
             progress_bar = ProgressBar(total_steps=100, description="Elaborazione in corso...")
+            governor = get_memory_governor()
+            memory_job = None
+            retention_pins = []
+            job_archive = None
+            # Tempi per fase e per pagina, salvati accanto ai metadati della sessione
+            job_timer = JobTimer(st.session_state.session_id).activate()
+            # Profilo su richiesta, campionato a basso overhead
+            job_profiler = JobProfiler(st.session_state.session_id).start() if profile_job else None
+            memory_profile = MemoryProfile(st.session_state.session_id).start() if profile_memory else None
             
             try:
                 # Salva il file caricato
                 progress_bar.update(5, "Preparazione file...")
                 temp_path = SessionManager.save_file_to_temp(uploaded_file)
+                SessionManager.update_session_metadata({
+                    'supplier': supplier.strip() or default_supplier(uploaded_file.name)
+                })
+                
+                # Attende uno slot libero e memoria sufficiente (processo condiviso tra sessioni)
+                progress_bar.update(8, "In attesa di risorse disponibili...")
+                memory_job = governor.admit(st.session_state.session_id)
                 
-                # Inizializza i processori
-                processor = PDFProcessor()  
+                # Inizializza i processori: i processori senza stato sono
+                # condivisi, VisionAPI (metriche per elaborazione) usa il
+                # client HTTP condiviso dal processo
+                processor = get_pdf_processor()
                 vision_api = VisionAPI(api_key)
+                vision_api.memory_job = memory_job
+                # Risposte grezze archiviate per sessione, rielaborabili senza nuove chiamate
+                if ARCHIVE_SETTINGS['ENABLED']:
+                    metadata = st.session_state.session_metadata
+                    job_archive = vision_api.archive = ResponseArchive(
+                        metadata['timestamp'], metadata.get('file_sha256')
+                    )
+                # I file del job non vengono rimossi finché l'elaborazione è in corso
+                retention_pins = retention.pin(
+                    temp_path, *([vision_api.archive.path] if vision_api.archive else [])
+                )
                 
                 try:
                     # Converti PDF in immagini
                     progress_bar.update(10, "Validazione e conversione PDF in immagini...")
-                    images = processor.process_pdf(uploaded_file)
+                    images = processor.process_pdf(temp_path, memory_job=memory_job, grayscale=grayscale)
                     
                     # Calcoli accurati per il progresso
                     total_pages = len(images)
@@ -301,7 +399,17 @@ def main():
                     
                     for i, image in enumerate(images, 1):
                         try:
-                            result = vision_api.extract_data(image)
+                            page_products = []
+                            
+                            def on_product(product, page=i, found=page_products):
+                                found.append(product)
+                                progress_bar.set_detail(
+                                    f"Pagina {page}/{total_pages}: {len(found)} prodotti estratti"
+                                )
+                            
+                            memory_job.throttle(f"analisi pagina {i}")
+                            with page_context(i):
+                                result = vision_api.extract_data(image, page_number=i, on_product=on_product)
                             results.extend(result)
                             
                             # Calcola il progresso attuale
@@ -310,6 +418,8 @@ def main():
                                 int(current_progress),
                                 f"Analizzata pagina {i}/{total_pages}"
                             )
+                        except MemoryPressureError:
+                            raise
                         except Exception as e:
                             progress_bar.update(
                                 int(base_progress + (i * page_weight)),
@@ -317,13 +427,30 @@ def main():
                                 is_warning=True
                             )
                     
+                    # Conserva le metriche per pagina (tempo al primo prodotto, durata)
+                    # e le decisioni del governor della memoria con il picco di RSS
+                    memory_job.sample()
+                    SessionManager.update_session_metadata({
+                        'page_metrics': vision_api.page_metrics,
+                        'memory': memory_job.to_dict(),
+                        'response_archive': str(vision_api.archive.path) if vision_api.archive else None
+                    })
+                    
                     if results:
                         progress_bar.update(90, "Elaborazione risultati...")
-                        data_processor = DataProcessor()
-                        df = data_processor.process_data(results)
+                        data_processor = get_data_processor()
+                        # I risultati sono già stati validati pagina per pagina
+                        df = data_processor.process_data(results, trusted=True)
                         
                         progress_bar.update(95, "Salvataggio risultati...")
                         SessionManager.save_results(df)
+                        job_timer.deactivate()
+                        SessionManager.save_performance_report(job_timer.summary())
+                        if job_profiler:
+                            SessionManager.save_profile(job_profiler)
+                        if memory_profile:
+                            memory_profile.stop()
+                            SessionManager.save_performance_report(memory_profile.summary(), kind='memory')
                         
                         # Assicura il 100% prima del completamento
                         progress_bar.update(100, "Completamento elaborazione...")
@@ -340,13 +467,25 @@ def main():
 
             except Exception as e:
                 display_error_message(e)
+                
+            finally:
+                if job_profiler:
+                    job_profiler.stop()
+                if memory_profile:
+                    memory_profile.stop()
+                job_timer.deactivate()
+                # L'archivio resta protetto finché il thread di scrittura non ha finito
+                if job_archive:
+                    job_archive.flush(ARCHIVE_SETTINGS['FLUSH_TIMEOUT'])
+                retention.unpin(retention_pins)
+                if memory_job:
+                    governor.release(memory_job)
 
         # Area log
         if show_logs:
             with st.expander("Log", expanded=True):
                 try:
-                    log_content = Path("logs/latest.log").read_text()
-                    st.code(log_content)
+                    display_log_viewer()
                 except Exception as e:
                     st.warning("⚠️ Impossibile leggere il file di log")
                     logger.error(f"Errore lettura log: {str(e)}")
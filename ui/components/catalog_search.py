@@ -0,0 +1,98 @@
+# ui/components/catalog_search.py
+
+import time
+import streamlit as st
+import pandas as pd
+from typing import Dict, List
+from src.config.settings import CATALOG_SETTINGS
+from src.utils.catalog_index import get_catalog_index
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ALL_SUPPLIERS = "Tutti i fornitori"
+
+def _products_table(products: List[Dict]) -> pd.DataFrame:
+    """Tabella dei prodotti con una colonna per ogni quantità."""
+    rows = []
+    for product in products:
+        row = {
+            'Fornitore': product['supplier'],
+            'Codice': product['codice'],
+            'Descrizione': product['descrizione'],
+            'Prezzo unitario': product['prezzo_unitario'],
+            'Edizione': product['edition_date'][:10],
+            'File': product['file_name']
+        }
+        for tier in product['prezzi_quantita']:
+            row[f"PER Pz. {tier['quantita']}"] = tier['prezzo']
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+def display_catalog_search():
+    """
+    Pagina di ricerca nel catalogo dei prodotti di tutte le sessioni:
+    ricerca testuale su codice e descrizione e storico dei prezzi di un codice.
+    """
+    st.title("🔎 Catalogo prodotti")
+
+    if not CATALOG_SETTINGS['ENABLED']:
+        st.info("Il catalogo dei prodotti è disattivato (CATALOG_SETTINGS['ENABLED'])")
+        return
+
+    catalog = get_catalog_index()
+    suppliers = catalog.suppliers()
+    if not suppliers:
+        st.info("🔍 Il catalogo è vuoto: i listini vengono aggiunti al salvataggio dei risultati")
+        return
+
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        query = st.text_input("Cerca", placeholder="Codice o parole della descrizione, ad es. reclinabile")
+    with col2:
+        supplier = st.selectbox("Fornitore", [ALL_SUPPLIERS] + suppliers)
+    with col3:
+        mode = st.radio("Tipo", ["Testo", "Codice"], horizontal=True)
+    supplier = None if supplier == ALL_SUPPLIERS else supplier
+
+    if not query.strip():
+        editions = catalog.editions(supplier)
+        st.caption(f"{len(editions)} edizioni indicizzate")
+        st.dataframe(
+            pd.DataFrame([
+                {'Fornitore': e['supplier'], 'Edizione': e['edition_date'][:10],
+                 'File': e['file_name'], 'Prodotti': e['products']}
+                for e in editions
+            ]),
+            use_container_width=True,
+            hide_index=True
+        )
+        return
+
+    started = time.perf_counter()
+    try:
+        if mode == "Codice":
+            products = catalog.lookup(query, supplier)
+            history = catalog.price_history(query, supplier)
+        else:
+            products = catalog.search(query, supplier)
+            history = []
+    except Exception as e:
+        logger.error(f"Errore nella ricerca nel catalogo: {e}")
+        st.error(f"⚠️ Ricerca non riuscita: {e}")
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    st.caption(f"{len(products)} prodotti trovati in {elapsed_ms:.1f} ms")
+    if not products:
+        st.info("🔍 Nessun prodotto trovato")
+        return
+    st.dataframe(_products_table(products), use_container_width=True, hide_index=True)
+
+    if history:
+        st.subheader("📈 Storico prezzi")
+        history_table = _products_table(history)
+        st.dataframe(history_table, use_container_width=True, hide_index=True)
+        prices = history_table.dropna(subset=['Prezzo unitario'])
+        if prices['Edizione'].nunique() > 1:
+            st.line_chart(prices.pivot_table(index='Edizione', columns='Fornitore', values='Prezzo unitario'))
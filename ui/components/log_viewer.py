@@ -0,0 +1,59 @@
+# ui/components/log_viewer.py
+
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Optional
+import streamlit as st
+from src.config.settings import LOG_SETTINGS
+from src.utils.log_reader import tail_lines, read_new_lines, filter_lines
+
+LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
+
+# Righe mantenute in memoria per sessione
+MAX_BUFFERED_LINES = 5000
+
+def display_log_viewer(log_file: Optional[Path] = None):
+    """
+    Mostra le ultime righe del log e segue quelle nuove.
+    
+    Il file non viene mai letto per intero: la prima apertura legge a
+    ritroso le ultime righe, i rerun successivi leggono solo quanto
+    aggiunto dopo l'offset memorizzato nella sessione. I filtri per
+    livello e logger sono applicati prima dell'invio al browser.
+    
+    Args:
+        log_file: File di log; se None usa LOG_SETTINGS['FILE']
+    """
+    log_file = Path(log_file or LOG_SETTINGS['FILE'])
+    
+    col1, col2, col3, col4 = st.columns([1, 1, 2, 1])
+    with col1:
+        line_count = st.number_input("Righe", min_value=10, max_value=2000, value=200, step=50,
+                                     key="log_viewer_lines")
+    with col2:
+        min_level = st.selectbox("Livello minimo", LEVELS, index=1, key="log_viewer_level")
+    with col3:
+        logger_prefix = st.text_input("Logger", placeholder="es. src.extractor", key="log_viewer_logger")
+    with col4:
+        follow = st.checkbox("Segui", value=True, key="log_viewer_follow")
+        if st.button("🔄 Aggiorna", key="log_viewer_refresh"):
+            st.session_state.pop('log_viewer_state', None)
+    
+    state = st.session_state.get('log_viewer_state')
+    if state is None:
+        lines, offset = tail_lines(log_file, MAX_BUFFERED_LINES)
+        state = {'offset': offset, 'lines': deque(lines, maxlen=MAX_BUFFERED_LINES)}
+        st.session_state.log_viewer_state = state
+    elif follow:
+        new_lines, state['offset'] = read_new_lines(log_file, state['offset'])
+        state['lines'].extend(new_lines)
+    
+    visible = filter_lines(state['lines'], logging.getLevelName(min_level), logger_prefix.strip())
+    visible = visible[-int(line_count):]
+    
+    if visible:
+        st.code("\n".join(visible), language="log")
+    else:
+        st.info("Nessuna riga di log corrispondente ai filtri")
+    st.caption(f"{len(visible)} righe mostrate • {log_file}")
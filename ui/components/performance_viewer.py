@@ -0,0 +1,122 @@
+# ui/components/performance_viewer.py
+
+import streamlit as st
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Optional
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Nomi delle fasi mostrati nella tabella
+STAGE_LABELS = {
+    'pdf_scan': "Scansione PDF",
+    'render': "Rendering pagine",
+    'optimize_image': "Ottimizzazione immagini",
+    'encode': "Codifica JPEG/base64",
+    'api_call': "Chiamate API (con retry)",
+    'parse': "Parsing risposte",
+    'validate': "Validazione per pagina",
+    'process_data': "Costruzione DataFrame",
+    'catalog_validation': "Validazione catalogo",
+    'save_csv': "Salvataggio CSV"
+}
+
+def display_performance_report(report: Dict, profile_paths: Optional[Dict[str, Path]] = None):
+    """
+    Mostra la ripartizione dei tempi di un'elaborazione per fase e per pagina.
+    
+    Args:
+        report: Riepilogo prodotto da JobTimer.summary
+        profile_paths: File del profilo del job ('pstats', 'collapsed'), se registrato
+    """
+    stages = report.get('stages', {})
+    if not stages:
+        st.info("Nessun tempo registrato per questa elaborazione")
+        return
+        
+    st.metric("Durata totale", f"{report.get('total_seconds', 0):.1f} s")
+    
+    breakdown = pd.DataFrame([
+        {
+            'Fase': STAGE_LABELS.get(stage, stage),
+            'Chiamate': stats['count'],
+            'Totale (s)': stats['total_seconds'],
+            'Media (s)': stats['mean_seconds'],
+            'Max (s)': stats['max_seconds'],
+            '% del totale': round(stats['share'] * 100, 1)
+        }
+        for stage, stats in stages.items()
+    ]).sort_values('Totale (s)', ascending=False)
+    st.dataframe(breakdown, use_container_width=True, hide_index=True)
+    st.caption("Le fasi annidate (ad es. parsing e validazione dentro le chiamate API) "
+               "sono conteggiate in entrambe: le percentuali non vanno sommate.")
+    
+    pages = report.get('pages', {})
+    if pages:
+        with st.expander("Dettaglio per pagina"):
+            per_page = pd.DataFrame.from_dict(pages, orient='index').fillna(0.0)
+            per_page.index = per_page.index.astype(int)
+            per_page = per_page.sort_index().rename(columns=STAGE_LABELS)
+            per_page.index.name = "Pagina"
+            st.dataframe(per_page, use_container_width=True)
+    
+    if profile_paths:
+        st.markdown("**Profilo dell'elaborazione**")
+        col1, col2 = st.columns(2)
+        if 'collapsed' in profile_paths:
+            with col1:
+                st.download_button(
+                    "🔥 Stack per flame graph",
+                    profile_paths['collapsed'].read_bytes(),
+                    profile_paths['collapsed'].name,
+                    mime='text/plain'
+                )
+        if 'pstats' in profile_paths:
+            with col2:
+                st.download_button(
+                    "📈 Statistiche pstats",
+                    profile_paths['pstats'].read_bytes(),
+                    profile_paths['pstats'].name,
+                    mime='application/octet-stream'
+                )
+        st.caption("Il file .folded si apre con speedscope o flamegraph.pl; "
+                   "il file .pstats con il modulo pstats o snakeviz.")
+
+def display_memory_profile(report: Dict):
+    """
+    Mostra il profilo di memoria di un'elaborazione per fase.
+    
+    Args:
+        report: Riepilogo prodotto da MemoryProfile.summary
+    """
+    stages = report.get('stages', {})
+    if not stages:
+        return
+        
+    st.markdown("**Memoria per fase**")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Picco allocazioni Python", f"{report.get('peak_traced_mb', 0):.1f} MB")
+    with col2:
+        st.metric("Picco RSS", f"{report.get('peak_rss_mb', 0):.0f} MB")
+    
+    breakdown = pd.DataFrame([
+        {
+            'Fase': STAGE_LABELS.get(stage, stage),
+            'Chiamate': stats['count'],
+            'Picco (MB)': stats['peak_mb'],
+            'Trattenuta media (MB)': stats['mean_retained_mb'],
+            'RSS max (MB)': stats['rss_mb']
+        }
+        for stage, stats in stages.items()
+    ]).sort_values('Picco (MB)', ascending=False)
+    st.dataframe(breakdown, use_container_width=True, hide_index=True)
+    
+    with st.expander("Punti di allocazione per fase"):
+        for stage, stats in stages.items():
+            if stats['top_sites']:
+                st.markdown(f"*{STAGE_LABELS.get(stage, stage)}*")
+                st.dataframe(pd.DataFrame(stats['top_sites']), use_container_width=True, hide_index=True)
+    st.caption("tracemalloc misura solo le allocazioni Python: i buffer di PIL e PyMuPDF "
+               "compaiono solo nell'RSS.")
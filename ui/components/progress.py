@@ -21,6 +21,7 @@ class ProgressBar:
         self.current_step = 0
         self.status = st.status(description)
         self.progress = self.status.progress(0)
+        self.detail = self.status.empty()
         self.error_container = None
         logger.debug(f"ProgressBar inizializzata con {total_steps} steps")
         
@@ -47,6 +48,18 @@ class ProgressBar:
                 self.status.write(message)
             logger.debug(f"Progress {progress_value*100:.0f}%: {message}")
     
+    def set_detail(self, message: str):
+        """
+        Mostra un messaggio di dettaglio che sostituisce il precedente.
+        
+        Utile per aggiornamenti frequenti (ad es. prodotti estratti durante
+        lo streaming) che non devono accumularsi nello stato.
+        
+        Args:
+            message: Messaggio da mostrare
+        """
+        self.detail.caption(message)
+    
     def complete(self, success: bool = True, message: Optional[str] = None):
         """
         Completa la barra di progresso.
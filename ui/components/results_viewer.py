@@ -6,7 +6,7 @@ from datetime import datetime
 from pathlib import Path
 from src.utils.logger import setup_logger
 from src.utils.session_manager import SessionManager
-import io
+from src.extractor.data_processor import DataProcessor
 
 logger = setup_logger(__name__)
 
@@ -102,14 +102,9 @@ def display_results(df: pd.DataFrame, show_stats: bool = True):
         
         # Download Excel
         with col2:
-            output = io.BytesIO()
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             excel_filename = f"listino_prezzi_{timestamp}.xlsx"
-            
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                df.to_excel(writer, sheet_name='Listino', index=False)
-                
-            excel_data = output.getvalue()
+            excel_data = DataProcessor().to_excel(df)
             
             if st.download_button(
                 "📊 Scarica Excel",
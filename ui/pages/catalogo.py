@@ -0,0 +1,19 @@
+# ui/pages/catalogo.py
+
+import sys
+from pathlib import Path
+import streamlit as st
+
+# Aggiungi la root del progetto al Python path
+project_root = Path(__file__).parent.parent.parent
+sys.path.append(str(project_root))
+
+from ui.components.catalog_search import display_catalog_search
+
+st.set_page_config(
+    page_title="Catalogo prodotti",
+    page_icon="🔎",
+    layout="wide"
+)
+
+display_catalog_search()